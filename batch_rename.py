@@ -0,0 +1,516 @@
+# -*- coding: utf-8 -*-
+"""
+MKV Rename Assistant - Modalità batch
+Analizza e rinomina intere cartelle senza GUI usando un pool di processi
+
+Uso:
+    python -m mkv_rename_assistant batch <cartella o file> [--workers N] [--apply] [--no-cache] [--tmdb]
+                                         [--timings] [--metrics-log FILE] [--metrics-textfile FILE]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from config import RENAME_CONFIG, BATCH_CONFIG, ERROR_MESSAGES, MEDIAINFO_CACHE_CONFIG, TMDB_CONFIG, TMDB_CACHE_CONFIG
+from metrics import measure, metrics
+
+# Cache MediaInfo e modalità veloce del processo worker (impostate da _init_worker)
+_worker_cache = None
+_worker_fast = False
+
+
+# Motivi per cui un file (o una cartella) viene scartato prima dell'analisi
+SKIP_REASONS = {
+    "extension": "estensione non supportata",
+    "excluded": "sample/trailer",
+    "too_small": "film sotto {min_size} MB",
+    "excluded_dir": "cartelle sample/trailer/extra",
+}
+
+
+class MediaFileFilter:
+    """Scarta i file che non sono candidati alla rinomina prima di leggerne i contenuti
+
+    Bastano nome e stat: estensione (supported_extensions), nomi di file che corrispondono a
+    exclude_title_patterns, cartelle il cui nome intero corrisponde a exclude_dir_patterns e
+    film sotto min_movie_size_mb (gli episodi sono spesso più piccoli e non hanno limite).
+    Gli scarti sono contati in `skipped` per motivo.
+    """
+
+    __slots__ = ("extensions", "exclude", "exclude_dirs", "min_size", "skipped")
+
+    def __init__(self):
+        self.extensions = tuple(ext.lower() for ext in RENAME_CONFIG["supported_extensions"])
+        self.exclude = re.compile("|".join(f"(?:{pattern})" for pattern in RENAME_CONFIG["exclude_title_patterns"]),
+                                  re.IGNORECASE)
+        self.exclude_dirs = re.compile("|".join(f"(?:{pattern})" for pattern in RENAME_CONFIG["exclude_dir_patterns"]),
+                                       re.IGNORECASE)
+        self.min_size = RENAME_CONFIG["min_movie_size_mb"] * 1024 * 1024
+        self.skipped = Counter()
+
+    def skip_reason(self, name, size=None):
+        """Chiave di SKIP_REASONS per cui il file va scartato, o None (size None: nessun limite)"""
+        if not name.lower().endswith(self.extensions):
+            return "extension"
+        stem = os.path.splitext(name)[0]
+        if self.exclude.search(stem):
+            return "excluded"
+        if size is not None and size < self.min_size:
+            from release_tokenizer import tokenize_release_name
+            if tokenize_release_name(stem).season is None:
+                return "too_small"
+        return None
+
+    def relative_skip_reason(self, relative_path, size=None):
+        """Come skip_reason, per un percorso relativo alla cartella radice (es. Film/Sample/film.mkv)
+
+        Scarta anche i file dentro cartelle di sample/extra: si controllano tutte le cartelle
+        fra la radice e il file, come fa find_media_files scendendo nell'albero.
+        """
+        directory, name = os.path.split(relative_path)
+        if any(self._excluded_dir(part) for part in directory.split(os.sep)):
+            return "excluded_dir"
+        return self.skip_reason(name, size)
+
+    def _excluded_dir(self, name):
+        return self.exclude_dirs.fullmatch(name) is not None
+
+    def _accept(self, reason):
+        if reason:
+            self.skipped[reason] += 1
+        return reason is None
+
+    def accepts(self, entry):
+        """True se il file del DirEntry di os.scandir è un candidato (stat solo se serve)"""
+        reason = self.skip_reason(entry.name)
+        if reason is None:
+            reason = self.skip_reason(entry.name, entry.stat().st_size)
+        return self._accept(reason)
+
+    def accepts_path(self, path):
+        return self._accept(self.skip_reason(os.path.basename(path), os.path.getsize(path)))
+
+    def accepts_dir(self, name):
+        return self._accept("excluded_dir" if self._excluded_dir(name) else None)
+
+    @staticmethod
+    def describe(reason):
+        return SKIP_REASONS[reason].format(min_size=RENAME_CONFIG["min_movie_size_mb"])
+
+    def summary(self):
+        """Riepilogo degli scarti per motivo (es. estensione non supportata: 3, film sotto 500 MB: 1)"""
+        return ", ".join(f"{self.describe(reason)}: {count}" for reason, count in self.skipped.items())
+
+
+def find_media_files(root_dir, file_filter=None):
+    """Percorre ricorsivamente la cartella e ritorna i file video candidati
+
+    Parameters
+    ----------
+    root_dir (str):
+        Cartella radice da scansionare (o singolo file, es. da un hook del client di download).
+    file_filter (MediaFileFilter, optional):
+        Filtro da applicare, che conta i file scartati (default: uno nuovo).
+
+    Returns
+    -------
+    list
+        Percorsi dei file trovati, ordinati.
+    """
+    file_filter = file_filter or MediaFileFilter()
+    if os.path.isfile(root_dir):
+        return [root_dir] if file_filter.accepts_path(root_dir) else []
+    found = []
+    pending = [root_dir]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except OSError:
+            continue  # come os.walk: le cartelle illeggibili si saltano
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    # Le cartelle di sample/extra non vengono nemmeno elencate
+                    if file_filter.accepts_dir(entry.name):
+                        pending.append(entry.path)
+                elif file_filter.accepts(entry):
+                    found.append(entry.path)
+    found.sort()
+    return found
+
+
+def _init_worker(use_cache, fast=False):
+    # Ogni processo apre la propria connessione al database della cache
+    global _worker_cache, _worker_fast
+    _worker_cache = None
+    _worker_fast = fast
+    if use_cache:
+        from mediainfo_cache import MediaInfoCache
+        try:
+            _worker_cache = MediaInfoCache()
+        except Exception as e:
+            print(f"Cache MediaInfo non disponibile: {e}", file=sys.stderr)
+
+
+class TMDbSelection:
+    """Esito della risoluzione TMDb di un file"""
+
+    __slots__ = ("result", "content_type", "review", "episode")
+
+    def __init__(self, result=None, content_type=None, review=None, episode=None):
+        self.result = result              # risultato applicato (None se nessuno)
+        self.content_type = content_type  # "movie" o "tv"
+        self.review = review              # candidati ordinati se il file è ambiguo
+        self.episode = episode            # dati TMDb dell'episodio (solo serie)
+
+
+def open_tmdb_client(out=sys.stdout):
+    """Client TMDb con cache delle risposte e indice locale dei titoli
+
+    Returns
+    -------
+    TMDbClient
+        None se non ci sono né chiave TMDb né indice locale. Va chiuso con `close_tmdb_client`.
+    """
+    from title_index import open_title_index
+    from tmdb_client import TMDbClient, read_tmdb_api_key
+
+    api_key = read_tmdb_api_key()
+    index = open_title_index()
+    if not api_key and index is None:
+        print("⚠️ Chiave TMDb non configurata: nomi generati dalle sole informazioni dei file", file=out)
+        return None
+
+    cache = None
+    if TMDB_CACHE_CONFIG["enabled"]:
+        from tmdb_cache import TMDbCache
+        try:
+            cache = TMDbCache()
+        except Exception as e:
+            print(f"Cache TMDb non disponibile: {e}", file=out)
+
+    # Senza chiave si lavora solo con l'indice locale dei titoli
+    return TMDbClient(api_key, cache=cache, index=index, offline=True if not api_key else None)
+
+
+def close_tmdb_client(client):
+    """Chiude il client aperto con `open_tmdb_client` insieme a cache e indice"""
+    client.close()
+    if client.cache:
+        client.cache.close()
+    if client.index is not None:
+        client.index.close()
+
+
+def resolve_tmdb(paths, out=sys.stdout, client=None):
+    """Cerca su TMDb i titoli di tutti i file in un'unica fase concorrente
+
+    Le ricerche vengono deduplicate (gli episodi di una serie ne fanno una sola) ed
+    eseguite in parallelo entro il limite di frequenza del client. Il risultato migliore
+    viene applicato solo se la sua confidenza supera la soglia di TMDB_MATCH_CONFIG;
+    i file ambigui restano da rivedere. Per le serie risolte si scaricano poi i dettagli
+    di ogni stagione presente (una richiesta per stagione, non per episodio).
+
+    Con `client` (aperto con `open_tmdb_client`) si riusa un client già pronto, che resta aperto;
+    altrimenti se ne apre uno per la chiamata.
+
+    Returns
+    -------
+    list
+        Un TMDbSelection per file, nello stesso ordine dei percorsi.
+    """
+    from release_tokenizer import tokenize_release_name
+    from scene_namer import search_query
+    from series_resolver import find_episode, group_episodes
+    from tmdb_matcher import select_match
+    from tmdb_resolver import SearchQuery, fetch_seasons, resolve_queries
+
+    queries = []
+    for path in paths:
+        with metrics.stage("normalize", file=path):
+            title, year, content_type = search_query(os.path.basename(path))
+        queries.append(SearchQuery(content_type, title, year))
+
+    owned = client is None
+    if owned:
+        client = open_tmdb_client(out)
+    if client is None:
+        return [TMDbSelection(content_type=query.endpoint) for query in queries]
+
+    seasons = {}
+    start = time.perf_counter()
+    try:
+        results = resolve_queries(client, queries)
+
+        selections = []
+        for path, query, results_for_path in zip(paths, queries, results):
+            selection = TMDbSelection(content_type=query.endpoint)
+            if isinstance(results_for_path, Exception):
+                print(f"⚠️ TMDb {os.path.basename(path)}: {results_for_path}", file=out)
+            elif results_for_path:
+                selection.result, ranked = select_match(results_for_path, query.title, query.year, query.endpoint)
+                if selection.result is None:
+                    selection.review = ranked
+            selections.append(selection)
+
+        # Episodi raggruppati per serie e stagione: una sola richiesta per gruppo
+        if TMDB_CONFIG["episode_details"] and client.api_key:
+            by_path = dict(zip(paths, selections))
+            for (_show, season), group in group_episodes(paths).items():
+                show = by_path[group[0]].result
+                if show and show.get("id"):
+                    seasons.setdefault((show["id"], season), []).extend(group)
+            season_data = fetch_seasons(client, seasons)
+            for key, group in seasons.items():
+                if isinstance(season_data[key], Exception):
+                    continue
+                for path in group:
+                    episode = tokenize_release_name(os.path.splitext(os.path.basename(path))[0]).episode
+                    by_path[path].episode = find_episode(season_data[key], episode)
+    finally:
+        if owned:
+            close_tmdb_client(client)
+
+    elapsed = time.perf_counter() - start
+    distinct = len({query.key for query in queries if query.title})
+    print(f"TMDb: {len(queries)} ricerche ({distinct} distinte, {len(seasons)} stagioni) "
+          f"in {elapsed:.2f}s", file=out)
+    return selections
+
+
+def _format_candidates(ranked, limit=3):
+    from tmdb_matcher import result_title, result_year
+
+    labels = []
+    for scored in ranked[:limit]:
+        year = result_year(scored.result)
+        label = f"{result_title(scored.result)} ({year})" if year else result_title(scored.result)
+        labels.append(f"{label} {scored.score:.0%}")
+    return ", ".join(labels)
+
+
+def analyze_path(path, tmdb_result=None, content_type=None, include_meta=False):
+    """Analizza un singolo file (eseguito nei processi worker)
+
+    Returns
+    -------
+    dict
+        path, new_name, scene_title, tmdb, cache_hit, incomplete (campi non letti per il
+        limite di lettura di MediaInfo), tier (livello di analisi, vedi tiered_analysis),
+        timings (secondi reali e CPU per fase, da registrare nel processo principale) ed
+        eventuale error.
+        Con include_meta anche meta, i metadati da cui derivano i nomi.
+    """
+    from scene_namer import compute_metadata, name_file, tmdb_corrected_name
+    from tiered_analysis import analyze_media
+
+    timings = {}
+    result = {"path": path, "new_name": None, "scene_title": None, "tmdb": None, "cache_hit": False,
+              "incomplete": [], "tier": None, "timings": timings, "error": None}
+    try:
+        with measure(timings, "stat"):
+            st = os.stat(path)
+        with measure(timings, "mediainfo"):
+            # Il file si legge solo se il nome non dichiara tutti i campi del naming
+            profile = analyze_media(path, _worker_cache, _worker_fast, st)
+        result["incomplete"] = profile.incomplete
+        result["tier"] = profile.tier
+        if include_meta:
+            result["field_tiers"] = profile.field_tiers
+        result["cache_hit"] = profile.cache_hit
+        corrected_name = None
+        if tmdb_result:
+            result["tmdb"] = tmdb_corrected_name(tmdb_result, content_type, path)
+            corrected_name = result["tmdb"] + ".mkv"
+        with measure(timings, "metadata"):
+            meta = compute_metadata(profile, path)
+        if include_meta:
+            result["meta"] = meta
+        with measure(timings, "naming"):
+            result["new_name"], result["scene_title"] = name_file(profile, path, corrected_name=corrected_name,
+                                                                  meta=meta)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def apply_rename(result):
+    """Rinomina il file nella stessa cartella; ritorna un messaggio di errore o None"""
+    current_path = Path(result["path"])
+    new_path = current_path.parent / result["new_name"]
+    if new_path == current_path:
+        return None
+    if new_path.exists():
+        return ERROR_MESSAGES["file_exists"]
+    try:
+        current_path.rename(new_path)
+    except OSError as e:
+        return f"{ERROR_MESSAGES['rename_error']} {e}"
+    return None
+
+
+def _apply_renames(renames, out):
+    # Tutti i nomi vengono verificati prima di toccare il disco, poi applicati con il journal
+    from rename_plan import build_plan, apply_plan
+
+    plan = build_plan(renames)
+    journal_path = apply_plan(plan)
+    failed = plan.conflicts + [op for op in plan.ops if op.error]
+    for op in failed:
+        print(f"❌ {op.source}: {op.error}", file=out)
+    renamed = sum(op.done for op in plan.ops)
+    print(f"\n{renamed} file rinominati, {len(failed)} non rinominati", file=out)
+    if journal_path:
+        print(f"Journal: {journal_path} (annulla con: python -m mkv_rename_assistant undo)", file=out)
+    return len(failed)
+
+
+class _InProcessExecutor:
+    # Stessa interfaccia del pool per un solo file o worker: nessun processo da avviare
+    def __init__(self, use_cache, fast):
+        _init_worker(use_cache, fast)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, *iterables, chunksize=1):
+        return map(fn, *iterables)
+
+
+def _analysis_executor(workers, use_cache, fast):
+    if workers == 1:
+        return _InProcessExecutor(use_cache, fast)
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(use_cache, fast))
+
+
+def run_batch(root_dir, workers=None, apply=False, use_cache=True, tmdb=False, timings=False, fast=False,
+              out=sys.stdout):
+    """Analizza tutti i file della cartella e stampa (o applica) le rinomine
+
+    Con fast MediaInfo usa parse_speed e limite di lettura della modalità veloce
+    (MEDIAINFO_PARSE_CONFIG): i campi rimasti incompleti vengono indicati file per file.
+
+    Returns
+    -------
+    int
+        Numero di file andati in errore.
+    """
+    file_filter = MediaFileFilter()
+    paths = find_media_files(root_dir, file_filter)
+    if file_filter.skipped:
+        print(f"Scartati prima dell'analisi: {file_filter.summary()}", file=out)
+    if not paths:
+        print(f"Nessun file supportato trovato in {root_dir}", file=out)
+        return 0
+
+    workers = min(workers or BATCH_CONFIG["workers"] or os.cpu_count() or 1, len(paths))
+    use_cache = use_cache and MEDIAINFO_CACHE_CONFIG["enabled"]
+    errors = 0
+    cache_hits = 0
+    to_review = 0
+    partial = 0
+    tiers = [0, 0, 0]
+    renames = []
+    start = time.perf_counter()
+
+    # Le ricerche TMDb dipendono solo dai nomi dei file: si risolvono tutte prima dell'analisi
+    selections = resolve_tmdb(paths, out) if tmdb else [TMDbSelection()] * len(paths)
+    tmdb_results = [selection.result for selection in selections]
+    content_types = [selection.content_type for selection in selections]
+
+    with _analysis_executor(workers, use_cache, fast) as executor:
+        results = executor.map(analyze_path, paths, tmdb_results, content_types,
+                               chunksize=BATCH_CONFIG["chunksize"])
+        for result, selection in zip(results, selections):
+            cache_hits += result["cache_hit"]
+            metrics.record_all(result["timings"], file=result["path"], cache_hit=result["cache_hit"])
+            if result["error"]:
+                errors += 1
+                print(f"❌ {result['path']}: {result['error']}", file=out)
+                continue
+
+            print(f"{result['path']}\n  -> {result['new_name']}\n  Titolo Tracker: {result['scene_title']}", file=out)
+            tiers[result["tier"]] += 1
+            if result["incomplete"]:
+                partial += 1
+                print(f"  ⚠ Analisi parziale (limite di lettura), mancano: {', '.join(result['incomplete'])}",
+                      file=out)
+            if result["tmdb"]:
+                print(f"  TMDb: {result['tmdb']}", file=out)
+            if selection.episode and selection.episode.get("name"):
+                print(f"  Episodio: {selection.episode['name']}", file=out)
+            if selection.review:
+                # Ambiguo: non viene rinominato, la scelta spetta all'utente
+                to_review += 1
+                print(f"  ⏸ TMDb ambiguo, da rivedere: {_format_candidates(selection.review)}", file=out)
+                continue
+            renames.append((result["path"], result["new_name"]))
+
+    if apply and renames:
+        errors += _apply_renames(renames, out)
+
+    elapsed = time.perf_counter() - start
+    rate = len(paths) / elapsed if elapsed > 0 else float(len(paths))
+    print(f"\n{len(paths)} file analizzati in {elapsed:.2f}s "
+          f"({rate:.1f} file/s, {workers} worker, {errors} errori)", file=out)
+    print(f"Analisi: {tiers[0]} dal solo nome, {tiers[1]} dall'header Matroska, {tiers[2]} con MediaInfo",
+          file=out)
+    if use_cache:
+        print(f"Cache MediaInfo: {cache_hits} hit, {tiers[2] - cache_hits} miss", file=out)
+    if partial:
+        print(f"{partial} file con analisi MediaInfo parziale", file=out)
+    if to_review:
+        print(f"{to_review} file con risultato TMDb ambiguo da rivedere (non rinominati)", file=out)
+    if timings:
+        print(f"\nTempi per fase:\n{metrics.format_summary()}", file=out)
+    metrics.flush()
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="mkv_rename_assistant batch",
+        description="Rinomina in blocco i file video di una cartella secondo le regole della scena")
+    parser.add_argument("directory", help="Cartella da scansionare (ricorsivamente) o singolo file")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Numero di processi worker (default: numero di core)")
+    parser.add_argument("--apply", action="store_true",
+                        help="Applica le rinomine (default: mostra solo i nuovi nomi)")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                        help="Ignora la cache MediaInfo e rianalizza tutti i file")
+    parser.add_argument("--fast", action="store_true",
+                        help="Analisi MediaInfo veloce: meno byte letti per file, bitrate stimati "
+                             "(MEDIAINFO_PARSE_CONFIG)")
+    parser.add_argument("--tmdb", action="store_true",
+                        help="Corregge titolo e anno con TMDb (ricerche deduplicate e in parallelo)")
+    parser.add_argument("--timings", action="store_true",
+                        help="Mostra i tempi per fase (p50/p95/p99 e quota di CPU)")
+    parser.add_argument("--metrics-log", metavar="FILE", default=None,
+                        help="Scrive una riga JSON per ogni fase misurata (\"-\" = stderr)")
+    parser.add_argument("--metrics-textfile", metavar="FILE", default=None,
+                        help="Esporta le misure in formato Prometheus (textfile collector di node_exporter)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.directory):
+        parser.error(f"Cartella o file non trovato: {args.directory}")
+    if args.metrics_log:
+        metrics.log_file = args.metrics_log
+    if args.metrics_textfile:
+        metrics.textfile = args.metrics_textfile
+
+    errors = run_batch(args.directory, workers=args.workers, apply=args.apply, use_cache=args.use_cache,
+                       tmdb=args.tmdb, timings=args.timings, fast=args.fast)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
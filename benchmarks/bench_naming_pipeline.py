@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark delle euristiche di naming, senza GUI
+
+Ogni funzione viene eseguita su fixture MediaInfo registrate (XML come quello salvato dalla
+cache, in benchmarks/fixtures/mediainfo) e su un corpus di nomi file reali
+(benchmarks/fixtures/scene_names.txt): REMUX, WEB-DL, WEBRip, ENCODE, DV/HDR e serie.
+Per ogni funzione si riportano il tempo per chiamata (ns/op, migliore fra le ripetizioni)
+e la memoria allocata: picco durante una chiamata e memoria che resta allocata dopo.
+
+Uso:
+    python benchmarks/bench_naming_pipeline.py [--cold] [--repeat 5] [--filter NOME]
+                                               [--save risultati.json] [--compare base.json]
+
+Con --cold le cache LRU (tokenizer e normalizzazione) vengono scavalcate: si misura il costo
+di un nome mai visto, come in un batch; senza, lo stato stazionario della GUI.
+Con --compare il processo termina con codice 1 se una funzione è più lenta della base
+oltre la tolleranza (default 20%).
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scene_namer  # noqa: E402
+from media_profile import MediaProfile  # noqa: E402
+from release_tokenizer import tokenize_release_name  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_names(path=None):
+    """Nomi file del corpus (righe vuote e commenti esclusi)"""
+    path = path or os.path.join(FIXTURES_DIR, "scene_names.txt")
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def load_profiles(directory=None):
+    """(percorso, MediaProfile) per ogni fixture MediaInfo, come dopo l'analisi di un file reale"""
+    from pymediainfo import MediaInfo
+
+    directory = directory or os.path.join(FIXTURES_DIR, "mediainfo")
+    profiles = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.xml"))):
+        with open(path, encoding="utf-8") as f:
+            mediainfo = MediaInfo(f.read())
+        profiles.append((mediainfo.tracks[0].complete_name, MediaProfile.from_mediainfo(mediainfo)))
+    return profiles
+
+
+def build_benchmarks(profiles, names):
+    """Funzione misurata -> lista di chiamate senza argomenti (una per input)"""
+    stems = [os.path.splitext(name)[0] for name in names]
+    metas = [scene_namer.compute_metadata(profile, path) for path, profile in profiles]
+    titles = [scene_namer.extract_title_year(meta.get("basename", "")) for meta in metas]
+    releases = [tokenize_release_name(os.path.splitext(os.path.basename(path))[0]) for path, _ in profiles]
+    return {
+        "compute_metadata": [lambda p=p, f=f: scene_namer.compute_metadata(p, f) for f, p in profiles],
+        "is_remux": [lambda p=p, r=r: scene_namer.is_remux(p, r) for (_, p), r in zip(profiles, releases)],
+        "hdr_info": [lambda p=p, m=m: scene_namer.hdr_info(p.main_video, m.get("basename", ""))
+                     for (_, p), m in zip(profiles, metas)],
+        "normalize_title_for_search": [lambda s=name: scene_namer.normalize_title_for_search(s) for name in names],
+        "extract_title_year": [lambda s=stem: scene_namer.extract_title_year(s) for stem in stems],
+        "build_scene_name": [lambda m=m: scene_namer.build_scene_name(m) for m in metas],
+        "scene_compliant_title": [lambda m=m, t=t: scene_namer.scene_compliant_title(m, t[0], t[1])
+                                  for m, t in zip(metas, titles)],
+        "name_file": [lambda p=p, f=f: scene_namer.name_file(p, f) for f, p in profiles],
+    }
+
+
+class _Uncached:
+    # Sostituisce le funzioni memoizzate usate da scene_namer con le versioni senza cache
+    _names = ("tokenize_release_name", "normalize_title_for_search")
+
+    def __enter__(self):
+        self._saved = {name: getattr(scene_namer, name) for name in self._names}
+        for name, func in self._saved.items():
+            setattr(scene_namer, name, func.__wrapped__)
+        return self
+
+    def __exit__(self, *exc):
+        for name, func in self._saved.items():
+            setattr(scene_namer, name, func)
+
+
+def measure_time(calls, repeat):
+    """Nanosecondi per chiamata (migliore fra `repeat` ripetizioni)"""
+    def run():
+        for call in calls:
+            call()
+
+    timer = timeit.Timer(run)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / (number * len(calls)) * 1e9
+
+
+def measure_memory(calls):
+    """(picco medio, memoria trattenuta media) in byte per chiamata"""
+    peak_total = retained_total = 0
+    for call in calls:
+        tracemalloc.start()
+        call()
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_total += peak
+        retained_total += retained
+    return peak_total / len(calls), retained_total / len(calls)
+
+
+def run_benchmarks(cold=False, repeat=5, pattern=None):
+    profiles = load_profiles()
+    names = load_names()
+    results = {}
+    with _Uncached() if cold else contextlib.nullcontext():
+        for label, calls in build_benchmarks(profiles, names).items():
+            if pattern and pattern not in label:
+                continue
+            for call in calls:
+                call()  # riscaldamento: cache e allocazioni una tantum fuori dalla misura
+            ns_per_op = measure_time(calls, repeat)
+            peak, retained = measure_memory(calls)
+            results[label] = {"inputs": len(calls), "ns_per_op": ns_per_op,
+                              "peak_bytes": peak, "retained_bytes": retained}
+    return results
+
+
+def print_results(results, baseline=None, out=sys.stdout):
+    print("%-32s %6s %12s %12s %12s%s" % ("funzione", "input", "ns/op", "picco B/op", "tratt. B/op",
+                                          "   vs base" if baseline else ""), file=out)
+    for label, result in results.items():
+        line = "%-32s %6d %12.0f %12.0f %12.0f" % (label, result["inputs"], result["ns_per_op"],
+                                                    result["peak_bytes"], result["retained_bytes"])
+        if baseline and label in baseline:
+            change = result["ns_per_op"] / baseline[label]["ns_per_op"] - 1
+            line += "   %+7.1f%%" % (change * 100)
+        print(line, file=out)
+
+
+def regressions(results, baseline, tolerance):
+    """Funzioni più lente della base oltre la tolleranza (frazione, es. 0.2 = 20%)"""
+    return [label for label, result in results.items()
+            if label in baseline and result["ns_per_op"] > baseline[label]["ns_per_op"] * (1 + tolerance)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cold", action="store_true", help="scavalca le cache LRU (nomi mai visti)")
+    parser.add_argument("--repeat", type=int, default=5, help="ripetizioni (si tiene la migliore)")
+    parser.add_argument("--filter", default=None, help="misura solo le funzioni che contengono il testo")
+    parser.add_argument("--save", metavar="FILE", help="salva i risultati in JSON")
+    parser.add_argument("--compare", metavar="FILE", help="confronta con risultati salvati in precedenza")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="rallentamento tollerato con --compare")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(cold=args.cold, repeat=args.repeat, pattern=args.filter)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print("Python %s, %s" % (sys.version.split()[0], "cache LRU scavalcate" if args.cold else "cache LRU attive"))
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "cold": args.cold, "results": results}, f, indent=2)
+
+    if baseline:
+        slower = regressions(results, baseline, args.tolerance)
+        if slower:
+            print("\nRegressioni oltre il %.0f%%: %s" % (args.tolerance * 100, ", ".join(slower)))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
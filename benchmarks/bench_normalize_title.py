@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark della normalizzazione dei titoli per la ricerca TMDb
+
+Confronta il vecchio ciclo di re.sub (un passaggio per pattern) con l'alternanza
+precompilata di scene_namer, su un corpus sintetico di nomi file.
+
+Uso:
+    python benchmarks/bench_normalize_title.py [--count 100000] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scene_namer import SEARCH_TAG_PATTERNS, normalize_title_for_search  # noqa: E402
+
+TITLES = (
+    "The Nice Guys", "Senza Sangue", "Black Dog", "The Midnight Club", "Il Gattopardo",
+    "Dune Part Two", "La Vita e Bella", "Blade Runner", "Oppenheimer", "The Last of Us",
+    "Amici Miei", "Star Wars Episode IV", "Full Metal Jacket", "E T", "Mad Max Fury Road",
+)
+TAGS = (
+    "1080p", "2160p", "720p", "BluRay", "WEB-DL", "WEBRip", "REMUX", "x264", "x265", "HEVC",
+    "H.264", "DDP5.1", "DD5.1", "TrueHD.Atmos.7.1", "DTS-HD.MA", "AAC", "HDR10", "DV",
+    "ITA", "ENG", "ITALIAN-ENGLISH", "AMZN", "NF", "DSNP", "PROPER", "EXTENDED", "UHD", "SUBS",
+)
+GROUPS = ("GROUP", "SHiNeR", "MIRCrew", "Dr4gon", "NoGroup", "FGT", "c0ke")
+SEPARATORS = (".", " ", "_")
+
+
+def build_corpus(count, seed=42):
+    """Genera `count` nomi file realistici (film ed episodi, con e senza anno)"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        parts = [rng.choice(TITLES)]
+        if rng.random() < 0.8:
+            parts.append(str(rng.randint(1950, 2025)))
+        if rng.random() < 0.3:
+            parts.append("S%02dE%02d" % (rng.randint(1, 9), rng.randint(1, 24)))
+        parts.extend(rng.sample(TAGS, rng.randint(2, 7)))
+        sep = rng.choice(SEPARATORS)
+        name = sep.join(" ".join(parts).split(" ")) + "-" + rng.choice(GROUPS)
+        corpus.append(name + rng.choice((".mkv", ".mp4")))
+    return corpus
+
+
+def legacy_normalize(filename):
+    """Implementazione precedente: un re.sub per ogni pattern"""
+    name = os.path.splitext(filename)[0]
+    name = re.sub(r'\b\d+\.\d+\b', '', name)
+    name = re.sub(r'[._\-\(\)\[\]]+', ' ', name)
+    year_match = re.search(r'\b(19|20)\d{2}\b', name)
+    if year_match:
+        title_raw = name[:year_match.start()].strip()
+        has_year = True
+    else:
+        title_raw = name.strip()
+        has_year = False
+    title_cleaned = title_raw
+    for pattern in SEARCH_TAG_PATTERNS:
+        title_cleaned = re.sub(pattern, '', title_cleaned, flags=re.IGNORECASE)
+    title_cleaned = re.sub(r'\s+', ' ', title_cleaned).strip()
+    if not has_year:
+        words = title_cleaned.split()
+        if words:
+            last_word = words[-1]
+            has_uppercase = any(c.isupper() for c in last_word)
+            has_digits = any(c.isdigit() for c in last_word)
+            has_lowercase = any(c.islower() for c in last_word)
+            looks_like_group = (
+                len(last_word) >= 2
+                and not last_word.isdigit()
+                and (
+                    (has_uppercase and (has_digits or has_lowercase))
+                    or (has_digits and has_lowercase and not has_uppercase)
+                )
+            )
+            if looks_like_group:
+                words.pop()
+        title_cleaned = ' '.join(words).strip()
+    result = re.sub(r'\s+', ' ', title_cleaned).strip()
+    if not result or len(result) < 2:
+        result = os.path.splitext(filename)[0]
+        result = re.sub(r'[._-]', ' ', result)
+        result = re.sub(r'\s+', ' ', result).strip()
+    return result
+
+
+def _run_legacy(corpus):
+    for name in corpus:
+        legacy_normalize(name)
+
+
+def _run_scanner(corpus):
+    # Senza memo: misura solo il costo della scansione
+    normalize = normalize_title_for_search.__wrapped__
+    for name in corpus:
+        normalize(name)
+
+
+def _run_memoized(corpus):
+    for name in corpus:
+        normalize_title_for_search(name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000, help="numero di nomi nel corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="ripetizioni (si tiene la migliore)")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.count)
+    mismatches = [name for name in corpus if legacy_normalize(name) != normalize_title_for_search(name)]
+    if mismatches:
+        print("Output diverso per %d nomi, es. %r" % (len(mismatches), mismatches[0]))
+        return 1
+
+    print("Corpus: %d nomi (%d distinti)" % (len(corpus), len(set(corpus))))
+    for label, func in (("re.sub per pattern", _run_legacy),
+                        ("alternanza precompilata", _run_scanner),
+                        ("alternanza + LRU", _run_memoized)):
+        normalize_title_for_search.cache_clear()
+        best = min(timeit.repeat(lambda: func(corpus), number=1, repeat=args.repeat))
+        print("%-26s %10.0f nomi/s" % (label, len(corpus) / best))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
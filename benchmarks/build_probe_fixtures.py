@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+"""
+Genera le fixture Matroska di mkv_probe dalle fixture MediaInfo XML
+
+Per ogni fixture di benchmarks/fixtures/mediainfo con formato Matroska scrive in
+benchmarks/fixtures/mkv un file con lo stesso nome (.mkv) che contiene solo l'header: Segment
+Info, Tracks, Tags con le statistiche di mkvmerge e un Cluster con il primo fotogramma video.
+Il fotogramma ha i parameter set (SPS/PPS, VPS per HEVC) e i SEI che l'encoder scrive davvero:
+firma x264/x265 con le opzioni, mastering display (HDR10) e ST 2094-40 (HDR10+); la slice è
+sostituita da byte di riempimento. Dolby Vision è nel BlockAdditionMapping (dvcC/dvvC).
+
+Le tracce audio restano fuori: formato E-AC-3/DTS (Atmos, DTS-HD) si legge solo dal flusso e
+mkv_probe lascia quei file a MediaInfo. I file generati sono nel repository: va rieseguito
+solo se cambiano le fixture XML.
+
+Uso:
+    python benchmarks/build_probe_fixtures.py
+"""
+
+import glob
+import os
+import re
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mkv_probe as mkv  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Elementi scritti che mkv_probe non legge
+EBML_VERSION = 0x4286
+EBML_READ_VERSION = 0x42F7
+EBML_MAX_ID_LENGTH = 0x42F2
+EBML_MAX_SIZE_LENGTH = 0x42F3
+DOC_TYPE_VERSION = 0x4287
+DOC_TYPE_READ_VERSION = 0x4285
+SEGMENT_UID = 0x73A4
+FLAG_LACING = 0x9C
+DISPLAY_WIDTH = 0x54B0
+DISPLAY_HEIGHT = 0x54BA
+MATRIX_COEFFICIENTS = 0x55B1
+RANGE = 0x55B9
+BLOCK_ADD_ID_NAME = 0x41A4
+CLUSTER_TIMESTAMP = 0xE7
+
+# Codec ID Matroska per formato MediaInfo
+VIDEO_CODEC_IDS = {"AVC": "V_MPEG4/ISO/AVC", "HEVC": "V_MPEGH/ISO/HEVC", "MPEG-4 Visual": "V_MS/VFW/FOURCC"}
+
+# Lingue ISO 639-1 delle fixture -> codici Matroska
+LANGUAGE_CODES = {code: language for language, code in mkv.LANGUAGES.items() if len(language) == 3}
+LANGUAGE_CODES.update({"en": "eng", "it": "ita", "de": "ger", "fr": "fre", "ja": "jpn"})
+
+# Nomi dei colori MediaInfo -> codici H.273
+PRIMARIES = {name: code for code, name in mkv.COLOUR_PRIMARIES.items()}
+TRANSFERS = {name: code for code, name in mkv.TRANSFER_CHARACTERISTICS.items()}
+
+# Compatibilità del base layer Dolby Vision -> dv_bl_signal_compatibility_id
+DOLBY_VISION_COMPATIBILITY = {"HDR10": 1, "SDR": 2, "HLG": 4, "Blu-ray": 6}
+
+X264_SIGNATURE = ("{name} - {version} - H.264/MPEG-4 AVC codec - Copyleft 2003-2022 - "
+                  "http://www.videolan.org/x264.html - options: {options}")
+X265_SIGNATURE = ("{name} (build 199) - {version} - H.265/HEVC codec - Copyright 2013-2018 (c) Multicoreware, "
+                  "Inc - http://x265.org - options: {options}")
+
+# UUID dei SEI user_data_unregistered di x264 e x265
+X264_UUID = bytes.fromhex("dc45e9bde6d948b7962cd820d923eeef")
+X265_UUID = bytes.fromhex("2ca2de09b51747dbbb55a4fe7fc2fc4e")
+
+# ITU-T T.35 Samsung, ST 2094-40 (HDR10+), application version 1
+HDR10_PLUS_HEADER = bytes.fromhex("b5003c000104") + b"\x01"
+
+# Statistiche di mkvmerge: senza _STATISTICS_* MediaInfo ignora BPS
+STATISTICS_TAGS = "BPS DURATION NUMBER_OF_FRAMES NUMBER_OF_BYTES"
+STATISTICS_DATE = "2024-05-01 12:00:00"
+
+
+# --- EBML ------------------------------------------------------------------------------------
+
+def _size(value):
+    length = next(length for length in range(1, 9) if value < (1 << (7 * length)) - 1)
+    return ((1 << (7 * length)) | value).to_bytes(length, "big")
+
+
+def element(element_id, *children):
+    payload = b"".join(children)
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + _size(len(payload)) + payload
+
+
+def uint(element_id, value):
+    return element(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+def string(element_id, value):
+    return element(element_id, value.encode("utf-8"))
+
+
+def double(element_id, value):
+    return element(element_id, struct.pack(">d", value))
+
+
+# --- Bitstream H.264 / H.265 -------------------------------------------------------------------
+
+class BitWriter:
+    def __init__(self):
+        self.bits = []
+
+    def u(self, bits, value):
+        self.bits.extend((value >> shift) & 1 for shift in range(bits - 1, -1, -1))
+        return self
+
+    def ue(self, value):
+        value += 1
+        return self.u(2 * value.bit_length() - 1, value)
+
+    def se(self, value):
+        return self.ue(2 * value - 1 if value > 0 else -2 * value)
+
+    def rbsp(self):
+        # rbsp_trailing_bits: un bit a 1 e allineamento al byte
+        bits = self.bits + [1]
+        bits += [0] * (-len(bits) % 8)
+        return bytes(int("".join(map(str, bits[pos:pos + 8])), 2) for pos in range(0, len(bits), 8))
+
+
+def nal(header, rbsp):
+    # Byte di emulation prevention: 00 00 seguito da 00-03 diventa 00 00 03 xx
+    out = bytearray(header)
+    zeros = 0
+    for byte in rbsp:
+        if zeros >= 2 and byte <= 3:
+            out.append(3)
+            zeros = 0
+        out.append(byte)
+        zeros = zeros + 1 if byte == 0 else 0
+    return bytes(out)
+
+
+def sei(header, messages):
+    payload = bytearray()
+    for payload_type, data in messages:
+        for value in (payload_type, len(data)):
+            payload += b"\xff" * (value // 255) + bytes([value % 255])
+        payload += data
+    return nal(header, bytes(payload) + b"\x80")
+
+
+def _vui_colour(bits, primaries, transfer):
+    bits.u(1, 0).u(1, 0)  # aspect_ratio_info, overscan_info
+    bits.u(1, 1).u(3, 5).u(1, 0).u(1, 1)  # video_signal_type: formato non specificato, limited range
+    matrix = 9 if primaries == 9 else 1
+    bits.u(8, primaries).u(8, transfer).u(8, matrix)
+
+
+def _colour(video):
+    # Senza colori nella fixture un flusso HDR è comunque BT.2020/PQ (MediaInfo lo richiede per le compatibilità)
+    default_primaries, default_transfer = (9, 16) if video.hdr_format else (2, 2)
+    return (PRIMARIES.get(video.color_primaries, default_primaries),
+            TRANSFERS.get(video.transfer_characteristics, default_transfer))
+
+
+def avc_parameter_sets(video, profile_idc, level_idc, ref_frames, cabac):
+    bit_depth = int(video.bit_depth or 8)
+    width_mbs = (video.width + 15) // 16
+    height_mbs = (video.height + 15) // 16
+    bits = BitWriter().u(8, profile_idc).u(8, 0).u(8, level_idc).ue(0)
+    if profile_idc in mkv._AVC_HIGH_PROFILES:
+        bits.ue(1).ue(bit_depth - 8).ue(bit_depth - 8).u(1, 0).u(1, 0)
+    bits.ue(0).ue(0).ue(2).ue(ref_frames).u(1, 0).ue(width_mbs - 1).ue(height_mbs - 1).u(1, 1).u(1, 1)
+    crop_right, crop_bottom = width_mbs * 16 - video.width, height_mbs * 16 - video.height
+    if crop_right or crop_bottom:
+        bits.u(1, 1).ue(0).ue(crop_right // 2).ue(0).ue(crop_bottom // 2)
+    else:
+        bits.u(1, 0)
+    bits.u(1, 1)
+    _vui_colour(bits, *_colour(video))
+    bits.u(1, 0).u(1, 0).u(1, 0).u(1, 0).u(1, 0).u(1, 0)  # chroma_loc, timing, hrd, pic_struct, restriction
+    sps = nal(b"\x67", bits.rbsp())
+    pps = nal(b"\x68", BitWriter().ue(0).ue(0).u(1, int(cabac)).u(1, 0).ue(0).ue(0).ue(0).u(1, 0).u(2, 0)
+              .se(0).se(0).se(0).u(1, 1).u(1, 0).u(1, 0).rbsp())
+    return sps, pps
+
+
+def avcc(sps, pps, bit_depth):
+    record = bytes([1, sps[1], sps[2], sps[3], 0xFF, 0xE1]) + len(sps).to_bytes(2, "big") + sps
+    record += b"\x01" + len(pps).to_bytes(2, "big") + pps
+    if sps[1] in mkv._AVC_HIGH_PROFILES:
+        record += bytes([0xFD, 0xF8 | (bit_depth - 8), 0xF8 | (bit_depth - 8), 0])
+    return record
+
+
+def _hevc_profile_tier_level(bits, profile_idc, tier, level_idc):
+    bits.u(2, 0).u(1, tier).u(5, profile_idc).u(32, 1 << (31 - profile_idc))
+    bits.u(1, 1).u(1, 0).u(1, 0).u(1, 1).u(44, 0).u(8, level_idc)
+
+
+def hevc_parameter_sets(video, profile_idc, tier, level_idc):
+    bit_depth = int(video.bit_depth or 8)
+    vps = BitWriter().u(4, 0).u(1, 1).u(1, 1).u(6, 0).u(3, 0).u(1, 1).u(16, 0xFFFF)
+    _hevc_profile_tier_level(vps, profile_idc, tier, level_idc)
+    vps.u(1, 1).ue(4).ue(2).ue(0).u(6, 0).ue(0).u(1, 0).u(1, 0)
+
+    sps = BitWriter().u(4, 0).u(3, 0).u(1, 1)
+    _hevc_profile_tier_level(sps, profile_idc, tier, level_idc)
+    sps.ue(0).ue(1).ue(video.width).ue(video.height).u(1, 0).ue(bit_depth - 8).ue(bit_depth - 8).ue(4)
+    sps.u(1, 1).ue(4).ue(2).ue(0)
+    sps.ue(0).ue(3).ue(0).ue(3).ue(0).ue(0)
+    sps.u(1, 0).u(1, 0).u(1, 1).u(1, 0).ue(0).u(1, 0).u(1, 1).u(1, 1).u(1, 1)
+    _vui_colour(sps, *_colour(video))
+    sps.u(1, 0).u(1, 0).u(1, 0).u(1, 0).u(1, 0).u(1, 0).u(1, 0)  # chroma_loc ... bitstream_restriction
+    sps.u(1, 0)  # sps_extension_present_flag
+
+    pps = BitWriter().ue(0).ue(0).u(1, 0).u(1, 0).u(3, 0).u(1, 0).u(1, 0).ue(0).ue(0).se(0).u(1, 0).u(1, 0)
+    pps.u(1, 0).se(0).se(0).u(1, 0).u(1, 0).u(1, 0).u(1, 0).u(1, 0).u(1, 0).u(1, 0).u(1, 0).u(1, 0).u(1, 0)
+    pps.ue(0).u(1, 0).u(1, 0)
+    return nal(b"\x40\x01", vps.rbsp()), nal(b"\x42\x01", sps.rbsp()), nal(b"\x44\x01", pps.rbsp())
+
+
+def hvcc(vps, sps, pps, profile_idc, tier, level_idc, bit_depth):
+    record = bytes([1, (tier << 5) | profile_idc]) + (1 << (31 - profile_idc)).to_bytes(4, "big")
+    record += bytes([0x90, 0, 0, 0, 0, 0, level_idc, 0xF0, 0, 0xFC, 0xFD, 0xF8 | (bit_depth - 8),
+                     0xF8 | (bit_depth - 8), 0, 0, 0x0F, 3])
+    for nal_type, unit in ((32, vps), (33, sps), (34, pps)):
+        record += bytes([0x80 | nal_type]) + b"\x00\x01" + len(unit).to_bytes(2, "big") + unit
+    return record
+
+
+def _signature(video, hevc):
+    # Firma dell'encoder: writing library delle fixture senza il separatore " - " di MediaInfo
+    if not video.writing_library or not video.writing_library.startswith(("x264 ", "x265 ")):
+        return None
+    name, version = video.writing_library.split(" ", 1)
+    options = " ".join((video.encoding_settings or "").split(" / "))
+    template = X265_SIGNATURE if hevc else X264_SIGNATURE
+    return (X265_UUID if hevc else X264_UUID) + template.format(name=name, version=version, options=options).encode() + b"\x00"
+
+
+def _mastering_display():
+    # Primari BT.2020 (G, B, R), bianco D65, luminanza 1000 / 0.0001 cd/m²
+    values = (8500, 39850, 6550, 2300, 35400, 14600, 15635, 16450)
+    return struct.pack(">8HII", *values, 10000000, 1)
+
+
+def _hdr10_plus():
+    # ST 2094-40 con una finestra e curva di Bézier (tone mapping): MediaInfo lo riporta come Profile B
+    bits = BitWriter().u(2, 1).u(27, 400).u(1, 0)
+    for value in (40000, 38000, 36000, 9000):  # maxscl RGB, average_maxrgb
+        bits.u(17, value)
+    percentiles = ((1, 10), (5, 100), (10, 500), (25, 2000), (50, 8000), (75, 15000), (90, 25000),
+                   (95, 30000), (99, 38000))
+    bits.u(4, len(percentiles))
+    for percentage, percentile in percentiles:
+        bits.u(7, percentage).u(17, percentile)
+    bits.u(10, 0).u(1, 0)
+    bits.u(1, 1).u(12, 1000).u(12, 1500).u(4, 9)  # tone_mapping_flag, knee point, anchors
+    for anchor in range(9):
+        bits.u(10, 100 * (anchor + 1))
+    bits.u(1, 0)  # color_saturation_mapping_flag
+    return HDR10_PLUS_HEADER + bits.rbsp()
+
+
+def first_frame(video, hevc, hdr):
+    units = []
+    messages = []
+    signature = _signature(video, hevc)
+    if signature:
+        messages.append((5, signature))
+    if hevc:
+        if "HDR10" in hdr:
+            messages.append((137, _mastering_display()))
+        if "SMPTE ST 2094" in hdr:
+            messages.append((4, _hdr10_plus()))
+        if messages:
+            units.append(sei(b"\x4e\x01", messages))
+        units.append(b"\x26\x01" + b"\xaf" * 64)  # slice IDR_W_RADL
+    else:
+        if messages:
+            units.append(sei(b"\x06", messages))
+        units.append(b"\x65" + b"\x88" * 64)  # slice IDR
+    return b"".join(len(unit).to_bytes(4, "big") + unit for unit in units)
+
+
+def _level(text):
+    return float(text.rstrip("b"))
+
+
+def _dolby_vision(video):
+    """BlockAdditionMapping Dolby Vision dalla stringa HDR_Format_Profile (es. dvhe.07)"""
+    match = re.search(r"dv(?:he|av)\.(\d+)", video.hdr_format_profile or "")
+    if not match:
+        return b""
+    profile = int(match.group(1))
+    level = int(re.search(r"dv(?:he|av)\.\d+\.(\d+)", video.hdr_format or "").group(1))
+    enhancement_layer = "BL+EL+RPU" in (video.hdr_format or "")
+    compatibility = DOLBY_VISION_COMPATIBILITY.get((video.hdr_format_compatibility or "").split(" / ")[0], 0)
+    config = bytes([1, 0, (profile << 1) | (level >> 5), ((level & 31) << 3) | 4 | (enhancement_layer << 1) | 1,
+                    compatibility << 4]) + bytes(19)
+    box = b"dvcC" if profile <= 7 else b"dvvC"
+    return element(mkv.BLOCK_ADDITION_MAPPING, string(BLOCK_ADD_ID_NAME, box.decode()),
+                   uint(mkv.BLOCK_ADD_ID_TYPE, int.from_bytes(box, "big")), element(mkv.BLOCK_ADD_ID_EXTRA_DATA, config))
+
+
+def video_track(video, uid):
+    """(TrackEntry, primo fotogramma) della traccia video della fixture"""
+    hevc = video.format == "HEVC"
+    hdr = "%s / %s" % (video.hdr_format, video.hdr_format_compatibility)
+    codec_private = b""
+    frame = b""
+    if video.format == "AVC":
+        name, level = video.format_profile.split("@L")
+        profile_idc = {value: key for key, value in mkv.AVC_PROFILES.items()}[name]
+        settings = video.format_settings or ""
+        ref_frames = int(re.search(r"(\d+) Ref Frames", settings).group(1)) if "Ref Frames" in settings else 4
+        sps, pps = avc_parameter_sets(video, profile_idc, round(_level(level) * 10), ref_frames, "CABAC" in settings)
+        codec_private = avcc(sps, pps, int(video.bit_depth or 8))
+        frame = first_frame(video, False, hdr)
+    elif hevc:
+        name, level, tier = video.format_profile.split("@")
+        profile_idc = {value: key for key, value in mkv.HEVC_PROFILES.items()}[name]
+        tier = int(tier == "High")
+        level_idc = round(_level(level[1:]) * 30)
+        vps, sps, pps = hevc_parameter_sets(video, profile_idc, tier, level_idc)
+        codec_private = hvcc(vps, sps, pps, profile_idc, tier, level_idc, int(video.bit_depth or 8))
+        frame = first_frame(video, True, hdr)
+    else:
+        # BITMAPINFOHEADER di Video for Windows: mkv_probe lascia il file a MediaInfo
+        fourcc = (video.codec_id or "XVID").encode()
+        codec_private = struct.pack("<IiiHH4sIiiII", 40, video.width, video.height, 1, 24, fourcc,
+                                    video.width * video.height * 3, 0, 0, 0, 0)
+        frame = b"\x00\x00\x01\xb6" + b"\x10" * 64
+
+    primaries, transfer = _colour(video)
+    frame_rate = float(video.frame_rate or 25)
+    entry = element(
+        mkv.TRACK_ENTRY,
+        uint(mkv.TRACK_NUMBER, 1),
+        uint(mkv.TRACK_UID, uid),
+        uint(mkv.TRACK_TYPE, 1),
+        uint(FLAG_LACING, 0),
+        string(mkv.LANGUAGE, "und"),
+        string(mkv.CODEC_ID, VIDEO_CODEC_IDS[video.format]),
+        element(mkv.CODEC_PRIVATE, codec_private),
+        uint(mkv.DEFAULT_DURATION, round(1001e9 / 24000) if abs(frame_rate - 23.976) < 0.001 else round(1e9 / frame_rate)),
+        element(mkv.VIDEO,
+                uint(mkv.PIXEL_WIDTH, video.width),
+                uint(mkv.PIXEL_HEIGHT, video.height),
+                uint(DISPLAY_WIDTH, video.width),
+                uint(DISPLAY_HEIGHT, video.height),
+                element(mkv.COLOUR,
+                        uint(MATRIX_COEFFICIENTS, 9 if primaries == 9 else 1),
+                        uint(RANGE, 1),
+                        uint(mkv.TRANSFER, transfer),
+                        uint(mkv.PRIMARIES, primaries))),
+        _dolby_vision(video))
+    return entry, frame
+
+
+def text_track(text, number, uid):
+    children = [
+        uint(mkv.TRACK_NUMBER, number),
+        uint(mkv.TRACK_UID, uid),
+        uint(mkv.TRACK_TYPE, 17),
+        uint(FLAG_LACING, 0),
+        string(mkv.LANGUAGE, LANGUAGE_CODES.get(text.language, "und")),
+        string(mkv.CODEC_ID, text.codec_id),
+    ]
+    if text.title:
+        children.append(string(mkv.NAME, text.title))
+        if text.title == "Forced":
+            children.append(uint(mkv.FLAG_FORCED, 1))
+    return element(mkv.TRACK_ENTRY, *children)
+
+
+def statistics_tag(uid, bit_rate, duration_ms, frame_rate, writing_application):
+    frames = round(duration_ms / 1000 * frame_rate)
+    values = {
+        "BPS": str(bit_rate),
+        "DURATION": "%02d:%02d:%02d.000000000" % (duration_ms // 3600000, duration_ms // 60000 % 60,
+                                                  duration_ms // 1000 % 60),
+        "NUMBER_OF_FRAMES": str(frames),
+        "NUMBER_OF_BYTES": str(bit_rate * duration_ms // 8000),
+        "_STATISTICS_WRITING_APP": writing_application,
+        "_STATISTICS_WRITING_DATE_UTC": STATISTICS_DATE,
+        "_STATISTICS_TAGS": STATISTICS_TAGS,
+    }
+    return element(mkv.TAG, element(mkv.TARGETS, uint(mkv.TAG_TRACK_UID, uid)),
+                   *(element(mkv.SIMPLE_TAG, string(mkv.TAG_NAME, name), string(mkv.TAG_STRING, value))
+                     for name, value in values.items()))
+
+
+def build_fixture(mediainfo):
+    """File Matroska (solo header e primo fotogramma) con le tracce video e sottotitoli della fixture"""
+    general = mediainfo.general_tracks[0]
+    video = mediainfo.video_tracks[0]
+    texts = mediainfo.text_tracks
+
+    video_uid = 0x1000
+    entry, frame = video_track(video, video_uid)
+    entries = [entry] + [text_track(text, index + 2, video_uid + index + 1) for index, text in enumerate(texts)]
+
+    info = element(
+        mkv.INFO,
+        element(SEGMENT_UID, bytes(range(16))),
+        uint(mkv.TIMESTAMP_SCALE, 1000000),
+        double(mkv.DURATION, float(general.duration)),
+        string(mkv.MUXING_APP, general.writing_library),
+        string(mkv.WRITING_APP, general.writing_application))
+    tags = element(mkv.TAGS, statistics_tag(video_uid, video.bit_rate, general.duration,
+                                            float(video.frame_rate or 25), general.writing_application))
+    block = _size(1)[:1] + b"\x00\x00\x80" + frame  # traccia 1, timestamp 0, keyframe
+    cluster = element(mkv.CLUSTER, uint(CLUSTER_TIMESTAMP, 0), element(mkv.SIMPLE_BLOCK, block))
+
+    header = element(
+        mkv.EBML_HEADER,
+        uint(EBML_VERSION, 1), uint(EBML_READ_VERSION, 1), uint(EBML_MAX_ID_LENGTH, 4),
+        uint(EBML_MAX_SIZE_LENGTH, 8), string(mkv.DOC_TYPE, "matroska"), uint(DOC_TYPE_VERSION, 4),
+        uint(DOC_TYPE_READ_VERSION, 2))
+    return header + element(mkv.SEGMENT, info, element(mkv.TRACKS, *entries), tags, cluster)
+
+
+def main():
+    from pymediainfo import MediaInfo
+
+    output_dir = os.path.join(FIXTURES_DIR, "mkv")
+    os.makedirs(output_dir, exist_ok=True)
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "mediainfo", "*.xml"))):
+        with open(path, encoding="utf-8") as f:
+            mediainfo = MediaInfo(f.read())
+        if mediainfo.general_tracks[0].format != "Matroska" or not mediainfo.video_tracks:
+            continue
+        data = build_fixture(mediainfo)
+        target = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + ".mkv")
+        with open(target, "wb") as f:
+            f.write(data)
+        print("%-40s %6d byte" % (os.path.relpath(target, FIXTURES_DIR), len(data)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Confronto fra mkv_probe e le fixture MediaInfo sui campi del naming
+
+Per ogni fixture di benchmarks/fixtures/mediainfo con un file Matroska omonimo in
+benchmarks/fixtures/mkv (generati da build_probe_fixtures.py) costruisce il MediaProfile dal
+report XML e dalla lettura dell'header con mkv_probe e confronta i campi da cui dipende il nome:
+risoluzione, codec e profilo, impostazioni AVC, bit depth, HDR/Dolby Vision, writing library
+e impostazioni dell'encoder, bitrate video, applicazione e libreria di muxing, e i metadati
+calcolati da compute_metadata. Le
+fixture che mkv_probe deve lasciare a MediaInfo (DECLINED) devono sollevare ProbeUnsupported.
+
+Le fixture .mkv hanno solo le tracce video e sottotitoli: l'audio E-AC-3/DTS si legge solo dal
+flusso e mkv_probe lo lascia comunque a MediaInfo. Le fixture XML riportano la writing library
+video senza il separatore " - " che MediaInfo scrive dopo il nome dell'encoder (x264 - core ...):
+il confronto lo ignora.
+
+Uso:
+    python benchmarks/check_probe.py [--verbose]
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT_DIR, "benchmarks", "fixtures")
+
+sys.path.insert(0, ROOT_DIR)
+
+# Fixture che mkv_probe non deve leggere (codec fuori dal formato dell'header)
+DECLINED = ("dvdrip_xvid",)
+
+# Chiavi di compute_metadata che dipendono dalla traccia video
+METADATA_KEYS = ("resolution", "type", "source", "video_codec", "video_format", "hdr_info")
+
+
+def _writing_library(value):
+    # "x264 - core 164" (MediaInfo, mkv_probe) e "x264 core 164" (fixture XML) sono la stessa firma
+    return (value or "").replace(" - ", " ", 1) or None
+
+
+def naming_fields(profile, general, settings):
+    """Campi della traccia video, applicazione di muxing e metadati da cui dipende il nome"""
+    from scene_namer import _has_encoded_writing_library, compute_metadata, hdr_info
+
+    video = profile.main_video
+    fields = {
+        "width": video.width,
+        "height": video.height,
+        "format": video.format,
+        "format_profile": video.format_profile,
+        "format_settings": video.format_settings_lc,
+        "bit_depth": int(video.bit_depth) if video.bit_depth else None,
+        "bit_rate": video.bit_rate,
+        "hdr_info": hdr_info(video, ""),
+        "hdr_format_profile": video.hdr_format_profile,
+        "writing_library": _writing_library(video.writing_library),
+        "encoded_library_settings": settings,
+        "encoded": _has_encoded_writing_library(video),
+    }
+    fields["general.writing_application"] = general.writing_application
+    fields["general.writing_library"] = general.writing_library
+    meta = compute_metadata(profile, profile.file_name + ".mkv")
+    fields.update(("meta." + key, meta.get(key)) for key in METADATA_KEYS)
+    return fields
+
+
+def check_fixture(xml_path, mkv_path):
+    """Differenze (campo, MediaInfo, mkv_probe) fra la fixture XML e la lettura dell'header"""
+    from pymediainfo import MediaInfo
+    from media_profile import MediaProfile
+    from mkv_probe import probe_file
+
+    with open(xml_path, encoding="utf-8") as f:
+        mediainfo = MediaInfo(f.read())
+    expected_profile = MediaProfile.from_mediainfo(mediainfo)
+    xml_video = mediainfo.video_tracks[0]
+    expected = naming_fields(expected_profile, mediainfo.general_tracks[0],
+                             xml_video.encoded_library_settings or xml_video.encoding_settings)
+
+    result = probe_file(mkv_path)
+    probed_profile = MediaProfile.from_mediainfo(result)
+    probed_profile.file_name = expected_profile.file_name
+    probed = naming_fields(probed_profile, result.tracks[0], probed_profile.main_video.encoded_library_settings)
+    return [(name, expected[name], probed.get(name)) for name in expected if expected[name] != probed.get(name)], probed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--verbose", action="store_true", help="elenca i campi letti da ogni fixture")
+    args = parser.parse_args(argv)
+
+    from mkv_probe import ProbeUnsupported
+
+    failed = False
+    checked = 0
+    for xml_path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "mediainfo", "*.xml"))):
+        name = os.path.splitext(os.path.basename(xml_path))[0]
+        mkv_path = os.path.join(FIXTURES_DIR, "mkv", name + ".mkv")
+        if not os.path.exists(mkv_path):
+            continue
+        checked += 1
+        try:
+            differences, probed = check_fixture(xml_path, mkv_path)
+        except ProbeUnsupported as e:
+            if name in DECLINED:
+                print("%-28s ok (lasciato a MediaInfo: %s)" % (name, e))
+            else:
+                print("%-28s ERRORE: mkv_probe non legge il file (%s)" % (name, e))
+                failed = True
+            continue
+        if name in DECLINED:
+            print("%-28s ERRORE: mkv_probe dovrebbe lasciare il file a MediaInfo" % name)
+            failed = True
+            continue
+        if differences:
+            print("%-28s ERRORE" % name)
+            for field, expected, actual in differences:
+                print("    %-28s MediaInfo %r, mkv_probe %r" % (field, expected, actual))
+            failed = True
+        else:
+            print("%-28s ok" % name)
+        if args.verbose:
+            for field, value in probed.items():
+                print("    %-28s %r" % (field, value))
+
+    if not checked:
+        print("Nessuna fixture in %s: eseguire benchmarks/build_probe_fixtures.py" % os.path.join(FIXTURES_DIR, "mkv"))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Budget del tempo di import all'avvio dei comandi senza GUI
+
+Rinomina (in anteprima, senza cache) un singolo file MKV vuoto in una cartella temporanea,
+come farebbe un hook del client di download, in un processo nuovo avviato con
+`python -X importtime`, e somma il tempo speso negli import dei moduli. Si tiene la
+migliore fra le ripetizioni; gli import dell'interprete (`site`, pacchetti .pth) non
+contano. Il controllo fallisce se il totale supera il budget o se vengono caricati moduli
+che un comando senza GUI non deve importare (tkinter, requests).
+
+Uso:
+    python benchmarks/check_startup.py [--budget-ms 120] [--repeat 5] [--top 15]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Moduli che la rinomina di un file senza GUI non deve caricare (nemmeno indirettamente)
+FORBIDDEN = ("tkinter", "_tkinter", "requests", "urllib3")
+
+
+def parse_importtime(stderr):
+    """Righe di -X importtime -> lista di (modulo, µs propri, µs cumulativi, profondità)"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def run_once(command, env):
+    """Esegue il comando e ritorna (secondi totali del processo, import registrati)"""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-m", "mkv_rename_assistant"] + command,
+                               cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               text=True, encoding="utf-8", errors="replace")
+    return time.perf_counter() - start, parse_importtime(completed.stderr)
+
+
+def application_imports(imports):
+    """Import di primo livello dovuti all'applicazione (esclusi quelli dell'interprete)"""
+    # L'interprete importa tutto ciò che precede `site` (compreso); runpy esegue -m
+    names = [entry[0] for entry in imports]
+    first = names.index("site") + 1 if "site" in names else 0
+    return [entry for entry in imports[first:] if entry[3] == 0 and entry[0] != "runpy"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=120.0, help="tempo massimo degli import (ms)")
+    parser.add_argument("--repeat", type=int, default=5, help="ripetizioni (si tiene la migliore)")
+    parser.add_argument("--top", type=int, default=15, help="moduli più lenti da elencare")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        media_path = os.path.join(temp_dir, "Movie.2024.1080p.WEB-DL.mkv")
+        open(media_path, "wb").close()
+        # Configurazione utente nella cartella temporanea: nessun journal o cache reale toccati
+        env = dict(os.environ, XDG_CONFIG_HOME=temp_dir, APPDATA=temp_dir)
+        command = ["batch", media_path, "--no-cache"]
+
+        best = None
+        for _ in range(args.repeat):
+            elapsed, imports = run_once(command, env)
+            own = application_imports(imports)
+            total_us = sum(entry[2] for entry in own)
+            if best is None or total_us < best[0]:
+                best = (total_us, elapsed, imports, own)
+
+    total_us, elapsed, imports, own = best
+    print("Python %s, mkv_rename_assistant batch <file> --no-cache" % sys.version.split()[0])
+    print("Import dell'applicazione: %.1f ms (budget %.0f ms), processo completo: %.1f ms"
+          % (total_us / 1000, args.budget_ms, elapsed * 1000))
+    print("\n%-40s %10s" % ("modulo (cumulativo)", "ms"))
+    for name, _self_us, cumulative_us, _depth in sorted(own, key=lambda entry: -entry[2])[:args.top]:
+        print("%-40s %10.1f" % (name, cumulative_us / 1000))
+
+    failed = False
+    loaded = {entry[0] for entry in imports}
+    forbidden = sorted(name for name in loaded if name.split(".")[0] in FORBIDDEN)
+    if forbidden:
+        print("\nModuli da non importare senza GUI: %s" % ", ".join(forbidden))
+        failed = True
+    if total_us / 1000 > args.budget_ms:
+        print("\nBudget superato: %.1f ms > %.0f ms" % (total_us / 1000, args.budget_ms))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
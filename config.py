@@ -96,10 +96,15 @@ RENAME_CONFIG = {
         "japanese": "JAPANESE"
     },
     
-    # Pattern per titoli da escludere
+    # Pattern per file da escludere (nome senza estensione, maiuscole ignorate): solo il
+    # suffisso -sample/-trailer, mai una parola del titolo (es. Extra.Ordinary.2019)
     "exclude_title_patterns": [
-        r"^(sample|trailer|preview)",
-        r"(bonus|extra|deleted.scenes)"
+        r"(^|[-._ ])(sample|trailer)$"
+    ],
+    
+    # Cartelle da escludere: il nome intero della cartella deve corrispondere
+    "exclude_dir_patterns": [
+        r"samples?|trailers?|extras?|featurettes?|bonus|deleted[-._ ]scenes"
     ],
     
     # Separatori permessi nel nome finale
@@ -108,7 +113,7 @@ RENAME_CONFIG = {
     # Estensioni supportate
     "supported_extensions": [".mkv", ".mp4", ".avi"],
     
-    # Dimensione minima file (in MB) per essere considerato un film
+    # Dimensione minima file (in MB) per essere considerato un film (gli episodi non hanno limite)
     "min_movie_size_mb": 500
 }
 
@@ -119,6 +124,10 @@ GUI_CONFIG = {
     "font_family": "Arial",
     "font_size": 10,
     "info_text_height": 10,
+    # Thread per analisi MediaInfo e ricerche TMDb in background
+    "analysis_workers": 2,
+    # Intervallo (ms) con cui la GUI controlla i risultati dei worker
+    "poll_interval_ms": 100,
     "supported_filetypes": [
         ("File MKV", "*.mkv"),
         ("File Video", "*.mkv *.mp4 *.avi"),
@@ -134,8 +143,11 @@ ERROR_MESSAGES = {
     "mediainfo_error": "MediaInfo non trovato. Assicurati che sia installato.",
     "rename_error": "Errore durante la rinomina:",
     "file_exists": "Un file con questo nome esiste già!",
+    "duplicate_target": "Più file avrebbero lo stesso nome!",
+    "circular_rename": "Rinomina circolare: i file si scambierebbero i nomi",
     "no_new_name": "Genera prima il nuovo nome!",
-    "invalid_extension": "Il file deve avere estensione .mkv"
+    "invalid_extension": "Il file deve avere estensione .mkv",
+    "tmdb_unavailable": "TMDb non raggiungibile: il nome viene generato dalle sole informazioni del file."
 }
 
 # Messaggi di successo
@@ -143,4 +155,217 @@ SUCCESS_MESSAGES = {
     "analysis_complete": "File analizzato con successo!",
     "rename_complete": "File rinominato con successo!",
     "name_generated": "Nome generato secondo le regole della scena"
-}
\ No newline at end of file
+}
+
+# Configurazioni modalità batch (headless)
+BATCH_CONFIG = {
+    # Numero di processi worker (None = numero di core disponibili)
+    "workers": None,
+    
+    # File assegnati a ciascun worker per volta
+    "chunksize": 4
+}
+
+# Cache persistente delle analisi MediaInfo (SQLite nella cartella utente)
+MEDIAINFO_CACHE_CONFIG = {
+    # Disabilita per forzare sempre una nuova analisi
+    "enabled": True,
+    
+    # Nome del database nella cartella di configurazione utente
+    "filename": "mediainfo_cache.sqlite3",
+    
+    # Dimensione massima dei dati in cache (in MB): oltre, si eliminano le voci più vecchie
+    "max_size_mb": 256
+}
+
+# Analisi MediaInfo: precisione delle stime contro byte letti (conta su dischi di rete)
+MEDIAINFO_PARSE_CONFIG = {
+    # ParseSpeed di MediaInfo (0-1): valori bassi leggono meno dati, con stime di bitrate meno precise
+    "parse_speed": 0.5,
+    
+    # Byte letti al massimo per file (in MB, None = nessun limite): oltre, MediaInfo conclude con i dati letti
+    "max_read_mb": None,
+    
+    # Opzioni aggiuntive di MediaInfo (es. {"File_TestContinuousFileNames": "0"}); se presenti,
+    # le analisi dello stesso processo vengono eseguite una alla volta
+    "options": {},
+    
+    # Chiede a MediaInfo solo i campi usati (template Inform) invece del report XML completo
+    "lean": True,
+    
+    # Valori usati dalla modalità veloce (batch --fast)
+    "fast_parse_speed": 0.0,
+    "fast_max_read_mb": 16
+}
+
+# Lettura diretta dell'header Matroska prima di MediaInfo (vedi mkv_probe.py)
+MKV_PROBE_CONFIG = {
+    # Disabilita per analizzare sempre i file con MediaInfo
+    "enabled": True,
+    
+    # Estensioni lette direttamente; gli altri formati passano sempre da MediaInfo
+    "extensions": (".mkv", ".webm"),
+    
+    # Byte letti all'inizio del file e all'inizio del primo cluster (in KB)
+    "window_kb": 64,
+    
+    # Byte letti al massimo per file (in KB): oltre, si usa MediaInfo
+    "max_read_kb": 512
+}
+
+# Analisi a livelli (vedi tiered_analysis.py): nome del file, header Matroska, MediaInfo
+TIERED_ANALYSIS_CONFIG = {
+    # Disabilita per leggere sempre il file anche quando il nome dichiara tutti i campi
+    "enabled": True,
+    
+    # Richiede anche le lingue audio nel nome (usate dal titolo tracker): senza, si legge il file
+    "require_languages": True
+}
+
+# Client TMDb: connessioni persistenti, limite di frequenza e retry
+TMDB_CONFIG = {
+    "base_url": "https://api.themoviedb.org/3",
+    "language": "it-IT",
+    
+    # Timeout (in secondi) di ogni richiesta
+    "timeout": 10,
+    
+    # Connessioni keep-alive tenute aperte verso TMDb
+    "pool_size": 10,
+    
+    # Limite di frequenza (TMDb tollera circa 50 richieste/s): media e raffica massima
+    "requests_per_second": 40,
+    "burst": 20,
+    
+    # Tentativi su 429/5xx ed errori di rete, con attesa esponenziale (in secondi) e jitter
+    "max_retries": 4,
+    "backoff_base": 0.5,
+    "backoff_max": 30,
+    
+    # Dopo N errori consecutivi TMDb è considerato non disponibile per reset_timeout secondi
+    "failure_threshold": 5,
+    "reset_timeout": 60,
+    
+    # Ricerche contemporanee nella risoluzione in blocco (modalità batch)
+    "concurrency": 8,
+    
+    # Scarica i titoli degli episodi (una richiesta per stagione di ogni serie)
+    "episode_details": True
+}
+
+# Cache persistente delle risposte TMDb (SQLite nella cartella utente)
+TMDB_CACHE_CONFIG = {
+    "enabled": True,
+    "filename": "tmdb_cache.sqlite3",
+    
+    # Dopo questo tempo (in ore) una risposta viene rivalidata con TMDb (ETag)
+    "ttl_hours": 72,
+    
+    # Le voci non aggiornate da più di questi giorni vengono eliminate
+    "max_age_days": 90,
+    
+    # Modalità offline: nessuna richiesta di rete, si usano anche le risposte scadute
+    "offline": False
+}
+
+# Selezione automatica del risultato TMDb (punteggio di confidenza 0-1)
+TMDB_MATCH_CONFIG = {
+    # Con False viene sempre mostrato il dialog di selezione
+    "auto_accept": True,
+    
+    # Punteggio minimo del migliore risultato e distacco minimo dal secondo
+    "threshold": 0.85,
+    "margin": 0.1,
+    
+    # Peso di ciascun segnale (l'anno conta solo se presente nel nome del file)
+    "weights": {
+        "title": 0.6,
+        "year": 0.25,
+        "popularity": 0.1,
+        "type": 0.05
+    }
+}
+
+# Indice locale dei titoli (costruito dai dump di IMDb/TMDb, vedi title_index.py)
+TITLE_INDEX_CONFIG = {
+    "enabled": True,
+    "filename": "title_index.bin",
+    
+    # Se il titolo coincide con un solo titolo dell'indice non si interroga TMDb
+    "prefer_local": True,
+    
+    # Risultati massimi di una ricerca nell'indice
+    "max_results": 10
+}
+
+# Modalità watch: cartelle di download osservate (vedi watch_folder.py)
+WATCH_CONFIG = {
+    # Secondi in cui dimensione e data di modifica devono restare invariate prima di elaborare il file
+    "settle_seconds": 10,
+    
+    # File gemelli lasciati dai client durante il download (es. film.mkv.part)
+    "partial_extensions": [".part", ".!qB", ".crdownload", ".tmp"],
+    
+    # Usa inotify su Linux; altrimenti (o se non disponibile) controllo periodico
+    "use_inotify": True,
+    
+    # Intervallo del controllo periodico (in secondi)
+    "poll_interval": 30
+}
+
+# Journal delle rinomine in blocco (vedi rename_plan.py)
+RENAME_JOURNAL_CONFIG = {
+    # Sottocartella della cartella di configurazione utente
+    "directory": "rename_journals",
+    
+    # Rinomine registrate e sincronizzate su disco (fsync) per volta
+    "fsync_batch": 256,
+    
+    # Journal conservati per l'annullamento (i più vecchi vengono eliminati)
+    "keep": 20
+}
+
+# Misure dei tempi per fase della pipeline (vedi metrics.py)
+METRICS_CONFIG = {
+    # Righe JSON (una per fase misurata) in questo file; "-" = stderr, None = disattivato
+    "log_file": None,
+    
+    # File .prom per il textfile collector di node_exporter (None = disattivato)
+    "textfile": None,
+    
+    # Limiti superiori (in secondi) dei bucket dell'istogramma dei tempi
+    "buckets": [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+    
+    # Ultimi campioni conservati per fase, su cui si calcolano p50/p95/p99
+    "samples": 2048
+}
+
+# Servizio HTTP locale per script di post-elaborazione e client di download (vedi naming_service.py)
+SERVICE_CONFIG = {
+    # Indirizzo e porta di ascolto (di default solo connessioni locali)
+    "host": "127.0.0.1",
+    "port": 8765,
+    
+    # Richieste elaborate contemporaneamente (None = numero di core)
+    "workers": None,
+    
+    # Secondi di attesa per un worker libero, poi si risponde 503
+    "queue_timeout": 30,
+    
+    # Richieste al secondo accettate, con raffiche fino a "burst" (None = nessun limite); oltre si risponde 429
+    "requests_per_second": None,
+    "burst": 20,
+    
+    # Dimensione massima del corpo JSON di una richiesta (in byte)
+    "max_body_bytes": 65536,
+    
+    # Token richiesto nell'header "Authorization: Bearer ..." (None = nessuno; anche da MKV_RENAME_TOKEN)
+    "token": None,
+    
+    # Cartelle in cui si trovano i file accettati dal servizio ([] = nessuna restrizione)
+    "allowed_roots": [],
+    
+    # Nomi aggiuntivi accettati nell'header Host oltre a indirizzo di ascolto, localhost e nome
+    # della macchina (es. un alias in /etc/hosts); gli altri domini vengono rifiutati
+    "allowed_hosts": []
+}
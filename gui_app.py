@@ -0,0 +1,1050 @@
+# -*- coding: utf-8 -*-
+"""
+MKV Rename Assistant - GUI Application
+Rinomina file MKV secondo le regole della scena basandosi sul codice SHRI
+
+Caricato da mkv_rename_assistant.main solo quando si apre la finestra: i comandi
+senza GUI non importano tkinter, requests e i client TMDb
+"""
+
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import os
+import re
+import sys
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import json
+import requests
+from config import RENAME_CONFIG, GUI_CONFIG, ERROR_MESSAGES, SUCCESS_MESSAGES, MEDIAINFO_CACHE_CONFIG, TMDB_CONFIG, TMDB_CACHE_CONFIG
+from scene_namer import SceneNamer, search_query
+from mediainfo_cache import MediaInfoCache, parse_media
+from metrics import metrics
+from tmdb_cache import TMDbCache
+from tmdb_client import TMDbClient, TMDbUnavailable
+from tmdb_matcher import select_match
+from series_resolver import SeriesResolver
+from title_index import open_title_index
+import configparser
+
+# Load TMDb API key from environment or config file
+def load_tmdb_api_key(tk):
+    CONFIG_FILENAME = 'config.ini'
+    """Carica la chiave TMDb da variabile d'ambiente o file config
+    
+    Parameters
+    ----------
+    tk (tkinter): 
+        The main Tkinter window object.
+
+    Returns
+    -------
+    str
+        The loaded TMDb API key.
+    """
+    # PRIORITÀ 1: Variabile d'ambiente (per deploy/CI-CD)
+    api_key = os.getenv('TMDB_API_KEY', '').strip()
+    if api_key:
+        return api_key
+    
+    # PRIORITÀ 2: File config locale (INI style)
+    config = configparser.ConfigParser()
+    config.optionxform = str # mantiene il casing delle chiavi
+    config.sections()
+    try:
+        config.read(CONFIG_FILENAME)
+        api_key = config['DEFAULT']['TmdbApiKey']
+    except:
+        # la chiave 'TmdbApiKey' o il file INI non esiste, lo creo
+        open(CONFIG_FILENAME, 'w').close()
+    else:
+        if api_key:
+            return api_key
+    
+    api_key = tk.prompt_for_tmdb_key()
+    # TODO controllare che la chiave sia valida
+    if api_key:
+        config['DEFAULT']['TmdbApiKey'] = api_key
+        with open(CONFIG_FILENAME, 'w') as configfile:
+            config.write(configfile)
+        return api_key
+    
+    # PRIORITÀ 3: Se non trovata o vuota, ritorna stringa vuota
+    return None
+
+class MKVRenameAssistant(SceneNamer):
+    def __init__(self, root):
+        SceneNamer.__init__(self)
+        self.root = root
+        self.root.title(GUI_CONFIG["window_title"])
+        self.root.geometry(GUI_CONFIG["window_size"])
+        self.root.resizable(True, True)
+        
+        # Variabili
+        self.current_file = tk.StringVar()
+        self.current_name = tk.StringVar()
+        self.new_name = tk.StringVar()
+        self.scene_title = tk.StringVar()
+        
+        # Cache delle analisi MediaInfo (se non disponibile si analizza sempre il file)
+        self.mediainfo_cache = None
+        if MEDIAINFO_CACHE_CONFIG["enabled"]:
+            try:
+                self.mediainfo_cache = MediaInfoCache()
+            except Exception as e:
+                print(f"Cache MediaInfo non disponibile: {e}")
+        
+        # Cache delle risposte TMDb (ricerche ripetute senza traffico di rete)
+        self.tmdb_cache = None
+        if TMDB_CACHE_CONFIG["enabled"]:
+            try:
+                self.tmdb_cache = TMDbCache()
+            except Exception as e:
+                print(f"Cache TMDb non disponibile: {e}")
+        
+        # Indice locale dei titoli (None finché non viene costruito con "index build")
+        self.title_index = open_title_index()
+        
+        # Serie risolte in questa sessione: valgono per tutti i loro episodi
+        self.series_resolver = SeriesResolver()
+        
+        # TMDb API configuration - Carica da ambiente/config o chiedi all'utente
+        self.TMDB_API_KEY = load_tmdb_api_key(self)
+        # Client condiviso dai worker: connessioni riutilizzate, retry e limite di frequenza
+        self.tmdb_client = None
+        self._tmdb_client_lock = threading.Lock()
+        
+        # Se non trovata, chiedi all'utente
+        #if not self.TMDB_API_KEY:
+        #    self._prompt_for_tmdb_key()
+        
+        # Analisi in background: i worker postano i risultati in coda,
+        # il thread Tk li preleva con root.after e li mostra uno alla volta
+        self.executor = ThreadPoolExecutor(max_workers=GUI_CONFIG["analysis_workers"])
+        self.result_queue = queue.Queue()
+        self.active_jobs = []
+        self.pending_reviews = deque()
+        self._reviewing = False
+        self._jobs_total = 0
+        self._jobs_done = 0
+        
+        self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.root.after(GUI_CONFIG["poll_interval_ms"], self._poll_results)
+    
+    def _current_path(self):
+        return self.current_file.get()
+    
+    def prompt_for_tmdb_key(self):
+        """Chiede all'utente di inserire la chiave TMDb se non trovata"""
+        from tkinter import simpledialog, messagebox
+        
+        msg = "Chiave TMDb non trovata!\n\n" \
+            "Inserisci la tua chiave API TMDb:\n" \
+            "(Puoi ottenerla gratuitamente da https://www.themoviedb.org/settings/api)\n\n" \
+            "La chiave verrà salvata e potrai modificarla dopo."
+        
+        api_key_input = simpledialog.askstring("TMDb API Key", msg, show='*')
+        if api_key_input is not None:
+            api_key_input = api_key_input.strip()
+        
+        if api_key_input:
+            return api_key_input
+        else:
+            retry = messagebox.askretrycancel(
+                "Attenzione",
+                "TMDb non sarà disponibile senza una chiave valida.\n"
+                "La ricerca TMDb sarà disabilitata."
+            )
+            if retry:
+                return self.prompt_for_tmdb_key()  
+            return None 
+        
+    def setup_ui(self):
+        """Configura l'interfaccia utente"""
+        
+        # Frame principale
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.grid(row=0, column=0, sticky="nsew")
+        
+        # Configurazione della griglia
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(1, weight=1)
+        
+        # Titolo
+        title_label = ttk.Label(main_frame, text="MKV Rename Assistant", 
+                               font=("Arial", 16, "bold"))
+        title_label.grid(row=0, column=0, columnspan=3, pady=(0, 20))
+        
+        # Selezione file
+        ttk.Label(main_frame, text="File MKV:").grid(row=1, column=0, sticky="w", pady=5)
+        ttk.Entry(main_frame, textvariable=self.current_file, width=60).grid(
+            row=1, column=1, sticky="ew", pady=5, padx=(10, 5))
+        ttk.Button(main_frame, text="Sfoglia...", 
+                  command=self.browse_file).grid(row=1, column=2, pady=5)
+        
+        # Nome attuale
+        ttk.Label(main_frame, text="Nome attuale:").grid(row=2, column=0, sticky="w", pady=5)
+        ttk.Entry(main_frame, textvariable=self.current_name, width=60, 
+                 state="readonly").grid(row=2, column=1, columnspan=2, 
+                                       sticky="ew", pady=5, padx=(10, 0))
+        
+        # Pulsante analizza
+        ttk.Button(main_frame, text="Analizza File", 
+                  command=self.analyze_file).grid(row=3, column=1, pady=10)
+        
+        # Frame TMDb
+        tmdb_frame = ttk.LabelFrame(main_frame, text="Ricerca TMDb", padding="5")
+        tmdb_frame.grid(row=4, column=0, columnspan=3, sticky="ew", pady=10)
+        tmdb_frame.columnconfigure(1, weight=1)
+        
+        ttk.Label(tmdb_frame, text="Tipo:").grid(row=0, column=0, sticky="w", padx=5)
+        self.content_type = tk.StringVar(value="movie")
+        ttk.Radiobutton(tmdb_frame, text="Film", variable=self.content_type, 
+                       value="movie").grid(row=0, column=1, sticky="w", padx=5)
+        ttk.Radiobutton(tmdb_frame, text="Serie TV", variable=self.content_type, 
+                       value="tv").grid(row=0, column=2, sticky="w", padx=5)
+        
+        ttk.Label(tmdb_frame, text="Titolo:").grid(row=1, column=0, sticky="w", padx=5, pady=5)
+        self.search_title = tk.StringVar()
+        ttk.Entry(tmdb_frame, textvariable=self.search_title, width=50).grid(
+            row=1, column=1, sticky="ew", padx=5, pady=5)
+        ttk.Button(tmdb_frame, text="🔍 Cerca TMDb", 
+                  command=self.search_tmdb).grid(row=1, column=2, padx=5, pady=5)
+        
+        # Separator
+        ttk.Separator(main_frame, orient='horizontal').grid(
+            row=5, column=0, columnspan=3, sticky="ew", pady=10)
+        
+        # Informazioni file
+        info_frame = ttk.LabelFrame(main_frame, text="Informazioni File", padding="10")
+        info_frame.grid(row=6, column=0, columnspan=3, sticky="nsew", pady=5)
+        info_frame.columnconfigure(1, weight=1)
+        
+        # Testo informazioni
+        self.info_text = tk.Text(info_frame, height=10, wrap=tk.WORD)
+        info_scrollbar = ttk.Scrollbar(info_frame, orient="vertical", command=self.info_text.yview)
+        self.info_text.configure(yscrollcommand=info_scrollbar.set)
+        
+        self.info_text.grid(row=0, column=0, sticky="nsew")
+        info_scrollbar.grid(row=0, column=1, sticky="ns")
+        
+        info_frame.rowconfigure(0, weight=1)
+        
+        # Separatore
+        ttk.Separator(main_frame, orient='horizontal').grid(
+            row=7, column=0, columnspan=3, sticky="ew", pady=10)
+        
+        # Nome nuovo
+        ttk.Label(main_frame, text="Nuovo nome:").grid(row=8, column=0, sticky="w", pady=5)
+        ttk.Entry(main_frame, textvariable=self.new_name, width=60).grid(
+            row=8, column=1, columnspan=2, sticky="ew", pady=5, padx=(10, 0))
+        
+        # Titolo Scene-Compliant (per tracker)
+        ttk.Label(main_frame, text="Titolo Tracker:").grid(row=9, column=0, sticky="w", pady=5)
+        self.scene_title = tk.StringVar()
+        scene_entry = ttk.Entry(main_frame, textvariable=self.scene_title, width=60, state="readonly")
+        scene_entry.grid(row=9, column=1, sticky="ew", pady=5, padx=(10, 5))
+        ttk.Button(main_frame, text="📋", width=3,
+                  command=self.copy_scene_title).grid(row=9, column=2, pady=5, padx=0)
+        
+        # Pulsanti azione
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=10, column=0, columnspan=3, pady=20)
+        
+        ttk.Button(button_frame, text="Genera Nome", 
+                  command=self.generate_name).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Rinomina File", 
+                  command=self.rename_file).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Reset", 
+                  command=self.reset_form).pack(side=tk.LEFT)
+        
+        # Stato analisi in background
+        progress_frame = ttk.Frame(main_frame)
+        progress_frame.grid(row=11, column=0, columnspan=3, sticky="ew")
+        progress_frame.columnconfigure(1, weight=1)
+        
+        self.progress_bar = ttk.Progressbar(progress_frame, mode="determinate", length=200)
+        self.progress_bar.grid(row=0, column=0, sticky="w")
+        self.progress_label = ttk.Label(progress_frame, text="")
+        self.progress_label.grid(row=0, column=1, sticky="w", padx=10)
+        self.cancel_button = ttk.Button(progress_frame, text="Annulla", 
+                                        command=self.cancel_jobs, state="disabled")
+        self.cancel_button.grid(row=0, column=2, sticky="e")
+        
+        main_frame.rowconfigure(6, weight=1)
+        
+    def browse_file(self):
+        """Apre dialog per selezionare uno o più file MKV"""
+        filenames = filedialog.askopenfilenames(
+            title="Seleziona file MKV",
+            filetypes=GUI_CONFIG["supported_filetypes"]
+        )
+        for filename in filenames:
+            # Avvia il processo automatico in background: Analisi → TMDb → Selezione
+            self._submit_job("analysis", filename, with_tmdb=True)
+    
+    def _submit_job(self, kind, file_path, **options):
+        # Accoda un'analisi (o una ricerca TMDb) sul pool di thread
+        job = dict(options, kind=kind, file=file_path, cancel=threading.Event())
+        worker = self._run_analysis_job if kind == "analysis" else self._run_search_job
+        job["future"] = self.executor.submit(worker, job)
+        self.active_jobs.append(job)
+        self._jobs_total += 1
+        self._update_progress()
+        return job
+    
+    def _run_analysis_job(self, job):
+        # Eseguito in un thread worker: nessun accesso ai widget Tk
+        try:
+            file_path = job["file"]
+            with metrics.stage("stat", file=file_path):
+                exists = bool(file_path) and os.path.exists(file_path)
+            if not exists:
+                raise FileNotFoundError(ERROR_MESSAGES["file_not_exists"])
+            
+            # Step 1: Analisi MediaInfo
+            with metrics.stage("mediainfo", file=file_path):
+                job["mediainfo_data"] = parse_media(file_path, self.mediainfo_cache)
+            
+            # Step 2: Ricerca TMDb automatica
+            if job["with_tmdb"] and not job["cancel"].is_set():
+                basename = os.path.basename(file_path)
+                # Titolo, anno e tipo (serie TV o film) determinati automaticamente dal nome
+                with metrics.stage("normalize", file=file_path):
+                    job["search_title"], job["search_year"], job["content_type"] = search_query(basename)
+                if self.TMDB_API_KEY and job["search_title"] and self.series_resolver.get(basename):
+                    # Serie già risolta: nessuna ricerca, al più la stagione (una richiesta per stagione)
+                    if TMDB_CONFIG["episode_details"]:
+                        try:
+                            job["tmdb_episode"] = self.series_resolver.episode(self._get_tmdb_client(), basename)
+                        except requests.exceptions.RequestException:
+                            pass
+                elif self.TMDB_API_KEY and job["search_title"]:
+                    try:
+                        job["tmdb_results"] = self._tmdb_search_request(
+                            job["search_title"], job["content_type"], job["search_year"])
+                    except Exception as e:
+                        job["tmdb_error"] = e
+        except Exception as e:
+            job["error"] = e
+        self.result_queue.put(job)
+    
+    def _run_search_job(self, job):
+        # Ricerca TMDb manuale eseguita in un thread worker
+        try:
+            job["tmdb_results"] = self._tmdb_search_request(job["title"], job["endpoint"])
+        except Exception as e:
+            job["error"] = e
+        self.result_queue.put(job)
+    
+    def _tmdb_search_request(self, title, endpoint, year=None):
+        # Esegue la ricerca su TMDb (filtrata per anno, se noto) e ritorna la lista dei risultati
+        return self._get_tmdb_client().search_with_year(endpoint, title, year)
+    
+    def _get_tmdb_client(self):
+        # Crea il client alla prima ricerca (o se la chiave è stata cambiata dopo l'avvio)
+        with self._tmdb_client_lock:
+            if self.tmdb_client is None or self.tmdb_client.api_key != self.TMDB_API_KEY:
+                if self.tmdb_client:
+                    self.tmdb_client.close()
+                self.tmdb_client = TMDbClient(self.TMDB_API_KEY, cache=self.tmdb_cache,
+                                              index=self.title_index)
+            return self.tmdb_client
+    
+    def _poll_results(self):
+        # Preleva i risultati dei worker (sempre sul thread Tk)
+        self.root.after(GUI_CONFIG["poll_interval_ms"], self._poll_results)
+        
+        finished = False
+        while True:
+            try:
+                job = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+            if job in self.active_jobs:
+                self.active_jobs.remove(job)
+                self._jobs_done += 1
+                finished = True
+            if not job["cancel"].is_set():
+                self.pending_reviews.append(job)
+        
+        if finished:
+            metrics.flush()
+        self._update_progress()
+        if self.pending_reviews and not self._reviewing:
+            # Callback separata: i dialog modali non bloccano il polling della coda
+            self.root.after_idle(self._review_next)
+    
+    def _update_progress(self):
+        # Aggiorna barra di avanzamento, stato e pulsante Annulla
+        running = len(self.active_jobs)
+        waiting = len(self.pending_reviews)
+        if not running:
+            self._jobs_total = self._jobs_done = 0
+        
+        self.progress_bar["value"] = 100 * self._jobs_done / self._jobs_total if self._jobs_total else 0
+        
+        status = []
+        if running:
+            status.append(f"Analisi in corso: {running} file")
+        if waiting:
+            status.append(f"in attesa di revisione: {waiting}")
+        self.progress_label.config(text=", ".join(status))
+        self.cancel_button.config(state="normal" if running or waiting else "disabled")
+    
+    def cancel_jobs(self):
+        """Annulla le analisi in corso e quelle in attesa di revisione"""
+        for job in self.active_jobs:
+            job["cancel"].set()
+            job["future"].cancel()
+        self.active_jobs.clear()
+        self.pending_reviews.clear()
+        self._update_progress()
+        self.info_text.insert(tk.END, "⚠️ Analisi annullate\n")
+    
+    def _on_close(self):
+        # Chiusura finestra: scarta i lavori pendenti senza attendere i worker
+        self.cancel_jobs()
+        self.executor.shutdown(wait=False)
+        if self.tmdb_client:
+            self.tmdb_client.close()
+        self.root.destroy()
+    
+    def _review_next(self):
+        # Mostra all'utente il prossimo risultato pronto
+        if self._reviewing or not self.pending_reviews:
+            return
+        job = self.pending_reviews.popleft()
+        self._reviewing = True
+        self._update_progress()
+        try:
+            if job["kind"] == "search":
+                self._review_search_job(job)
+            else:
+                self._review_analysis_job(job)
+        finally:
+            self._reviewing = False
+            self._update_progress()
+    
+    def _review_analysis_job(self, job):
+        """Processo automatico: Analisi → TMDb → Selezione Manuale → Attesa Genera Nome"""
+        file_path = job["file"]
+        self.current_file.set(file_path)
+        self.current_name.set(os.path.basename(file_path))
+        self.new_name.set("")
+        self.scene_title.set("")
+        self.info_text.delete(1.0, tk.END)
+        
+        if job.get("error"):
+            self.mediainfo_data = None
+            self.info_text.insert(tk.END, f"❌ Errore: {job['error']}\n")
+            if job["with_tmdb"]:
+                messagebox.showerror("Errore", f"Errore durante il processo:\n{job['error']}")
+            else:
+                messagebox.showerror("Errore", f"{ERROR_MESSAGES['analysis_error']}\n{job['error']}")
+            return
+        
+        self.mediainfo_data = job["mediainfo_data"]
+        
+        if not job["with_tmdb"]:
+            self.display_file_info()
+            messagebox.showinfo("Successo", SUCCESS_MESSAGES["analysis_complete"])
+            return
+        
+        self.info_text.insert(tk.END, "✅ Analisi MediaInfo completata\n")
+        self.search_title.set(job["search_title"])
+        self.content_type.set(job["content_type"])
+        
+        if job["search_title"]:
+            # Mostra dialog selezione sui risultati TMDb
+            self._search_and_select_tmdb(job)
+        else:
+            self.info_text.insert(tk.END, "⚠️ Nessun titolo da cercare\n")
+        
+        # Mostra informazioni complete del file
+        self.display_file_info()
+    
+    def _search_and_select_tmdb(self, job):
+        """Permette la selezione manuale del risultato TMDb corretto"""
+        title = job["search_title"]
+        try:
+            # Verifica che la chiave TMDb sia disponibile
+            if not self.TMDB_API_KEY:
+                self.info_text.insert(tk.END, "⚠️ Chiave TMDb non configurata\n")
+                messagebox.showwarning("TMDb Non Disponibile", 
+                                     "La chiave API TMDb non è stata configurata.\n"
+                                     "Puoi comunque generare il nome con le informazioni del file.")
+                return
+            
+            if job.get("tmdb_error"):
+                raise job["tmdb_error"]
+            
+            endpoint = "movie" if job["content_type"] == "movie" else "tv"
+            basename = os.path.basename(job["file"])
+            
+            # Serie già risolta per un episodio precedente: stesso risultato, nessuna ricerca né dialog
+            selected = self.series_resolver.get(basename) if endpoint == "tv" else None
+            auto_selected = selected is not None
+            if auto_selected:
+                self.info_text.insert(tk.END, f"📺 Serie già risolta: {selected.get('name') or selected.get('title', '')}\n")
+            else:
+                results = job.get("tmdb_results", [])
+                if not results:
+                    self.info_text.insert(tk.END, "⚠️ Nessun risultato TMDb trovato\n")
+                    messagebox.showinfo("TMDb", f"Nessun risultato trovato per '{title}'.\nPuoi comunque generare il nome con le informazioni attuali.")
+                    return
+                
+                self.info_text.insert(tk.END, f"✅ Trovati {len(results)} risultati TMDb\n")
+                
+                # Risultato evidente: accettato senza dialog; altrimenti sceglie l'utente (i più probabili in cima)
+                selected, ranked = select_match(results, title, job.get("search_year"), job["content_type"])
+                auto_selected = selected is not None
+                if auto_selected:
+                    self.info_text.insert(tk.END, f"🤖 Selezione automatica (confidenza {ranked[0].score:.0%})\n")
+                else:
+                    selected = self._show_tmdb_selection_dialog([scored.result for scored in ranked], endpoint)
+                if selected and endpoint == "tv":
+                    # Vale per tutti gli episodi della serie
+                    self.series_resolver.remember(basename, selected)
+            if selected:
+                # Applica correzioni TMDb e avvia automaticamente il workflow
+                corrected_name = self._apply_tmdb_correction(selected)
+                self.info_text.insert(tk.END, f"✅ TMDb selezionato: {corrected_name}\n")
+                if job.get("tmdb_episode") and job["tmdb_episode"].get("name"):
+                    self.info_text.insert(tk.END, f"📺 Episodio: {job['tmdb_episode']['name']}\n")
+                
+                # Avvia automaticamente la generazione del nome
+                self.info_text.insert(tk.END, "🎯 Generazione nome automatica...\n")
+                
+                # Genera automaticamente il nome con i dati TMDb corretti
+                try:
+                    self.generate_name()
+                    self.info_text.insert(tk.END, "✅ Nome generato con successo!\n")
+                    if auto_selected:
+                        # Nessun dialog: le selezioni automatiche non fermano la coda dei file
+                        return
+                    
+                    # Mostra il risultato all'utente (SENZA chiedere di rinominare)
+                    title_tmdb = selected.get("title") or selected.get("name", "")
+                    date = selected.get("release_date") or selected.get("first_air_date", "")
+                    year_tmdb = date.split("-")[0] if date else ""
+                    
+                    msg = f"✅ Processo completato!\n\n"
+                    msg += f"TMDb: {title_tmdb}"
+                    if year_tmdb:
+                        msg += f" ({year_tmdb})"
+                    msg += f"\n\nNuovo nome generato:\n{self.new_name.get()}"
+                    msg += f"\n\nTitolo Tracker:\n{self.scene_title.get()}"
+                    msg += "\n\nRinomina quando sei pronto usando il pulsante 'Rinomina File'"
+                    
+                    messagebox.showinfo("Ricerca e Generazione Completate", msg)
+                    
+                except Exception as e:
+                    self.info_text.insert(tk.END, f"❌ Errore generazione nome: {str(e)}\n")
+            else:
+                self.info_text.insert(tk.END, "⚠️ TMDb annullato - puoi comunque generare il nome manualmente\n")
+                
+        except TMDbUnavailable:
+            # TMDb non risponde: nome generato dalle sole informazioni del file, senza dialog di errore
+            self.info_text.insert(tk.END, f"⚠️ {ERROR_MESSAGES['tmdb_unavailable']}\n")
+            self.generate_name()
+        except Exception as e:
+            self.info_text.insert(tk.END, f"❌ Errore ricerca TMDb: {str(e)}\n")
+            messagebox.showerror("Errore TMDb", f"Errore durante la ricerca: {e}")
+            
+    def analyze_file(self):
+        """Analizza il file MKV selezionato (in background)"""
+        if not self.current_file.get():
+            messagebox.showerror("Errore", ERROR_MESSAGES["no_file_selected"])
+            return
+            
+        if not os.path.exists(self.current_file.get()):
+            messagebox.showerror("Errore", ERROR_MESSAGES["file_not_exists"])
+            return
+        
+        self.info_text.delete(1.0, tk.END)
+        self.info_text.insert(tk.END, "Analisi file in corso...\n")
+        self._submit_job("analysis", self.current_file.get(), with_tmdb=False)
+    
+
+    
+    def _apply_tmdb_correction(self, tmdb_result):
+        """Applica le correzioni TMDb al nome del file temporaneo"""
+        try:
+            return self.apply_tmdb_result(tmdb_result, self.content_type.get())
+        except Exception as e:
+            print(f"Errore correzione TMDb: {e}")
+            return None
+            
+    def display_file_info(self):
+        """Mostra le informazioni complete del file nella text area"""
+        profile = self.profile
+        if not profile:
+            return
+            
+        self.info_text.delete(1.0, tk.END)
+        
+        # Info generali
+        self.info_text.insert(tk.END, "=== INFORMAZIONI GENERALI ===\n")
+        self.info_text.insert(tk.END, f"Nome file: {profile.file_name}\n")
+        if profile.file_size:
+            size_gb = profile.file_size / (1024**3)
+            self.info_text.insert(tk.END, f"Dimensione: {size_gb:.2f} GB\n")
+        if profile.duration:
+            duration_min = profile.duration / 60000
+            self.info_text.insert(tk.END, f"Durata: {duration_min:.0f} minuti\n")
+        if profile.overall_bit_rate:
+            bitrate_mbps = profile.overall_bit_rate / 1000000
+            self.info_text.insert(tk.END, f"Bitrate totale: {bitrate_mbps:.1f} Mbps\n")
+        if profile.incomplete:
+            self.info_text.insert(tk.END, f"⚠️ Analisi parziale (limite di lettura): {', '.join(profile.incomplete)}\n")
+        self.info_text.insert(tk.END, "\n")
+        
+        # Info video dettagliate
+        if profile.video:
+            self.info_text.insert(tk.END, "=== VIDEO (DETTAGLIATO) ===\n")
+            for i, track in enumerate(profile.video):
+                self.info_text.insert(tk.END, f"Track {i+1}:\n")
+                
+                # Info base
+                self.info_text.insert(tk.END, f"  Codec: {track.format or 'N/A'}")
+                if track.format_profile:
+                    self.info_text.insert(tk.END, f" ({track.format_profile})")
+                self.info_text.insert(tk.END, "\n")
+                
+                self.info_text.insert(tk.END, f"  Risoluzione: {track.width}x{track.height}\n")
+                
+                if track.bit_rate:
+                    bitrate_mbps = track.bit_rate / 1000000
+                    self.info_text.insert(tk.END, f"  Bitrate: {bitrate_mbps:.1f} Mbps\n")
+                    
+                if track.frame_rate:
+                    self.info_text.insert(tk.END, f"  Frame rate: {track.frame_rate} fps\n")
+                
+                # Informazioni di encoding
+                if track.writing_library:
+                    self.info_text.insert(tk.END, f"  Writing library: {track.writing_library}\n")
+                    
+                if track.encoded_library_settings:
+                    settings = str(track.encoded_library_settings)
+                    if len(settings) > 60:
+                        settings = settings[:60] + "..."
+                    self.info_text.insert(tk.END, f"  Encoded settings: {settings}\n")
+                
+                # Informazioni HDR/DV
+                if track.hdr_format:
+                    self.info_text.insert(tk.END, f"  HDR Format: {track.hdr_format}\n")
+                    
+                if track.hdr_format_profile:
+                    self.info_text.insert(tk.END, f"  HDR Profile: {track.hdr_format_profile}\n")
+                    
+                if track.hdr_format_compatibility:
+                    self.info_text.insert(tk.END, f"  HDR Compatibility: {track.hdr_format_compatibility}\n")
+                    
+                if track.color_primaries:
+                    self.info_text.insert(tk.END, f"  Color primaries: {track.color_primaries}\n")
+                    
+                if track.transfer_characteristics:
+                    self.info_text.insert(tk.END, f"  Transfer characteristics: {track.transfer_characteristics}\n")
+                
+                # Bit depth
+                if track.bit_depth:
+                    self.info_text.insert(tk.END, f"  Bit depth: {track.bit_depth} bits\n")
+                
+                self.info_text.insert(tk.END, "\n")
+        
+        # Info audio dettagliate
+        if profile.audio:
+            self.info_text.insert(tk.END, "=== AUDIO (DETTAGLIATO) ===\n")
+            for i, track in enumerate(profile.audio):
+                self.info_text.insert(tk.END, f"Track {i+1}:\n")
+                
+                # Info base
+                self.info_text.insert(tk.END, f"  Formato: {track.format or 'N/A'}")
+                if track.format_profile:
+                    self.info_text.insert(tk.END, f" ({track.format_profile})")
+                self.info_text.insert(tk.END, "\n")
+                
+                # Nome commerciale
+                if track.format_commercial:
+                    self.info_text.insert(tk.END, f"  Nome commerciale: {track.format_commercial}\n")
+                
+                self.info_text.insert(tk.END, f"  Lingua: {track.language or 'N/A'}\n")
+                self.info_text.insert(tk.END, f"  Canali: {track.channels or 'N/A'}\n")
+                
+                if track.bit_rate:
+                    bitrate_kbps = track.bit_rate / 1000
+                    self.info_text.insert(tk.END, f"  Bitrate: {bitrate_kbps:.0f} kbps\n")
+                
+                # Informazioni aggiuntive audio
+                if track.additional_features:
+                    self.info_text.insert(tk.END, f"  Features: {track.additional_features}\n")
+                    
+                if track.compression_mode:
+                    self.info_text.insert(tk.END, f"  Compression: {track.compression_mode}\n")
+                
+                # Titolo del track (se presente)
+                if track.title:
+                    self.info_text.insert(tk.END, f"  Titolo: {track.title}\n")
+                
+                self.info_text.insert(tk.END, "\n")
+        
+        # Info sottotitoli dettagliate
+        if profile.text:
+            self.info_text.insert(tk.END, "=== SOTTOTITOLI (DETTAGLIATO) ===\n")
+            for i, track in enumerate(profile.text):
+                self.info_text.insert(tk.END, f"Track {i+1}:\n")
+                self.info_text.insert(tk.END, f"  Formato: {track.format or 'N/A'}\n")
+                self.info_text.insert(tk.END, f"  Lingua: {track.language or 'N/A'}\n")
+                
+                # Titolo del sottotitolo
+                if track.title:
+                    self.info_text.insert(tk.END, f"  Titolo: {track.title}\n")
+                    
+                # Codec ID
+                if track.codec_id:
+                    self.info_text.insert(tk.END, f"  Codec ID: {track.codec_id}\n")
+                
+                self.info_text.insert(tk.END, "\n")
+        
+        # Sezione metadati estratti per il rename
+        self.info_text.insert(tk.END, "=== METADATI ESTRATTI PER RENAME ===\n")
+        try:
+            meta = self.extract_metadata()
+            self.info_text.insert(tk.END, f"Risoluzione rilevata: {meta.get('resolution', 'N/A')}\n")
+            self.info_text.insert(tk.END, f"Formato: {meta.get('video_format', 'N/A')}\n")
+            # Per REMUX e WEB-DL puro non mostra compressore (non sono compressi)
+            compressor_value = meta.get('compressor', 'Non applicabile' if meta.get('type') in ['REMUX', 'WEBDL'] else 'N/A')
+            self.info_text.insert(tk.END, f"Compressore: {compressor_value}\n")
+            self.info_text.insert(tk.END, f"Tipo rilevato: {meta.get('type', 'N/A')}\n")
+            self.info_text.insert(tk.END, f"Source rilevato: {meta.get('source', 'N/A')}\n")
+            self.info_text.insert(tk.END, f"Audio rilevato: {meta.get('audio', 'N/A')}\n")
+            self.info_text.insert(tk.END, f"Lingue audio: {', '.join(meta.get('audio_languages', []))}\n")
+            self.info_text.insert(tk.END, f"HDR rilevato: {', '.join(meta.get('hdr_info', []))}\n")
+            self.info_text.insert(tk.END, f"Servizio: {meta.get('service', 'N/A')}\n")
+            self.info_text.insert(tk.END, f"Release group: {meta.get('tag', 'N/A')}\n")
+            
+            # Verifica REMUX basata sui metadati corretti
+            tipo = meta.get('type', '').upper()
+            is_remux = tipo == 'REMUX'
+            self.info_text.insert(tk.END, f"È REMUX?: {'Sì' if is_remux else 'No'}\n")
+            
+        except Exception as e:
+            self.info_text.insert(tk.END, f"Errore estrazione metadati: {e}\n")
+                
+    def generate_name(self):
+        # Genera il nuovo nome secondo le regole della scena
+        if not self.mediainfo_data:
+            messagebox.showerror("Errore", ERROR_MESSAGES["no_file_selected"])
+            return
+            
+        try:
+            # Nome file e titolo tracker (calcolati una volta per file e selezione TMDb)
+            file_path = self.current_file.get()
+            with metrics.stage("metadata", file=file_path):
+                self.extract_metadata()
+            with metrics.stage("naming", file=file_path):
+                new_name, scene_title = self.build_names()
+            metrics.flush()
+            self.new_name.set(new_name)
+            self.scene_title.set(scene_title)
+            
+        except Exception as e:
+            messagebox.showerror("Errore", f"Errore durante la generazione del nome:\n{str(e)}")
+    
+    def rename_file(self):
+        # Rinomina il file con il nuovo nome
+        if not self.current_file.get():
+            messagebox.showerror("Errore", ERROR_MESSAGES["no_file_selected"])
+            return
+            
+        if not self.new_name.get():
+            messagebox.showerror("Errore", ERROR_MESSAGES["no_new_name"])
+            return
+            
+        current_path = Path(self.current_file.get())
+        new_path = current_path.parent / self.new_name.get()
+        
+        if new_path.exists():
+            messagebox.showerror("Errore", ERROR_MESSAGES["file_exists"])
+            return
+            
+        try:
+            with metrics.stage("rename", file=str(current_path)):
+                current_path.rename(new_path)
+            metrics.flush()
+            messagebox.showinfo("Successo", f"{SUCCESS_MESSAGES['rename_complete']}\n\nNuovo nome:\n{self.new_name.get()}")
+            
+            # Aggiorna i campi
+            self.current_file.set(str(new_path))
+            self.current_name.set(self.new_name.get())
+            
+        except Exception as e:
+            messagebox.showerror("Errore", f"{ERROR_MESSAGES['rename_error']}\n{str(e)}")
+    
+    def reset_form(self):
+        # Resetta il form
+        self.current_file.set("")
+        self.current_name.set("")
+        self.new_name.set("")
+        self.scene_title.set("")
+        self.info_text.delete(1.0, tk.END)
+        self.mediainfo_data = None
+    
+    def copy_scene_title(self):
+        # Copia il titolo scene-compliant negli appunti
+        scene_title = self.scene_title.get()
+        if not scene_title:
+            messagebox.showwarning("Avviso", "Nessun titolo tracker disponibile.\nGenera prima il nome.")
+            return
+        
+        try:
+            # Copia negli appunti
+            self.root.clipboard_clear()
+            self.root.clipboard_append(scene_title)
+            self.root.update()
+            messagebox.showinfo("Successo", f"Titolo copiato negli appunti!\n\n{scene_title}")
+        except Exception as e:
+            messagebox.showerror("Errore", f"Impossibile copiare negli appunti:\n{str(e)}")
+    
+
+    def search_tmdb(self):
+        # Cerca su TMDb il titolo specificato
+        if not self.TMDB_API_KEY:
+            response = messagebox.askokcancel("Inserire API key Tmdb?", "Chiave API per Tmdb mancante!\nVuoi inserirla ora?")
+            if response:
+                self.TMDB_API_KEY = load_tmdb_api_key(self)
+            
+        if not self.TMDB_API_KEY: # ancora nessuna chiave, abortisci la ricerca
+            messagebox.showerror("Errore", "Nessuna chiave API per Tmdb!")
+            return
+
+        title = self.search_title.get().strip()
+        if not title:
+            messagebox.showerror("Errore", "Inserisci un titolo da cercare")
+            return
+            
+        content_type = self.content_type.get()
+        endpoint = "movie" if content_type == "movie" else "tv"
+        
+        # Ricerca su TMDb in background: il risultato arriva in _review_search_job
+        self._submit_job("search", self.current_file.get(), title=title, endpoint=endpoint)
+    
+    def _review_search_job(self, job):
+        # Mostra i risultati della ricerca TMDb manuale
+        if job["file"] != self.current_file.get():
+            # Nel frattempo è stato caricato un altro file: risultato non più pertinente
+            return
+        
+        title = job["title"]
+        endpoint = job["endpoint"]
+        try:
+            if job.get("error"):
+                raise job["error"]
+            
+            results = job["tmdb_results"]
+            if not results:
+                messagebox.showinfo("TMDb", f"Nessun risultato trovato per '{title}'")
+                return
+            
+            # Se ci sono più risultati, chiedi all'utente di scegliere
+            if len(results) > 1:
+                selected = self._show_tmdb_selection_dialog(results, endpoint)
+                if not selected:
+                    return
+            else:
+                selected = results[0]
+            
+            # Aggiorna il nome del file con le informazioni TMDb
+            self._update_name_with_tmdb_info(selected, endpoint)
+            
+        except TMDbUnavailable:
+            messagebox.showwarning("TMDb Non Disponibile", ERROR_MESSAGES["tmdb_unavailable"])
+        except requests.exceptions.RequestException as e:
+            messagebox.showerror("Errore TMDb", f"Errore di connessione: {e}")
+        except Exception as e:
+            messagebox.showerror("Errore", f"Errore durante la ricerca TMDb: {e}")
+    
+    def _show_tmdb_selection_dialog(self, results, endpoint):
+        # Mostra dialog per selezione da risultati TMDb con preview
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Seleziona il Film/Serie TV Corretto - TMDb")
+        dialog.geometry("700x500")
+        dialog.resizable(True, True)
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        selected_result = None
+        
+        # Frame principale
+        main_frame = ttk.Frame(dialog, padding="15")
+        main_frame.pack(fill="both", expand=True)
+        
+        # Titolo del dialog
+        title_label = ttk.Label(main_frame, 
+                               text=f"Trovati {len(results)} risultati per il {'film' if endpoint == 'movie' else 'serie TV'}:", 
+                               font=("Arial", 12, "bold"))
+        title_label.pack(anchor="w", pady=(0, 15))
+        
+        instruction_label = ttk.Label(main_frame, 
+                                    text="Seleziona il risultato corretto per applicare titolo e anno giusti:",
+                                    font=("Arial", 10))
+        instruction_label.pack(anchor="w", pady=(0, 10))
+        
+        # Lista con scrollbar
+        list_frame = ttk.Frame(main_frame)
+        list_frame.pack(fill="both", expand=True)
+        
+        listbox = tk.Listbox(list_frame, font=("Arial", 10), height=12)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=listbox.yview)
+        listbox.configure(yscrollcommand=scrollbar.set)
+        
+        # Popola lista con informazioni dettagliate
+        for i, result in enumerate(results):
+            title = result.get("title") or result.get("name", "")
+            date = result.get("release_date") or result.get("first_air_date", "")
+            year = date.split("-")[0] if date else "Anno sconosciuto"
+            overview = result.get("overview", "Nessuna descrizione disponibile")
+            
+            # Tronca overview se troppo lungo
+            if len(overview) > 80:
+                overview = overview[:80] + "..."
+            
+            display_text = f"{i+1}. {title} ({year})\n   {overview}"
+            listbox.insert(tk.END, display_text)
+        
+        listbox.pack(side="left", fill="both", expand=True, padx=(0, 5))
+        scrollbar.pack(side="right", fill="y")
+        
+        # Seleziona automaticamente il primo risultato
+        listbox.selection_set(0)
+        listbox.activate(0)
+        
+        # Frame info selezione
+        info_frame = ttk.LabelFrame(main_frame, text="Anteprima Selezione", padding="10")
+        info_frame.pack(fill="x", pady=(10, 0))
+        
+        info_label = ttk.Label(info_frame, text="", font=("Arial", 9), wraplength=600)
+        info_label.pack(anchor="w")
+        
+        def update_preview(event=None):
+            selection = listbox.curselection()
+            if selection:
+                result = results[selection[0]]
+                title = result.get("title") or result.get("name", "")
+                date = result.get("release_date") or result.get("first_air_date", "")
+                year = date.split("-")[0] if date else ""
+                
+                preview_text = f"Titolo: {title}\nAnno: {year if year else 'Non specificato'}"
+                if date:
+                    preview_text += f"\nData completa: {date}"
+                
+                info_label.config(text=preview_text)
+        
+        # Aggiorna preview quando cambia selezione
+        listbox.bind("<<ListboxSelect>>", update_preview)
+        update_preview()  # Mostra preview iniziale
+        
+        # Pulsanti
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill="x", pady=(15, 0))
+        
+        def on_select():
+            nonlocal selected_result
+            selection = listbox.curselection()
+            if selection:
+                selected_result = results[selection[0]]
+                dialog.destroy()
+            else:
+                messagebox.showwarning("Attenzione", "Seleziona un risultato dalla lista")
+        
+        def on_cancel():
+            dialog.destroy()
+        
+        ttk.Button(button_frame, text="✅ Usa Questo Risultato", 
+                  command=on_select).pack(side="right", padx=(5, 0))
+        ttk.Button(button_frame, text="❌ Annulla", 
+                  command=on_cancel).pack(side="right")
+        
+        # Info aggiuntiva
+        help_label = ttk.Label(main_frame, 
+                              text="💡 Suggerimento: Doppio clic per selezione rapida",
+                              font=("Arial", 8), foreground="gray")
+        help_label.pack(anchor="w", pady=(5, 0))
+        
+        # Gestione doppio click
+        listbox.bind("<Double-1>", lambda e: on_select())
+        
+        # Focus sulla lista
+        listbox.focus_set()
+        
+        dialog.wait_window()
+        return selected_result
+    
+    def _update_name_with_tmdb_info(self, tmdb_result, endpoint):
+        # Aggiorna il nome del file con le informazioni TMDb
+        try:
+            # Ottieni informazioni base
+            title = tmdb_result.get("title") or tmdb_result.get("name", "")
+            date = tmdb_result.get("release_date") or tmdb_result.get("first_air_date", "")
+            year = date.split("-")[0] if date else ""
+            
+            # Registra i dati TMDb per il titolo tracker generato da generate_name()
+            self.set_tmdb_selection(title=title, year=year)
+            if endpoint == "tv":
+                # Scelta manuale della serie: vale anche per gli episodi analizzati dopo
+                self.series_resolver.remember(os.path.basename(self.current_file.get()), tmdb_result)
+            
+            # Per serie TV, cerca pattern episodio nel nome originale
+            original_filename = os.path.basename(self.current_file.get())
+            if endpoint == "tv":
+                episode_match = re.search(r'(?i)(S\d{1,2}E\d{1,2})', original_filename)
+                if episode_match:
+                    episode_info = episode_match.group(1).upper()
+                    new_title = f"{title} {episode_info}"
+                else:
+                    new_title = title
+            else:
+                new_title = title
+            
+            # Aggiorna il titolo per la ricerca (mostra all'utente cosa è stato trovato)
+            if year:
+                display_title = f"{title} ({year})"
+            else:
+                display_title = title
+                
+            # Mostra messaggio di successo
+            msg = f"Trovato su TMDb:\n{display_title}"
+            if endpoint == "tv" and episode_match:
+                msg += f"\nEpisodio: {episode_info}"
+            
+            messagebox.showinfo("TMDb", msg)
+            
+            # Suggerisci di rigenerare il nome
+            if messagebox.askyesno("TMDb", "Vuoi rigenerare automaticamente il nome del file?"):
+                # Aggiorna temporaneamente il nome base per la generazione
+                original_current = self.current_name.get()
+                
+                # Crea un nome temporaneo con le info TMDb
+                temp_name = f"{title}"
+                if year:
+                    temp_name += f" {year}"
+                if endpoint == "tv" and episode_match:
+                    temp_name += f" {episode_info}"
+                temp_name += ".mkv"
+                
+                self.current_name.set(temp_name)
+                
+                # Genera il nuovo nome
+                self.generate_name()
+                
+                # Ripristina il nome originale
+                self.current_name.set(original_current)
+            
+        except Exception as e:
+            messagebox.showerror("Errore", f"Errore durante l'aggiornamento: {e}")
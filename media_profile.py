@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Profilo compatto dei metadati MediaInfo
+Costruito con un solo passaggio sulle tracce e letto da tutte le euristiche di naming
+
+INFORM_TEMPLATE chiede a MediaInfo solo i campi letti qui: il report compatto si legge con
+InformReport senza costruire l'albero XML né gli oggetti Track di pymediainfo.
+"""
+
+# Separatori del report Inform (caratteri di controllo: non compaiono nei valori)
+FIELD_SEPARATOR = "\x1f"
+RECORD_SEPARATOR = "\x1e"
+
+# Campi letti dai profili per tipo di traccia: (attributo pymediainfo, parametro MediaInfo).
+# La cache MediaInfo conserva il report: se i campi cambiano va incrementato
+# SCHEMA_VERSION in mediainfo_cache
+INFORM_FIELDS = {
+    "General": (
+        ("file_name", "FileName"), ("file_size", "FileSize"), ("duration", "Duration"),
+        ("overall_bit_rate", "OverallBitRate"),
+    ),
+    "Video": (
+        ("format", "Format"), ("format_profile", "Format_Profile"), ("format_settings", "Format_Settings"),
+        ("width", "Width"), ("height", "Height"), ("bit_rate", "BitRate"), ("frame_rate", "FrameRate"),
+        ("bit_depth", "BitDepth"), ("writing_library", "Encoded_Library"),
+        ("encoded_library_settings", "Encoded_Library_Settings"), ("hdr_format", "HDR_Format"),
+        ("hdr_format_profile", "HDR_Format_Profile"), ("hdr_format_compatibility", "HDR_Format_Compatibility"),
+        ("hdr_format_settings", "HDR_Format_Settings"), ("color_primaries", "colour_primaries"),
+        ("transfer_characteristics", "transfer_characteristics"),
+    ),
+    "Audio": (
+        ("format", "Format"), ("format_profile", "Format_Profile"),
+        ("format_commercial_ifany", "Format_Commercial_IfAny"), ("language", "Language"),
+        ("channel_s", "Channel(s)"), ("bit_rate", "BitRate"),
+        ("format_additionalfeatures", "Format_AdditionalFeatures"), ("compression_mode", "Compression_Mode"),
+        ("title", "Title"),
+    ),
+    "Text": (
+        ("format", "Format"), ("language", "Language"), ("title", "Title"), ("codec_id", "CodecID"),
+    ),
+}
+
+# Campi che pymediainfo restituisce come interi
+_INT_FIELDS = frozenset(("file_size", "duration", "overall_bit_rate", "width", "height", "bit_rate",
+                         "bit_depth", "channel_s"))
+
+# Una sezione per tipo di traccia, ripetuta da MediaInfo per ogni traccia di quel tipo
+INFORM_TEMPLATE = "\r\n".join(
+    f"{track_type};{track_type}"
+    + "".join(f"{FIELD_SEPARATOR}%{parameter}%" for _name, parameter in fields)
+    + RECORD_SEPARATOR
+    for track_type, fields in INFORM_FIELDS.items())
+
+
+def _to_int(value):
+    # I campi numerici di MediaInfo possono arrivare come int, stringhe o "a / b"
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        pass
+    try:
+        return int(float(value))
+    except (ValueError, TypeError):
+        return None
+
+
+def _lower(value):
+    return str(value).lower() if value else ''
+
+
+def is_inform_report(report):
+    """True se il report è stato prodotto da INFORM_TEMPLATE (e non è l'XML di MediaInfo)"""
+    return report.startswith("General" + FIELD_SEPARATOR)
+
+
+class InformTrack(dict):
+    """Traccia del report Inform: i campi si leggono come attributi, None se assenti (come in pymediainfo)"""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self.get(name)
+
+
+class InformReport:
+    """Analisi letta dal report di INFORM_TEMPLATE, con la stessa interfaccia di pymediainfo.MediaInfo"""
+
+    __slots__ = ("tracks", "incomplete", "cache_hit")
+
+    def __init__(self, report):
+        self.tracks = []
+        self.incomplete = []
+        self.cache_hit = False
+        for record in report.split(RECORD_SEPARATOR):
+            track_type, _, values = record.strip().partition(FIELD_SEPARATOR)
+            fields = INFORM_FIELDS.get(track_type)
+            if fields is None:
+                continue
+            track = InformTrack(track_type=track_type)
+            for (name, _parameter), value in zip(fields, values.split(FIELD_SEPARATOR)):
+                if not value:
+                    continue
+                if name in _INT_FIELDS:
+                    try:
+                        value = int(value)
+                    except ValueError:
+                        pass
+                track[name] = value
+            self.tracks.append(track)
+
+    def to_data(self):
+        return {"tracks": [dict(track) for track in self.tracks]}
+
+
+class VideoInfo:
+    """Campi della traccia video usati da naming e pannello informazioni"""
+
+    __slots__ = (
+        "format", "format_profile", "width", "height", "bit_rate", "frame_rate", "bit_depth",
+        "writing_library", "encoded_library_settings", "hdr_format", "hdr_format_profile",
+        "hdr_format_compatibility", "color_primaries", "transfer_characteristics",
+        # Versioni minuscole pre-calcolate per le euristiche
+        "writing_library_lc", "encoded_library_settings_lc", "format_settings_lc",
+        "hdr_format_lc", "hdr_format_profile_lc", "hdr_format_compatibility_lc",
+        "hdr_format_settings_lc", "color_primaries_lc", "transfer_characteristics_lc",
+    )
+
+    def __init__(self, track):
+        self.format = track.format
+        self.format_profile = getattr(track, 'format_profile', None)
+        self.width = _to_int(track.width)
+        self.height = _to_int(track.height)
+        self.bit_rate = _to_int(getattr(track, 'bit_rate', None))
+        self.frame_rate = getattr(track, 'frame_rate', None)
+        self.bit_depth = getattr(track, 'bit_depth', None)
+        self.writing_library = getattr(track, 'writing_library', None)
+        self.encoded_library_settings = getattr(track, 'encoded_library_settings', None)
+        self.hdr_format = getattr(track, 'hdr_format', None)
+        self.hdr_format_profile = getattr(track, 'hdr_format_profile', None)
+        self.hdr_format_compatibility = getattr(track, 'hdr_format_compatibility', None)
+        self.color_primaries = getattr(track, 'color_primaries', None)
+        self.transfer_characteristics = getattr(track, 'transfer_characteristics', None)
+
+        self.writing_library_lc = _lower(self.writing_library)
+        self.encoded_library_settings_lc = _lower(self.encoded_library_settings)
+        self.format_settings_lc = _lower(getattr(track, 'format_settings', None))
+        self.hdr_format_lc = _lower(self.hdr_format)
+        self.hdr_format_profile_lc = _lower(self.hdr_format_profile)
+        self.hdr_format_compatibility_lc = _lower(self.hdr_format_compatibility)
+        self.hdr_format_settings_lc = _lower(getattr(track, 'hdr_format_settings', None))
+        self.color_primaries_lc = _lower(self.color_primaries)
+        self.transfer_characteristics_lc = _lower(self.transfer_characteristics)
+
+
+class AudioInfo:
+    """Campi della traccia audio usati da naming e pannello informazioni"""
+
+    __slots__ = (
+        "format", "format_profile", "format_commercial", "language", "channels", "bit_rate",
+        "additional_features", "compression_mode", "title", "has_atmos",
+    )
+
+    def __init__(self, track):
+        self.format = track.format
+        self.format_profile = getattr(track, 'format_profile', None)
+        self.format_commercial = getattr(track, 'format_commercial_ifany', None)
+        self.language = track.language
+        self.channels = getattr(track, 'channel_s', None)
+        self.bit_rate = _to_int(getattr(track, 'bit_rate', None))
+        self.additional_features = getattr(track, 'format_additionalfeatures', None)
+        self.compression_mode = getattr(track, 'compression_mode', None)
+        self.title = getattr(track, 'title', None)
+
+        features = str(self.additional_features or '').upper()
+        self.has_atmos = 'ATMOS' in features or 'JOC' in features
+
+
+class TextInfo:
+    """Campi della traccia sottotitoli mostrati nel pannello informazioni"""
+
+    __slots__ = ("format", "language", "title", "codec_id")
+
+    def __init__(self, track):
+        self.format = track.format
+        self.language = track.language
+        self.title = getattr(track, 'title', None)
+        self.codec_id = getattr(track, 'codec_id', None)
+
+
+class MediaProfile:
+    """Riepilogo tipizzato di un'analisi MediaInfo"""
+
+    __slots__ = ("file_name", "file_size", "duration", "overall_bit_rate", "video", "audio", "text",
+                 "incomplete", "cache_hit", "tier", "field_tiers", "escalation")
+
+    def __init__(self):
+        self.file_name = None
+        self.file_size = None
+        self.duration = None
+        self.overall_bit_rate = None
+        self.video = []
+        self.audio = []
+        self.text = []
+        # Campi non ricavati perché MediaInfo ha raggiunto il limite di lettura (es. "Video bit_rate")
+        self.incomplete = []
+        # Analisi letta dalla cache MediaInfo
+        self.cache_hit = False
+        # Analisi a livelli (tiered_analysis.analyze_media): livello più profondo letto,
+        # livello di ogni campo dei metadati e motivi per cui il nome non bastava
+        self.tier = None
+        self.field_tiers = {}
+        self.escalation = []
+
+    @classmethod
+    def from_mediainfo(cls, mediainfo_data):
+        """Costruisce il profilo con un unico passaggio sulle tracce MediaInfo"""
+        profile = cls()
+        profile.incomplete = list(getattr(mediainfo_data, 'incomplete', None) or [])
+        profile.cache_hit = bool(getattr(mediainfo_data, 'cache_hit', False))
+        general_seen = False
+        for track in mediainfo_data.tracks:
+            track_type = track.track_type
+            if track_type == 'Video':
+                profile.video.append(VideoInfo(track))
+            elif track_type == 'Audio':
+                profile.audio.append(AudioInfo(track))
+            elif track_type == 'Text':
+                profile.text.append(TextInfo(track))
+            elif track_type == 'General' and not general_seen:
+                general_seen = True
+                profile.file_name = track.file_name
+                profile.file_size = _to_int(track.file_size)
+                profile.duration = _to_int(track.duration)
+                profile.overall_bit_rate = _to_int(getattr(track, 'overall_bit_rate', None))
+        return profile
+
+    @property
+    def file_bit_rate(self):
+        """Bitrate medio del file in bit/s: quello di MediaInfo o, se manca, dimensione ÷ durata"""
+        if self.overall_bit_rate:
+            return self.overall_bit_rate
+        if self.file_size and self.duration:
+            return int(self.file_size * 8000 / self.duration)
+        return None
+
+    @property
+    def main_video(self):
+        # Le euristiche usano sempre la prima traccia video
+        return self.video[0] if self.video else None
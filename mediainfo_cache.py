@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+Cache persistente delle analisi MediaInfo
+Evita di rileggere file di diversi GB se non sono cambiati dall'ultima analisi
+"""
+
+import contextlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+from xml.sax.saxutils import escape
+
+from config import MEDIAINFO_CACHE_CONFIG, MEDIAINFO_PARSE_CONFIG
+
+APP_DIR_NAME = "mkv-rename-assistant"
+
+# Versione del formato dei dati in cache: se cambia, le voci esistenti vengono scartate
+# (1: XML "OLDXML", l'unico che MediaInfo(xml) sa rileggere con MediaInfo >= 17.10;
+#  2: anche il report compatto di media_profile.INFORM_TEMPLATE;
+#  3: il report compatto include Encoded_Library_Settings;
+#  4: colonna fast, le analisi della modalità veloce non valgono per le letture complete)
+SCHEMA_VERSION = 4
+
+# Campi che MediaInfo ricava leggendo i flussi: se mancano dopo una lettura interrotta dal
+# limite di byte vengono segnalati come incompleti
+STREAM_FIELDS = {
+    "General": ("duration", "overall_bit_rate"),
+    "Video": ("bit_rate", "frame_rate", "writing_library"),
+    "Audio": ("bit_rate",),
+}
+
+# Le opzioni aggiuntive di MediaInfo sono globali alla libreria (pymediainfo le azzera dopo
+# ogni analisi): con opzioni configurate le analisi del processo passano da questo lock
+_options_lock = threading.Lock()
+
+
+def user_config_dir():
+    """Ritorna (creandola se serve) la cartella di configurazione dell'utente
+
+    Returns
+    -------
+    str
+        %APPDATA% su Windows, ~/Library/Application Support su macOS,
+        $XDG_CONFIG_HOME (o ~/.config) sugli altri sistemi.
+    """
+    if sys.platform == "win32":
+        base = os.getenv("APPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.getenv("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    path = os.path.join(base, APP_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class _BoundedReader:
+    """File in lettura che, superato il limite di byte, risponde come a fine file"""
+
+    __slots__ = ("_file", "size", "remaining", "truncated")
+
+    mode = "rb"
+
+    def __init__(self, file, max_bytes):
+        self._file = file
+        self.size = os.fstat(file.fileno()).st_size
+        self.remaining = max_bytes
+        self.truncated = False
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._file.read(size)
+        self.remaining -= len(data)
+        if not data and self._file.tell() < self.size:
+            self.truncated = True
+        return data
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+
+def _add_file_name(report, file_path):
+    # Letto come buffer, MediaInfo non conosce il file: si aggiungono i campi del nome
+    # che scrive per i percorsi (il nome entra nel naming)
+    from media_profile import FIELD_SEPARATOR, is_inform_report
+
+    file_path = os.path.abspath(file_path)
+    folder, name_extension = os.path.split(file_path)
+    name, extension = os.path.splitext(name_extension)
+    if is_inform_report(report):
+        # Report del template Inform: FileName è il primo campo della traccia General
+        general = "General" + FIELD_SEPARATOR
+        return report.replace(general + FIELD_SEPARATOR, general + name + FIELD_SEPARATOR, 1)
+    fields = (("Complete_name", file_path), ("Folder_name", folder), ("File_name_extension", name_extension),
+              ("File_name", name), ("File_extension", extension.lstrip(".")))
+    tags = "".join(f"<{tag}>{escape(value)}</{tag}>\n" for tag, value in fields if value)
+    return re.sub(r'(<track type="General">\n?)', lambda match: match.group(1) + tags, report, count=1)
+
+
+def read_mediainfo(file_path, fast=False):
+    """Esegue MediaInfo sul file con le impostazioni di MEDIAINFO_PARSE_CONFIG
+
+    Parameters
+    ----------
+    file_path : str
+        File da analizzare.
+    fast : bool
+        Usa parse_speed e limite di lettura della modalità veloce.
+
+    Returns
+    -------
+    tuple
+        (report, truncated): il report compatto di media_profile.INFORM_TEMPLATE (o l'XML
+        "OLDXML" completo con "lean": False) e True se la lettura si è fermata al limite di
+        byte prima che MediaInfo concludesse l'analisi.
+    """
+    from pymediainfo import MediaInfo
+    from media_profile import INFORM_TEMPLATE
+
+    prefix = "fast_" if fast else ""
+    parse_speed = MEDIAINFO_PARSE_CONFIG[prefix + "parse_speed"]
+    max_read_mb = MEDIAINFO_PARSE_CONFIG[prefix + "max_read_mb"]
+    # "XML" da MediaInfo 17.10 è il nuovo formato, che MediaInfo(xml) non legge
+    output = INFORM_TEMPLATE if MEDIAINFO_PARSE_CONFIG["lean"] else "OLDXML"
+    # Senza opzioni pymediainfo non azzera la configurazione della libreria
+    options = dict(MEDIAINFO_PARSE_CONFIG["options"]) or None
+    with _options_lock if options else contextlib.nullcontext():
+        if max_read_mb is None:
+            report = MediaInfo.parse(file_path, output=output, parse_speed=parse_speed,
+                                     mediainfo_options=options)
+            return report, False
+        with open(file_path, "rb") as handle:
+            reader = _BoundedReader(handle, int(max_read_mb * 1024 * 1024))
+            report = MediaInfo.parse(reader, output=output, parse_speed=parse_speed, mediainfo_options=options)
+    return _add_file_name(report, file_path), reader.truncated
+
+
+def incomplete_fields(media_info):
+    """Campi di STREAM_FIELDS assenti nelle tracce, es. ["Video bit_rate"]
+
+    Le tracce video e audio del tutto assenti sono indicate col solo tipo ("Audio").
+    """
+    missing = []
+    track_types = set()
+    for track in media_info.tracks:
+        track_types.add(track.track_type)
+        for field in STREAM_FIELDS.get(track.track_type, ()):
+            label = f"{track.track_type} {field}"
+            if getattr(track, field, None) in (None, "") and label not in missing:
+                missing.append(label)
+    missing.extend(track_type for track_type in ("Video", "Audio") if track_type not in track_types)
+    return missing
+
+
+class MediaInfoCache:
+    """Cache SQLite dell'output di MediaInfo (report del template Inform o XML)
+
+    Ogni voce è indicizzata per percorso e resta valida solo finché
+    (device, inode, dimensione, mtime_ns) del file non cambiano. Le voci salvate dalla
+    modalità veloce (stime meno precise) valgono solo per altre letture veloci.
+    """
+
+    def __init__(self, db_path=None, max_size_mb=None):
+        if db_path is None:
+            db_path = os.path.join(user_config_dir(), MEDIAINFO_CACHE_CONFIG["filename"])
+        if max_size_mb is None:
+            max_size_mb = MEDIAINFO_CACHE_CONFIG["max_size_mb"]
+        self.db_path = db_path
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.probes = 0
+
+        # La connessione è condivisa tra i thread della GUI: gli accessi passano dal lock
+        self._lock = threading.Lock()
+        # timeout alto: più processi worker possono scrivere sullo stesso database
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            # Formato cambiato: si ricrea la tabella (anche le colonne possono essere diverse)
+            self._conn.execute("DROP TABLE IF EXISTS mediainfo")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS mediainfo ("
+            " path TEXT PRIMARY KEY,"
+            " device INTEGER NOT NULL,"
+            " inode INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " fast INTEGER NOT NULL DEFAULT 0,"
+            " data BLOB NOT NULL,"
+            " data_size INTEGER NOT NULL,"
+            " stored_at REAL NOT NULL DEFAULT (julianday('now')))")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS mediainfo_stored_at ON mediainfo(stored_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _stat_key(st):
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def get(self, file_path, st=None, fast=False):
+        """Ritorna il report MediaInfo in cache oppure None se assente o non più valido
+
+        Senza fast si ignorano le voci salvate dalla modalità veloce.
+        """
+        st = st or os.stat(file_path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT device, inode, size, mtime_ns, fast, data FROM mediainfo WHERE path = ?",
+                (os.path.abspath(file_path),)).fetchone()
+        if row is None or tuple(row[:4]) != self._stat_key(st) or (row[4] and not fast):
+            return None
+        return zlib.decompress(row[5]).decode("utf-8")
+
+    def put(self, file_path, report, st=None, fast=False):
+        """Salva il report MediaInfo per il file ed elimina le voci più vecchie oltre il limite"""
+        st = st or os.stat(file_path)
+        data = zlib.compress(report.encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mediainfo (path, device, inode, size, mtime_ns, fast, data, data_size)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(file_path), *self._stat_key(st), int(fast), data, len(data)))
+            self._evict()
+
+    def _evict(self):
+        # Elimina le voci più vecchie finché il totale rientra nel limite
+        total = self._conn.execute("SELECT COALESCE(SUM(data_size), 0) FROM mediainfo").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for path, data_size in self._conn.execute(
+                "SELECT path, data_size FROM mediainfo ORDER BY stored_at"):
+            victims.append((path,))
+            freed += data_size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM mediainfo WHERE path = ?", victims)
+
+    def parse(self, file_path, fast=False):
+        """Equivalente di MediaInfo.parse che usa la cache quando il file non è cambiato
+
+        Se il file non è in cache si prova prima la lettura diretta dell'header Matroska
+        (mkv_probe): costa poche letture e il risultato non viene salvato. Lo stesso vale
+        per le analisi interrotte dal limite di lettura (vedi `read_mediainfo`).
+
+        Returns
+        -------
+        media_profile.InformReport, MediaInfo or mkv_probe.ProbeResult
+            L'analisi ricostruita dal report (in cache o appena letto), oppure quella
+            ricavata dall'header. `cache_hit` indica se questa chiamata ha usato la cache
+            (i contatori hits/misses sono condivisi fra i thread).
+        """
+        from mkv_probe import probe_media
+
+        # stat prima dell'analisi: se il file cambia nel frattempo la voce non sarà più valida
+        st = os.stat(file_path)
+        report = self.get(file_path, st, fast)
+        hit = report is not None
+        truncated = False
+        if not hit:
+            probed = probe_media(file_path)
+            if probed is not None:
+                with self._lock:
+                    self.probes += 1
+                return probed
+            report, truncated = read_mediainfo(file_path, fast)
+            # Un'analisi parziale non va riusata da chi legge il file per intero; quella
+            # veloce resta marcata come tale (vedi get)
+            if not truncated:
+                self.put(file_path, report, st, fast)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return _media_info(report, truncated, hit)
+
+    def stats(self):
+        """Contatori di hit/miss della sessione corrente (probes: file letti dall'header Matroska)"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "probes": self.probes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _media_info(report, truncated, hit=False):
+    from media_profile import InformReport, is_inform_report
+    if is_inform_report(report):
+        media_info = InformReport(report)
+    else:
+        from pymediainfo import MediaInfo
+        media_info = MediaInfo(report)
+    # Letto da MediaProfile: campi mancanti per il limite di lettura
+    media_info.incomplete = incomplete_fields(media_info) if truncated else []
+    media_info.cache_hit = hit
+    return media_info
+
+
+def parse_media(file_path, cache=None, fast=False):
+    """Analizza il file con MediaInfo, passando dalla cache se disponibile
+
+    Senza cache, i file Matroska si leggono prima direttamente dall'header (mkv_probe).
+    Con fast si usano parse_speed e limite di lettura della modalità veloce.
+    """
+    if cache is None:
+        from mkv_probe import probe_media
+        probed = probe_media(file_path)
+        if probed is not None:
+            return probed
+        report, truncated = read_mediainfo(file_path, fast)
+        return _media_info(report, truncated)
+    return cache.parse(file_path, fast)
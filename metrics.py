@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Strumentazione della pipeline: tempo reale e tempo CPU di ogni fase
+(stat, MediaInfo, normalizzazione del titolo, TMDb, metadati, nome, rinomina)
+
+Le misure vengono scritte come righe JSON (una per fase) e/o esportate in un file
+in formato testo Prometheus per il textfile collector di node_exporter, con i
+percentili p50/p95/p99 e gli istogrammi per fase. Un tempo reale molto più alto del
+tempo CPU indica attesa (disco o rete), tempi simili indicano le euristiche.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+from config import METRICS_CONFIG
+
+# Fasi della pipeline, nell'ordine in cui vengono eseguite
+STAGES = ("stat", "mediainfo", "normalize", "tmdb", "metadata", "naming", "rename")
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+@contextmanager
+def measure(timings, name):
+    """Registra in timings[name] la coppia (secondi reali, secondi CPU del thread)
+
+    Usato dove le misure vanno raccolte e registrate altrove (es. nei processi worker).
+    """
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        timings[name] = (time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+
+
+def _quantile(ordered, q):
+    # Percentile "nearest rank" su campioni già ordinati
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def _labels(**labels):
+    return "{" + ",".join('%s="%s"' % (name, str(value).replace('"', '\\"'))
+                          for name, value in labels.items()) + "}"
+
+
+class _StageStats:
+    # Totali, bucket dell'istogramma e ultimi campioni (per i percentili) di una fase
+    __slots__ = ("count", "wall_sum", "cpu_sum", "buckets", "wall_samples", "cpu_samples")
+
+    def __init__(self, bucket_count, samples):
+        self.count = 0
+        self.wall_sum = 0.0
+        self.cpu_sum = 0.0
+        self.buckets = [0] * bucket_count
+        self.wall_samples = deque(maxlen=samples)
+        self.cpu_samples = deque(maxlen=samples)
+
+
+class Metrics:
+    """Registro delle misure del processo, condiviso fra i thread"""
+
+    def __init__(self, log_file=None, textfile=None):
+        self.log_file = log_file if log_file is not None else METRICS_CONFIG["log_file"]
+        self.textfile = textfile if textfile is not None else METRICS_CONFIG["textfile"]
+        self.bucket_bounds = sorted(METRICS_CONFIG["buckets"])
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._log = None
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Misura il blocco come fase `name`
+
+        Il dizionario restituito può essere arricchito dal blocco (es. esito di una
+        richiesta) e finisce nella riga JSON della fase.
+        """
+        timings = {}
+        try:
+            with measure(timings, name):
+                yield fields
+        finally:
+            self.record(name, *timings[name], **fields)
+
+    def record(self, name, wall, cpu, **fields):
+        """Registra una misura già effettuata (secondi reali e CPU)"""
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = _StageStats(len(self.bucket_bounds), METRICS_CONFIG["samples"])
+            stats.count += 1
+            stats.wall_sum += wall
+            stats.cpu_sum += cpu
+            index = bisect_left(self.bucket_bounds, wall)
+            if index < len(stats.buckets):
+                stats.buckets[index] += 1
+            stats.wall_samples.append(wall)
+            stats.cpu_samples.append(cpu)
+            if self.log_file:
+                self._write_log(dict(ts=round(time.time(), 3), stage=name, wall_ms=round(wall * 1000, 3),
+                                     cpu_ms=round(cpu * 1000, 3), **fields))
+
+    def record_all(self, timings, **fields):
+        """Registra le misure raccolte con measure() (es. restituite da un processo worker)"""
+        for name, (wall, cpu) in timings.items():
+            self.record(name, wall, cpu, **fields)
+
+    def count(self, name, amount=1, **labels):
+        """Incrementa un contatore (es. richieste TMDb per esito)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _write_log(self, entry):
+        # Chiamato con il lock acquisito
+        if self._log is None:
+            self._log = sys.stderr if self.log_file == "-" else open(self.log_file, "a", encoding="utf-8")
+        self._log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._log.flush()
+
+    def summary(self):
+        """Per ogni fase: numero di misure, totali e percentili di tempo reale e CPU"""
+        with self._lock:
+            stages = {name: (stats.count, stats.wall_sum, stats.cpu_sum, sorted(stats.wall_samples),
+                             sorted(stats.cpu_samples), list(stats.buckets))
+                      for name, stats in self._stages.items()}
+        ordered = sorted(stages, key=lambda name: (STAGES.index(name) if name in STAGES else len(STAGES), name))
+        return {name: {"count": stages[name][0], "wall_sum": stages[name][1], "cpu_sum": stages[name][2],
+                       "wall": {q: _quantile(stages[name][3], q) for q in QUANTILES},
+                       "cpu": {q: _quantile(stages[name][4], q) for q in QUANTILES},
+                       "buckets": stages[name][5]}
+                for name in ordered}
+
+    def to_prometheus(self):
+        """Misure in formato testo Prometheus (exposition format 0.0.4)"""
+        summary = self.summary()
+        with self._lock:
+            counters = dict(self._counters)
+
+        lines = ["# HELP mkv_rename_stage_seconds Durata delle fasi della pipeline (percentili sugli ultimi campioni)",
+                 "# TYPE mkv_rename_stage_seconds summary"]
+        for name, stats in summary.items():
+            for clock in ("wall", "cpu"):
+                for q, value in stats[clock].items():
+                    lines.append("mkv_rename_stage_seconds%s %.6f" % (_labels(stage=name, clock=clock, quantile=q), value))
+                lines.append("mkv_rename_stage_seconds_sum%s %.6f" % (_labels(stage=name, clock=clock),
+                                                                      stats[clock + "_sum"]))
+                lines.append("mkv_rename_stage_seconds_count%s %d" % (_labels(stage=name, clock=clock), stats["count"]))
+
+        lines += ["# HELP mkv_rename_stage_wall_seconds Tempo reale delle fasi della pipeline",
+                  "# TYPE mkv_rename_stage_wall_seconds histogram"]
+        for name, stats in summary.items():
+            cumulative = 0
+            for bound, observed in zip(self.bucket_bounds, stats["buckets"]):
+                cumulative += observed
+                lines.append("mkv_rename_stage_wall_seconds_bucket%s %d" % (_labels(stage=name, le=bound), cumulative))
+            lines.append("mkv_rename_stage_wall_seconds_bucket%s %d" % (_labels(stage=name, le="+Inf"), stats["count"]))
+            lines.append("mkv_rename_stage_wall_seconds_sum%s %.6f" % (_labels(stage=name), stats["wall_sum"]))
+            lines.append("mkv_rename_stage_wall_seconds_count%s %d" % (_labels(stage=name), stats["count"]))
+
+        for counter in sorted({name for name, _ in counters}):
+            lines.append("# TYPE mkv_rename_%s counter" % counter)
+            for (name, labels), value in sorted(counters.items()):
+                if name == counter:
+                    lines.append("mkv_rename_%s%s %d" % (name, _labels(**dict(labels)) if labels else "", value))
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Aggiorna il file per node_exporter (se configurato)
+
+        Il file viene sostituito in modo atomico: il collector non legge mai un file a metà.
+        """
+        if not self.textfile:
+            return
+        temp_path = "%s.%d.tmp" % (self.textfile, os.getpid())
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, self.textfile)
+
+    def format_summary(self):
+        """Tabella leggibile dei tempi per fase (per la modalità batch)"""
+        rows = ["%-10s %7s %10s %10s %10s %8s" % ("fase", "n", "p50 ms", "p95 ms", "p99 ms", "CPU %")]
+        for name, stats in self.summary().items():
+            cpu_share = stats["cpu_sum"] / stats["wall_sum"] if stats["wall_sum"] else 0.0
+            rows.append("%-10s %7d %10.2f %10.2f %10.2f %7.0f%%" % (
+                name, stats["count"], stats["wall"][0.5] * 1000, stats["wall"][0.95] * 1000,
+                stats["wall"][0.99] * 1000, cpu_share * 100))
+        return "\n".join(rows)
+
+
+# Registro del processo: GUI, modalità batch e client TMDb scrivono qui
+metrics = Metrics()
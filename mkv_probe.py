@@ -0,0 +1,1060 @@
+# -*- coding: utf-8 -*-
+"""
+Lettura diretta dell'header Matroska (EBML)
+Nei file MKV i campi usati dal naming stanno all'inizio del file: Segment Info, Tracks e Tags
+(raggiunti tramite SeekHead) e l'intestazione del primo fotogramma video, dove l'encoder scrive
+la propria firma (x264/x265) e i metadati HDR. Bastano poche letture piccole invece della
+scansione di MediaInfo: conta soprattutto su dischi meccanici e condivisioni SMB.
+
+Il risultato ha la stessa forma dell'oggetto MediaInfo (tracce con gli stessi campi), quindi
+MediaProfile.from_mediainfo lo legge senza differenze. Se un campo che influisce sul nome non
+si ricava dall'header (Atmos in E-AC-3 e le varianti DTS-HD stanno nel flusso audio, codec
+video diversi da AVC/HEVC, budget di lettura superato) probe_media ritorna None e si usa MediaInfo.
+"""
+
+import os
+import struct
+
+from config import MKV_PROBE_CONFIG
+
+# ID degli elementi EBML/Matroska letti
+EBML_HEADER = 0x1A45DFA3
+DOC_TYPE = 0x4282
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+SEEK = 0x4DBB
+SEEK_ID = 0x53AB
+SEEK_POSITION = 0x53AC
+INFO = 0x1549A966
+TIMESTAMP_SCALE = 0x2AD7B1
+DURATION = 0x4489
+MUXING_APP = 0x4D80
+WRITING_APP = 0x5741
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_NUMBER = 0xD7
+TRACK_UID = 0x73C5
+TRACK_TYPE = 0x83
+FLAG_DEFAULT = 0x88
+FLAG_FORCED = 0x55AA
+NAME = 0x536E
+LANGUAGE = 0x22B59C
+LANGUAGE_BCP47 = 0x22B59D
+CODEC_ID = 0x86
+CODEC_PRIVATE = 0x63A2
+DEFAULT_DURATION = 0x23E383
+BLOCK_ADDITION_MAPPING = 0x41E4
+BLOCK_ADD_ID_TYPE = 0x41E7
+BLOCK_ADD_ID_EXTRA_DATA = 0x41ED
+CONTENT_ENCODINGS = 0x6D80
+CONTENT_ENCODING = 0x6240
+CONTENT_COMPRESSION = 0x5034
+CONTENT_COMP_ALGO = 0x4254
+CONTENT_COMP_SETTINGS = 0x4255
+CONTENT_ENCRYPTION = 0x5035
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+PIXEL_CROP_BOTTOM = 0x54AA
+PIXEL_CROP_TOP = 0x54BB
+PIXEL_CROP_LEFT = 0x54CC
+PIXEL_CROP_RIGHT = 0x54DD
+COLOUR = 0x55B0
+BITS_PER_CHANNEL = 0x55B2
+TRANSFER = 0x55BA
+PRIMARIES = 0x55BB
+MASTERING_METADATA = 0x55D0
+AUDIO = 0xE1
+CHANNELS = 0x9F
+TAGS = 0x1254C367
+TAG = 0x7373
+TARGETS = 0x63C0
+TAG_TRACK_UID = 0x63C5
+SIMPLE_TAG = 0x67C8
+TAG_NAME = 0x45A3
+TAG_STRING = 0x4487
+CLUSTER = 0x1F43B675
+SIMPLE_BLOCK = 0xA3
+BLOCK_GROUP = 0xA0
+BLOCK = 0xA1
+
+_UNKNOWN_SIZE = -1
+
+# Codec ID Matroska -> formato riportato da MediaInfo
+VIDEO_FORMATS = {
+    "V_MPEG4/ISO/AVC": "AVC",
+    "V_MPEGH/ISO/HEVC": "HEVC",
+}
+
+AUDIO_FORMATS = {
+    "A_AC3": ("AC-3", "Lossy"),
+    "A_AC3/BSID9": ("AC-3", "Lossy"),
+    "A_AC3/BSID10": ("AC-3", "Lossy"),
+    "A_TRUEHD": ("MLP FBA", "Lossless"),
+    "A_FLAC": ("FLAC", "Lossless"),
+    "A_OPUS": ("Opus", "Lossy"),
+    "A_VORBIS": ("Vorbis", "Lossy"),
+    "A_MPEG/L2": ("MPEG Audio", "Lossy"),
+    "A_MPEG/L3": ("MPEG Audio", "Lossy"),
+    "A_PCM/INT/LIT": ("PCM", "Lossless"),
+    "A_PCM/INT/BIG": ("PCM", "Lossless"),
+    "A_PCM/FLOAT/IEEE": ("PCM", "Lossless"),
+}
+
+TEXT_FORMATS = {
+    "S_TEXT/UTF8": "UTF-8",
+    "S_TEXT/ASS": "ASS",
+    "S_TEXT/SSA": "SSA",
+    "S_TEXT/WEBVTT": "WebVTT",
+    "S_HDMV/PGS": "PGS",
+    "S_VOBSUB": "VobSub",
+    "S_DVBSUB": "DVB Subtitle",
+}
+
+# Codici colore (ITU-T H.273) con i nomi usati da MediaInfo
+COLOUR_PRIMARIES = {
+    1: "BT.709", 4: "BT.470 System M", 5: "BT.601 PAL", 6: "BT.601 NTSC", 7: "SMPTE 240M",
+    8: "Generic film", 9: "BT.2020", 10: "XYZ", 11: "DCI P3", 12: "Display P3", 22: "EBU Tech 3213",
+}
+
+TRANSFER_CHARACTERISTICS = {
+    1: "BT.709", 4: "BT.470 System M", 5: "BT.470 System B/G", 6: "BT.601", 7: "SMPTE 240M",
+    8: "Linear", 11: "xvYCC", 13: "sRGB/sYCC", 14: "BT.2020 (10-bit)", 15: "BT.2020 (12-bit)",
+    16: "PQ", 17: "SMPTE 428M", 18: "HLG",
+}
+
+# Lingue ISO 639-2 (bibliografiche e terminologiche) -> ISO 639-1, come le riporta MediaInfo
+LANGUAGES = {
+    "ara": "ar", "baq": "eu", "ben": "bn", "bul": "bg", "cat": "ca", "ces": "cs", "chi": "zh",
+    "cze": "cs", "dan": "da", "deu": "de", "dut": "nl", "ell": "el", "eng": "en", "est": "et",
+    "eus": "eu", "fas": "fa", "fin": "fi", "fra": "fr", "fre": "fr", "ger": "de", "glg": "gl",
+    "gre": "el", "heb": "he", "hin": "hi", "hrv": "hr", "hun": "hu", "ice": "is", "ind": "id",
+    "isl": "is", "ita": "it", "jpn": "ja", "kor": "ko", "lav": "lv", "lit": "lt", "may": "ms",
+    "msa": "ms", "nld": "nl", "nob": "nb", "nno": "nn", "nor": "no", "per": "fa", "pol": "pl",
+    "por": "pt", "ron": "ro", "rum": "ro", "rus": "ru", "slk": "sk", "slo": "sk", "slv": "sl",
+    "spa": "es", "srp": "sr", "swe": "sv", "tam": "ta", "tel": "te", "tha": "th", "tur": "tr",
+    "ukr": "uk", "urd": "ur", "vie": "vi", "zho": "zh",
+}
+
+AVC_PROFILES = {
+    44: "CAVLC 4:4:4 Intra", 66: "Baseline", 77: "Main", 88: "Extended", 100: "High",
+    110: "High 10", 122: "High 4:2:2", 244: "High 4:4:4 Predictive",
+}
+
+HEVC_PROFILES = {1: "Main", 2: "Main 10", 3: "Main Still", 4: "Format Range", 5: "High Throughput"}
+
+# Audio object type dell'AudioSpecificConfig AAC (primi 5 bit del CodecPrivate)
+AAC_OBJECT_TYPES = {1: "Main", 2: "LC", 3: "SSR", 4: "LTP"}
+
+# Profili AVC con chroma_format_idc e bit depth nella SPS
+_AVC_HIGH_PROFILES = frozenset((100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135))
+
+# Configurazione Dolby Vision nei BlockAdditionMapping (dvcC/dvvC/dvwC)
+_DOLBY_VISION_TYPES = frozenset((0x64766343, 0x64767643, 0x64767743))
+
+# Segnale compatibile del base layer Dolby Vision (dv_bl_signal_compatibility_id)
+_DOLBY_VISION_COMPATIBILITY = {1: "HDR10", 2: "SDR", 4: "HLG", 6: "Blu-ray"}
+
+# Codici encoder da cui la firma SEI dà writing library e impostazioni
+_ENCODER_SIGNATURES = ("x264 - ", "x265 (")
+
+
+class ProbeUnsupported(Exception):
+    """L'header non basta a ricavare i campi del naming: serve MediaInfo"""
+
+
+class ProbeTrack:
+    """Traccia con la stessa interfaccia di pymediainfo.Track (campi assenti = None)"""
+
+    def __init__(self, track_type, **fields):
+        self.track_type = track_type
+        self.__dict__.update((key, value) for key, value in fields.items() if value is not None)
+
+    def __getattr__(self, name):
+        # Chiamato solo per gli attributi assenti
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return None
+
+    def to_data(self):
+        return dict(self.__dict__)
+
+
+class ProbeResult:
+    """Analisi ricavata dall'header, con la stessa interfaccia di pymediainfo.MediaInfo"""
+
+    __slots__ = ("tracks", "bytes_read", "reads")
+
+    def __init__(self, tracks, bytes_read, reads):
+        self.tracks = tracks
+        self.bytes_read = bytes_read
+        self.reads = reads
+
+    def to_data(self):
+        return {"tracks": [track.to_data() for track in self.tracks]}
+
+
+# --- EBML ------------------------------------------------------------------------------------
+
+def _read_vint(data, pos, keep_marker=False):
+    # Intero a lunghezza variabile: il primo bit a 1 indica quanti byte seguono
+    if pos >= len(data):
+        raise ProbeUnsupported("EBML troncato")
+    first = data[pos]
+    if not first:
+        raise ProbeUnsupported("EBML non valido")
+    length = 9 - first.bit_length()
+    if pos + length > len(data):
+        raise ProbeUnsupported("EBML troncato")
+    value = first if keep_marker else first & (0xFF >> length)
+    all_ones = value == (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+        all_ones = all_ones and byte == 0xFF
+    if all_ones and not keep_marker:
+        value = _UNKNOWN_SIZE
+    return value, pos + length
+
+
+def _element_header(data, pos):
+    """(id, dimensione del contenuto, inizio del contenuto) dell'elemento in data[pos:]"""
+    element_id, pos = _read_vint(data, pos, keep_marker=True)
+    size, pos = _read_vint(data, pos)
+    return element_id, size, pos
+
+
+def _children(data, start, end):
+    """Elementi figli contenuti interamente in data[start:end] -> (id, inizio, fine)"""
+    pos = start
+    while pos < end:
+        element_id, size, data_start = _element_header(data, pos)
+        if size == _UNKNOWN_SIZE or data_start + size > end:
+            raise ProbeUnsupported("elemento EBML oltre il contenitore")
+        yield element_id, data_start, data_start + size
+        pos = data_start + size
+
+
+def _uint(data, start, end):
+    return int.from_bytes(data[start:end], "big")
+
+
+def _float(data, start, end):
+    if end - start == 4:
+        return struct.unpack(">f", data[start:end])[0]
+    if end - start == 8:
+        return struct.unpack(">d", data[start:end])[0]
+    return 0.0
+
+
+def _string(data, start, end):
+    return data[start:end].split(b"\x00", 1)[0].decode("utf-8", "replace")
+
+
+def _fields(data, start, end):
+    """Figli diretti di un elemento: {id: (inizio, fine)} (il primo per ogni id)"""
+    fields = {}
+    for element_id, child_start, child_end in _children(data, start, end):
+        fields.setdefault(element_id, (child_start, child_end))
+    return fields
+
+
+class _Source:
+    # File aperto con un budget massimo di byte letti
+    def __init__(self, handle, budget):
+        self.handle = handle
+        self.remaining = budget
+        self.bytes_read = 0
+        self.reads = 0
+
+    def read_at(self, offset, size):
+        if size > self.remaining:
+            raise ProbeUnsupported("budget di lettura superato")
+        self.handle.seek(offset)
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        self.bytes_read += len(data)
+        self.reads += 1
+        return data
+
+
+class _Window:
+    # Porzione del file già letta; le richieste fuori dalla porzione diventano nuove letture
+    def __init__(self, source, offset, data):
+        self.source = source
+        self.offset = offset
+        self.data = data
+
+    def get(self, offset, size):
+        start = offset - self.offset
+        if 0 <= start and start + size <= len(self.data):
+            return self.data[start:start + size]
+        data = self.source.read_at(offset, size)
+        if len(data) < size:
+            raise ProbeUnsupported("file troncato")
+        return data
+
+
+# --- Bitstream H.264 / H.265 -------------------------------------------------------------------
+
+class _BitReader:
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def u(self, bits):
+        value = 0
+        for _ in range(bits):
+            byte = self.data[self.pos >> 3]
+            value = (value << 1) | ((byte >> (7 - (self.pos & 7))) & 1)
+            self.pos += 1
+        return value
+
+    def skip(self, bits):
+        self.pos += bits
+
+    def ue(self):
+        zeros = 0
+        while not self.u(1):
+            zeros += 1
+            if zeros > 31:
+                raise ProbeUnsupported("Exp-Golomb non valido")
+        return (1 << zeros) - 1 + self.u(zeros)
+
+    def se(self):
+        value = self.ue()
+        return (value + 1) // 2 if value & 1 else -(value // 2)
+
+
+def _rbsp(nal, header_size):
+    # Payload della NAL senza byte di emulation prevention (00 00 03)
+    return nal[header_size:].replace(b"\x00\x00\x03", b"\x00\x00")
+
+
+def _vui_colour(bits):
+    """Primaries e transfer dalla VUI (None se la descrizione colore è assente)"""
+    if bits.u(1):  # aspect_ratio_info_present_flag
+        if bits.u(8) == 255:
+            bits.skip(32)
+    if bits.u(1):  # overscan_info_present_flag
+        bits.skip(1)
+    if bits.u(1):  # video_signal_type_present_flag
+        bits.skip(4)
+        if bits.u(1):  # colour_description_present_flag
+            primaries = bits.u(8)
+            transfer = bits.u(8)
+            return primaries, transfer
+    return None, None
+
+
+def _avc_sps(nal):
+    """SPS H.264 -> (bit depth, reference frames, primaries, transfer)"""
+    bits = _BitReader(_rbsp(nal, 1))
+    profile_idc = bits.u(8)
+    bits.skip(16)
+    bits.ue()
+    bit_depth = 8
+    if profile_idc in _AVC_HIGH_PROFILES:
+        chroma_format_idc = bits.ue()
+        if chroma_format_idc == 3:
+            bits.skip(1)
+        bit_depth = 8 + bits.ue()
+        bits.ue()
+        bits.skip(1)
+        if bits.u(1):  # seq_scaling_matrix_present_flag
+            for index in range(12 if chroma_format_idc == 3 else 8):
+                if bits.u(1):
+                    last_scale = next_scale = 8
+                    for _ in range(16 if index < 6 else 64):
+                        if next_scale:
+                            next_scale = (last_scale + bits.se() + 256) % 256
+                        last_scale = next_scale or last_scale
+    bits.ue()
+    poc_type = bits.ue()
+    if poc_type == 0:
+        bits.ue()
+    elif poc_type == 1:
+        bits.skip(1)
+        bits.se()
+        bits.se()
+        for _ in range(bits.ue()):
+            bits.se()
+    ref_frames = bits.ue()
+    bits.skip(1)
+    bits.ue()
+    bits.ue()
+    if not bits.u(1):  # frame_mbs_only_flag
+        bits.skip(1)
+    bits.skip(1)
+    if bits.u(1):  # frame_cropping_flag
+        for _ in range(4):
+            bits.ue()
+    primaries = transfer = None
+    if bits.u(1):  # vui_parameters_present_flag
+        primaries, transfer = _vui_colour(bits)
+    return bit_depth, ref_frames, primaries, transfer
+
+
+def _avc_pps_cabac(nal):
+    bits = _BitReader(_rbsp(nal, 1))
+    bits.ue()
+    bits.ue()
+    return bool(bits.u(1))  # entropy_coding_mode_flag
+
+
+def _hevc_scaling_list(bits):
+    for size_id in range(4):
+        for _ in range(0, 6, 3 if size_id == 3 else 1):
+            if not bits.u(1):  # scaling_list_pred_mode_flag
+                bits.ue()
+                continue
+            if size_id > 1:
+                bits.se()
+            for _ in range(min(64, 1 << (4 + (size_id << 1)))):
+                bits.se()
+
+
+def _hevc_sps(nal):
+    """SPS H.265 -> (bit depth, primaries, transfer)"""
+    bits = _BitReader(_rbsp(nal, 2))
+    bits.skip(4)
+    max_sub_layers = bits.u(3)
+    bits.skip(1)
+    # profile_tier_level
+    bits.skip(88 + 8)
+    sub_layers = [(bits.u(1), bits.u(1)) for _ in range(max_sub_layers)]
+    if max_sub_layers:
+        bits.skip(2 * (8 - max_sub_layers))
+    for profile_present, level_present in sub_layers:
+        bits.skip(88 * profile_present + 8 * level_present)
+    bits.ue()
+    if bits.ue() == 3:  # chroma_format_idc
+        bits.skip(1)
+    bits.ue()
+    bits.ue()
+    if bits.u(1):  # conformance_window_flag
+        for _ in range(4):
+            bits.ue()
+    bit_depth = 8 + bits.ue()
+    bits.ue()
+    log2_max_poc_lsb = 4 + bits.ue()
+    ordering_all_layers = bits.u(1)
+    for _ in range(0 if ordering_all_layers else max_sub_layers, max_sub_layers + 1):
+        bits.ue()
+        bits.ue()
+        bits.ue()
+    for _ in range(6):
+        bits.ue()
+    if bits.u(1) and bits.u(1):  # scaling_list_enabled_flag, sps_scaling_list_data_present_flag
+        _hevc_scaling_list(bits)
+    bits.skip(2)
+    if bits.u(1):  # pcm_enabled_flag
+        bits.skip(8)
+        bits.ue()
+        bits.ue()
+        bits.skip(1)
+    delta_pocs = []
+    for index in range(bits.ue()):  # num_short_term_ref_pic_sets
+        if index and bits.u(1):  # inter_ref_pic_set_prediction_flag
+            bits.skip(1)
+            bits.ue()
+            count = 0
+            for _ in range(delta_pocs[index - 1] + 1):
+                if bits.u(1) or bits.u(1):  # used_by_curr_pic_flag, use_delta_flag
+                    count += 1
+            delta_pocs.append(count)
+        else:
+            negative = bits.ue()
+            positive = bits.ue()
+            for _ in range(negative + positive):
+                bits.ue()
+                bits.skip(1)
+            delta_pocs.append(negative + positive)
+    if bits.u(1):  # long_term_ref_pics_present_flag
+        for _ in range(bits.ue()):
+            bits.skip(log2_max_poc_lsb + 1)
+    bits.skip(2)
+    primaries = transfer = None
+    if bits.u(1):  # vui_parameters_present_flag
+        primaries, transfer = _vui_colour(bits)
+    return bit_depth, primaries, transfer
+
+
+def _sei_messages(rbsp):
+    """Messaggi SEI -> (payload type, payload)"""
+    pos = 0
+    while pos < len(rbsp) and rbsp[pos] != 0x80:
+        payload_type = 0
+        while rbsp[pos] == 0xFF:
+            payload_type += 255
+            pos += 1
+        payload_type += rbsp[pos]
+        pos += 1
+        payload_size = 0
+        while rbsp[pos] == 0xFF:
+            payload_size += 255
+            pos += 1
+        payload_size += rbsp[pos]
+        pos += 1
+        yield payload_type, rbsp[pos:pos + payload_size]
+        pos += payload_size
+
+
+class _VideoStream:
+    # Informazioni ricavate da codec private e primo fotogramma di una traccia AVC/HEVC
+    def __init__(self, hevc):
+        self.hevc = hevc
+        self.length_size = 4
+        self.profile = None
+        self.bit_depth = None
+        self.ref_frames = None
+        self.cabac = None
+        self.primaries = None
+        self.transfer = None
+        self.writing_library = None
+        self.encoded_library_settings = None
+        self.mastering = False
+        self.hdr10_plus = False
+        self.dolby_vision_rpu = False
+
+    def parse_codec_private(self, data):
+        if self.hevc:
+            self._parse_hvcc(data)
+        else:
+            self._parse_avcc(data)
+
+    def _parse_avcc(self, data):
+        if len(data) < 7:
+            raise ProbeUnsupported("avcC non valido")
+        profile_idc, constraints, level_idc = data[1], data[2], data[3]
+        self.length_size = (data[4] & 3) + 1
+        name = AVC_PROFILES.get(profile_idc, str(profile_idc))
+        if profile_idc == 66 and constraints & 0x40:
+            name = "Constrained Baseline"
+        level = "1b" if level_idc == 11 and constraints & 0x10 else "%g" % (level_idc / 10)
+        self.profile = f"{name}@L{level}"
+        pos = 6
+        nals = []
+        for count_mask in (0x1F, 0xFF):
+            count = data[pos - 1] & count_mask
+            for _ in range(count):
+                size = int.from_bytes(data[pos:pos + 2], "big")
+                nals.append(data[pos + 2:pos + 2 + size])
+                pos += 2 + size
+            pos += 1
+        for nal in nals:
+            self.parse_nal(nal)
+
+    def _parse_hvcc(self, data):
+        if len(data) < 23:
+            raise ProbeUnsupported("hvcC non valido")
+        tier = "High" if data[1] & 0x20 else "Main"
+        name = HEVC_PROFILES.get(data[1] & 0x1F, str(data[1] & 0x1F))
+        self.profile = "%s@L%g@%s" % (name, data[12] / 30, tier)
+        self.length_size = (data[21] & 3) + 1
+        pos = 23
+        for _ in range(data[22]):
+            count = int.from_bytes(data[pos + 1:pos + 3], "big")
+            pos += 3
+            for _ in range(count):
+                size = int.from_bytes(data[pos:pos + 2], "big")
+                self.parse_nal(data[pos + 2:pos + 2 + size])
+                pos += 2 + size
+
+    def nal_type(self, header):
+        return (header[0] >> 1) & 0x3F if self.hevc else header[0] & 0x1F
+
+    def is_slice(self, nal_type):
+        return nal_type < 32 if self.hevc else 1 <= nal_type <= 5
+
+    def parse_nal(self, nal):
+        if not nal:
+            return
+        nal_type = self.nal_type(nal)
+        if self.hevc:
+            if nal_type == 33:
+                self.bit_depth, self.primaries, self.transfer = _hevc_sps(nal)
+            elif nal_type in (39, 40):
+                self._parse_sei(_rbsp(nal, 2))
+            elif nal_type in (62, 63):
+                self.dolby_vision_rpu = True
+        elif nal_type == 7:
+            self.bit_depth, self.ref_frames, self.primaries, self.transfer = _avc_sps(nal)
+        elif nal_type == 8:
+            self.cabac = _avc_pps_cabac(nal)
+        elif nal_type == 6:
+            self._parse_sei(_rbsp(nal, 1))
+
+    def _parse_sei(self, rbsp):
+        for payload_type, payload in _sei_messages(rbsp):
+            if payload_type == 5 and len(payload) > 16:
+                # user_data_unregistered: UUID e testo della firma dell'encoder
+                self._parse_encoder_signature(payload[16:].split(b"\x00", 1)[0].decode("latin-1"))
+            elif payload_type == 137:
+                self.mastering = True
+            elif payload_type == 4 and payload[:6] == b"\xb5\x00\x3c\x00\x01\x04":
+                # ITU-T T.35, Samsung, SMPTE ST 2094-40 (HDR10+)
+                self.hdr10_plus = True
+
+    def _parse_encoder_signature(self, text):
+        if self.writing_library or not text.startswith(_ENCODER_SIGNATURES):
+            return
+        parts = text.split(" - ")
+        if len(parts) < 2:
+            return
+        self.writing_library = "%s - %s" % (parts[0].split(" (")[0], parts[1])
+        options = text.partition("options: ")[2].strip()
+        if options:
+            self.encoded_library_settings = " / ".join(options.split())
+
+
+# --- Header Matroska ------------------------------------------------------------------------------
+
+class _Track:
+    __slots__ = ("number", "uid", "kind", "codec_id", "codec_private", "name", "language", "default",
+                 "forced", "default_duration", "width", "height", "bits_per_channel", "primaries",
+                 "transfer", "mastering", "dolby_vision", "channels", "strip_prefix", "encoded")
+
+    def __init__(self):
+        self.number = None
+        self.uid = None
+        self.kind = None
+        self.codec_id = ""
+        self.codec_private = b""
+        self.name = None
+        self.language = "eng"
+        self.default = True
+        self.forced = False
+        self.default_duration = None
+        self.width = None
+        self.height = None
+        self.bits_per_channel = None
+        self.primaries = None
+        self.transfer = None
+        self.mastering = False
+        self.dolby_vision = None
+        self.channels = 1
+        self.strip_prefix = b""
+        self.encoded = False
+
+
+def _parse_track(data, start, end):
+    track = _Track()
+    bcp47 = None
+    for element_id, child_start, child_end in _children(data, start, end):
+        if element_id == TRACK_NUMBER:
+            track.number = _uint(data, child_start, child_end)
+        elif element_id == TRACK_UID:
+            track.uid = _uint(data, child_start, child_end)
+        elif element_id == TRACK_TYPE:
+            track.kind = _uint(data, child_start, child_end)
+        elif element_id == CODEC_ID:
+            track.codec_id = _string(data, child_start, child_end)
+        elif element_id == CODEC_PRIVATE:
+            track.codec_private = data[child_start:child_end]
+        elif element_id == NAME:
+            track.name = _string(data, child_start, child_end)
+        elif element_id == LANGUAGE:
+            track.language = _string(data, child_start, child_end)
+        elif element_id == LANGUAGE_BCP47:
+            bcp47 = _string(data, child_start, child_end)
+        elif element_id == FLAG_DEFAULT:
+            track.default = bool(_uint(data, child_start, child_end))
+        elif element_id == FLAG_FORCED:
+            track.forced = bool(_uint(data, child_start, child_end))
+        elif element_id == DEFAULT_DURATION:
+            track.default_duration = _uint(data, child_start, child_end)
+        elif element_id == VIDEO:
+            _parse_video(track, data, child_start, child_end)
+        elif element_id == AUDIO:
+            fields = _fields(data, child_start, child_end)
+            if CHANNELS in fields:
+                track.channels = _uint(data, *fields[CHANNELS])
+        elif element_id == BLOCK_ADDITION_MAPPING:
+            fields = _fields(data, child_start, child_end)
+            if BLOCK_ADD_ID_TYPE in fields and _uint(data, *fields[BLOCK_ADD_ID_TYPE]) in _DOLBY_VISION_TYPES:
+                extra_start, extra_end = fields.get(BLOCK_ADD_ID_EXTRA_DATA, (0, 0))
+                track.dolby_vision = data[extra_start:extra_end]
+        elif element_id == CONTENT_ENCODINGS:
+            _parse_encodings(track, data, child_start, child_end)
+    if bcp47:
+        track.language = bcp47
+    return track
+
+
+def _parse_video(track, data, start, end):
+    fields = _fields(data, start, end)
+    crop = {element_id: _uint(data, *fields[element_id]) for element_id in
+            (PIXEL_CROP_TOP, PIXEL_CROP_BOTTOM, PIXEL_CROP_LEFT, PIXEL_CROP_RIGHT) if element_id in fields}
+    if PIXEL_WIDTH in fields:
+        track.width = _uint(data, *fields[PIXEL_WIDTH]) - crop.get(PIXEL_CROP_LEFT, 0) - crop.get(PIXEL_CROP_RIGHT, 0)
+    if PIXEL_HEIGHT in fields:
+        track.height = _uint(data, *fields[PIXEL_HEIGHT]) - crop.get(PIXEL_CROP_TOP, 0) - crop.get(PIXEL_CROP_BOTTOM, 0)
+    if COLOUR in fields:
+        colour = _fields(data, *fields[COLOUR])
+        if BITS_PER_CHANNEL in colour:
+            track.bits_per_channel = _uint(data, *colour[BITS_PER_CHANNEL]) or None
+        if PRIMARIES in colour:
+            track.primaries = _uint(data, *colour[PRIMARIES])
+        if TRANSFER in colour:
+            track.transfer = _uint(data, *colour[TRANSFER])
+        track.mastering = MASTERING_METADATA in colour
+
+
+def _parse_encodings(track, data, start, end):
+    for element_id, encoding_start, encoding_end in _children(data, start, end):
+        if element_id != CONTENT_ENCODING:
+            continue
+        encoding = _fields(data, encoding_start, encoding_end)
+        compression = _fields(data, *encoding[CONTENT_COMPRESSION]) if CONTENT_COMPRESSION in encoding else None
+        # Solo la rimozione dell'header (algoritmo 3) si ricostruisce senza decomprimere
+        if (CONTENT_ENCRYPTION in encoding or compression is None
+                or CONTENT_COMP_ALGO not in compression or _uint(data, *compression[CONTENT_COMP_ALGO]) != 3):
+            track.encoded = True
+        elif CONTENT_COMP_SETTINGS in compression:
+            track.strip_prefix += data[slice(*compression[CONTENT_COMP_SETTINGS])]
+
+
+def _parse_tags(data, start, end):
+    """Tag per traccia (TagTrackUID) -> {nome: valore}"""
+    tags = {}
+    for element_id, tag_start, tag_end in _children(data, start, end):
+        if element_id != TAG:
+            continue
+        uids = []
+        values = {}
+        for child_id, child_start, child_end in _children(data, tag_start, tag_end):
+            if child_id == TARGETS:
+                uids = [_uint(data, target_start, target_end)
+                        for target_id, target_start, target_end in _children(data, child_start, child_end)
+                        if target_id == TAG_TRACK_UID]
+            elif child_id == SIMPLE_TAG:
+                fields = _fields(data, child_start, child_end)
+                if TAG_NAME in fields and TAG_STRING in fields:
+                    values[_string(data, *fields[TAG_NAME]).upper()] = _string(data, *fields[TAG_STRING])
+        for uid in uids:
+            tags.setdefault(uid, {}).update(values)
+    return tags
+
+
+def _language(track, strict=True):
+    # Le lingue audio finiscono nel titolo: un codice che MediaInfo riporterebbe diverso non si indovina
+    language = track.language
+    if not language or language == "und":
+        return None
+    if len(language) == 3 and language not in LANGUAGES:
+        if strict:
+            raise ProbeUnsupported(f"lingua {language} non mappata")
+        return language
+    return LANGUAGES.get(language, language)
+
+
+def _hdr_fields(track, stream):
+    """Campi HDR_Format* come li compone MediaInfo (una voce per formato, separate da " / ")"""
+    components = []
+    if track.dolby_vision:
+        config = track.dolby_vision
+        if len(config) < 5:
+            raise ProbeUnsupported("configurazione Dolby Vision non valida")
+        profile = config[2] >> 1
+        level = ((config[2] & 1) << 5) | (config[3] >> 3)
+        layers = "BL+EL+RPU" if config[3] & 0x02 else "BL+RPU"
+        codec = {9: "dvav", 10: "dav1"}.get(profile, "dvhe")
+        components.append(("Dolby Vision", "%s.%02d" % (codec, profile), "%02d" % level, layers,
+                           "%d.%d" % (config[0], config[1]), _DOLBY_VISION_COMPATIBILITY.get(config[4] >> 4, "")))
+    if stream.hdr10_plus:
+        components.append(("SMPTE ST 2094 App 4", "", "", "", "1", "HDR10+"))
+    elif stream.mastering or track.mastering:
+        components.append(("SMPTE ST 2086", "", "", "", "", "HDR10"))
+    if not components:
+        return {}
+    names = ("hdr_format", "hdr_format_profile", "hdr_format_level", "hdr_format_settings",
+             "hdr_format_version", "hdr_format_compatibility")
+    fields = {}
+    for index, name in enumerate(names):
+        values = [component[index] for component in components]
+        if any(values):
+            fields[name] = " / ".join(values)
+    return fields
+
+
+class _Probe:
+    def __init__(self, handle, file_path, window, budget):
+        self.source = _Source(handle, budget)
+        self.file_path = file_path
+        self.window_size = window
+        self.file_size = os.fstat(handle.fileno()).st_size
+
+    def _element(self, head, offset, expected_id, limit):
+        # Contenuto dell'elemento all'offset indicato, dalla porzione già letta se possibile
+        header = head.get(offset, min(12, self.file_size - offset))
+        element_id, size, data_start = _element_header(header, 0)
+        if element_id != expected_id or size == _UNKNOWN_SIZE or size > limit:
+            raise ProbeUnsupported("elemento %x non leggibile" % expected_id)
+        return head.get(offset + data_start, size)
+
+    def run(self):
+        head = _Window(self.source, 0, self.source.read_at(0, min(self.window_size, self.file_size)))
+        data = head.data
+        element_id, size, pos = _element_header(data, 0)
+        if element_id != EBML_HEADER:
+            raise ProbeUnsupported("non è un file Matroska")
+        fields = _fields(data, pos, pos + size)
+        doc_type = _string(data, *fields[DOC_TYPE]) if DOC_TYPE in fields else None
+        if doc_type not in ("matroska", "webm"):
+            raise ProbeUnsupported("DocType non supportato")
+        element_id, _size, segment_start = _element_header(data, pos + size)
+        if element_id != SEGMENT:
+            raise ProbeUnsupported("Segment mancante")
+
+        # Elementi di primo livello: in sequenza nella porzione letta, poi dal SeekHead
+        positions = {}
+        pos = segment_start
+        while pos + 12 <= len(data):
+            element_id, size, data_start = _element_header(data, pos)
+            positions.setdefault(element_id, pos)
+            if element_id == SEEK_HEAD and data_start + size <= len(data):
+                self._parse_seek_head(data, data_start, data_start + size, segment_start, positions)
+            if element_id == CLUSTER or size == _UNKNOWN_SIZE:
+                break
+            pos = data_start + size
+        if INFO not in positions or TRACKS not in positions:
+            raise ProbeUnsupported("Info o Tracks non trovati")
+
+        budget = self.source.remaining
+        info = self._element(head, positions[INFO], INFO, budget)
+        tracks = [_parse_track(element, start, end)
+                  for element in [self._element(head, positions[TRACKS], TRACKS, budget)]
+                  for element_id, start, end in _children(element, 0, len(element)) if element_id == TRACK_ENTRY]
+        tags = {}
+        if TAGS in positions:
+            element = self._element(head, positions[TAGS], TAGS, self.source.remaining)
+            tags = _parse_tags(element, 0, len(element))
+        return self._build(doc_type, info, tracks, tags, positions.get(CLUSTER))
+
+    def _parse_seek_head(self, data, start, end, segment_start, positions):
+        for element_id, seek_start, seek_end in _children(data, start, end):
+            if element_id != SEEK:
+                continue
+            fields = _fields(data, seek_start, seek_end)
+            if SEEK_ID in fields and SEEK_POSITION in fields:
+                target = _uint(data, *fields[SEEK_ID])
+                positions.setdefault(target, segment_start + _uint(data, *fields[SEEK_POSITION]))
+
+    def _first_frame(self, cluster_offset, track):
+        """Primo fotogramma della traccia nel primo cluster -> (finestra, offset nel file, dimensione)"""
+        window = _Window(self.source, cluster_offset, self.source.read_at(
+            cluster_offset, min(self.window_size, self.file_size - cluster_offset)))
+        data = window.data
+        element_id, _size, pos = _element_header(data, 0)
+        if element_id != CLUSTER:
+            raise ProbeUnsupported("Cluster non trovato")
+        while pos + 12 <= len(data):
+            element_id, size, data_start = _element_header(data, pos)
+            if element_id == BLOCK_GROUP:
+                pos = data_start  # il Block è fra i figli del BlockGroup
+                continue
+            if element_id in (SIMPLE_BLOCK, BLOCK):
+                number, block_pos = _read_vint(data, data_start)
+                if number == track.number:
+                    if data[block_pos + 2] & 0x06:
+                        raise ProbeUnsupported("lacing nella traccia video")
+                    return window, cluster_offset + block_pos + 3, data_start + size - block_pos - 3
+            pos = data_start + size
+        raise ProbeUnsupported("primo fotogramma video oltre la finestra letta")
+
+    @staticmethod
+    def _scan_frame(stream, window, offset, size, prefix, whole_frame):
+        """Legge parametri e SEI del fotogramma; le slice si saltano usando le lunghezze delle NAL"""
+        def read(pos, count):
+            # Il fotogramma è il prefisso rimosso dal muxer (header stripping) seguito dai dati nel file
+            head = prefix[pos:pos + count]
+            if len(head) == count:
+                return head
+            return head + window.get(offset + max(0, pos - len(prefix)), count - len(head))
+
+        wanted = (39, 40) if stream.hevc else (6, 7, 8)
+        length_size = stream.length_size
+        total = len(prefix) + size
+        pos = 0
+        while pos + length_size + 2 <= total:
+            header = read(pos, length_size + 2)
+            length = int.from_bytes(header[:length_size], "big")
+            if not length or pos + length_size + length > total:
+                raise ProbeUnsupported("NAL non valida nel primo fotogramma")
+            nal_type = stream.nal_type(header[length_size:])
+            if stream.is_slice(nal_type):
+                if not whole_frame:
+                    return  # SEI e parametri precedono la prima slice
+            elif nal_type in wanted:
+                stream.parse_nal(read(pos + length_size, length))
+            elif stream.hevc and nal_type in (62, 63):
+                stream.dolby_vision_rpu = True
+            pos += length_size + length
+
+    def _video_track(self, track, tags, cluster_offset):
+        video_format = VIDEO_FORMATS.get(track.codec_id)
+        if video_format is None:
+            raise ProbeUnsupported(f"codec video {track.codec_id} non supportato")
+        if not track.width or not track.height or track.encoded:
+            raise ProbeUnsupported("traccia video incompleta")
+        if cluster_offset is None:
+            raise ProbeUnsupported("primo cluster non trovato")
+        stream = _VideoStream(video_format == "HEVC")
+        stream.parse_codec_private(track.codec_private)
+        window, frame_offset, frame_size = self._first_frame(cluster_offset, track)
+        # Nelle HEVC l'RPU Dolby Vision segue le slice: senza configurazione nel contenitore va cercato
+        whole_frame = stream.hevc and not track.dolby_vision
+        self._scan_frame(stream, window, frame_offset, frame_size, track.strip_prefix, whole_frame)
+        if stream.dolby_vision_rpu and not track.dolby_vision:
+            raise ProbeUnsupported("Dolby Vision senza configurazione nel contenitore")
+
+        statistics = tags.get(track.uid, {})
+        writing_library = stream.writing_library or statistics.get("ENCODER")
+        bit_rate = statistics.get("BPS")
+        if bit_rate is None:
+            # Senza firma di un encoder il naming distingue REMUX ed ENCODE dal bitrate video
+            from scene_namer import ENCODING_INDICATORS
+            if not any(indicator in (writing_library or "").lower() for indicator in ENCODING_INDICATORS):
+                raise ProbeUnsupported("bitrate video non presente nei tag")
+
+        format_settings = None
+        if video_format == "AVC" and stream.ref_frames is not None:
+            format_settings = "%d Ref Frames" % stream.ref_frames
+            if stream.cabac:
+                format_settings = "CABAC / " + format_settings
+        primaries = stream.primaries if stream.primaries is not None else track.primaries
+        transfer = stream.transfer if stream.transfer is not None else track.transfer
+        stream.mastering = stream.mastering or track.mastering
+        return ProbeTrack(
+            "Video",
+            format=video_format,
+            format_profile=stream.profile,
+            format_settings=format_settings,
+            codec_id=track.codec_id,
+            width=track.width,
+            height=track.height,
+            bit_rate=int(bit_rate) if bit_rate and bit_rate.isdigit() else None,
+            frame_rate="%.3f" % (1e9 / track.default_duration) if track.default_duration else None,
+            bit_depth=stream.bit_depth or track.bits_per_channel,
+            writing_library=writing_library,
+            encoded_library_settings=stream.encoded_library_settings,
+            color_primaries=COLOUR_PRIMARIES.get(primaries),
+            transfer_characteristics=TRANSFER_CHARACTERISTICS.get(transfer),
+            language=_language(track, strict=False),
+            title=track.name,
+            default="Yes" if track.default else "No",
+            forced="Yes" if track.forced else "No",
+            **_hdr_fields(track, stream))
+
+    def _build(self, doc_type, info_data, tracks, tags, cluster_offset):
+        info = _fields(info_data, 0, len(info_data))
+        scale = _uint(info_data, *info[TIMESTAMP_SCALE]) if TIMESTAMP_SCALE in info else 1000000
+        duration_ms = None
+        if DURATION in info:
+            duration_ms = int(round(_float(info_data, *info[DURATION]) * scale / 1e6))
+
+        general = ProbeTrack(
+            "General",
+            format="WebM" if doc_type == "webm" else "Matroska",
+            file_name=os.path.splitext(os.path.basename(self.file_path))[0],
+            complete_name=self.file_path,
+            file_size=self.file_size,
+            duration=duration_ms,
+            overall_bit_rate=int(round(self.file_size * 8000 / duration_ms)) if duration_ms else None,
+            # Come MediaInfo: WritingApp è l'applicazione (mkvmerge), MuxingApp la libreria (libebml)
+            writing_application=_string(info_data, *info[WRITING_APP]) if WRITING_APP in info else None,
+            writing_library=_string(info_data, *info[MUXING_APP]) if MUXING_APP in info else None)
+        result = [general]
+
+        video_seen = audio_seen = False
+        for track in tracks:
+            statistics = tags.get(track.uid, {})
+            if track.kind == 1:
+                if not video_seen:
+                    result.append(self._video_track(track, tags, cluster_offset))
+                    video_seen = True
+                else:
+                    result.append(ProbeTrack("Video", format=VIDEO_FORMATS.get(track.codec_id, track.codec_id),
+                                             codec_id=track.codec_id, width=track.width, height=track.height))
+            elif track.kind == 2:
+                audio_format = AUDIO_FORMATS.get(track.codec_id)
+                features = None
+                if track.codec_id.startswith("A_AAC"):
+                    audio_format = ("AAC", "Lossy")
+                    if track.codec_private:
+                        features = AAC_OBJECT_TYPES.get(track.codec_private[0] >> 3)
+                if audio_format is None:
+                    # Formato (o Atmos/DTS-HD) ricavabile solo dal flusso: conta per la prima traccia
+                    if not audio_seen:
+                        raise ProbeUnsupported(f"formato audio {track.codec_id} non determinabile dall'header")
+                    audio_format = (track.codec_id, None)
+                audio_seen = True
+                bit_rate = statistics.get("BPS")
+                result.append(ProbeTrack(
+                    "Audio",
+                    format=audio_format[0],
+                    codec_id=track.codec_id,
+                    channel_s=track.channels,
+                    bit_rate=int(bit_rate) if bit_rate and bit_rate.isdigit() else None,
+                    compression_mode=audio_format[1],
+                    format_additionalfeatures=features,
+                    writing_library=statistics.get("ENCODER"),
+                    language=_language(track),
+                    title=track.name,
+                    default="Yes" if track.default else "No",
+                    forced="Yes" if track.forced else "No"))
+            elif track.kind == 17:
+                result.append(ProbeTrack(
+                    "Text",
+                    format=TEXT_FORMATS.get(track.codec_id, track.codec_id),
+                    codec_id=track.codec_id,
+                    writing_library=statistics.get("ENCODER"),
+                    language=_language(track, strict=False),
+                    title=track.name,
+                    default="Yes" if track.default else "No",
+                    forced="Yes" if track.forced else "No"))
+        if not video_seen:
+            raise ProbeUnsupported("nessuna traccia video")
+        return ProbeResult(result, self.source.bytes_read, self.source.reads)
+
+
+def probe_file(file_path, window_kb=None, max_read_kb=None):
+    """Legge l'header Matroska del file
+
+    Parameters
+    ----------
+    file_path : str
+        Percorso del file MKV/WebM.
+    window_kb, max_read_kb : int, optional
+        Byte letti per finestra e in totale (default da MKV_PROBE_CONFIG).
+
+    Returns
+    -------
+    ProbeResult
+
+    Raises
+    ------
+    ProbeUnsupported
+        Se i campi del naming non si ricavano dall'header: il file va analizzato con MediaInfo.
+    OSError
+        Se il file non si può leggere.
+    """
+    window = (window_kb or MKV_PROBE_CONFIG["window_kb"]) * 1024
+    budget = (max_read_kb or MKV_PROBE_CONFIG["max_read_kb"]) * 1024
+    with open(file_path, "rb") as handle:
+        try:
+            return _Probe(handle, file_path, window, budget).run()
+        except (IndexError, ValueError, struct.error) as e:
+            raise ProbeUnsupported(f"header non valido: {e}")
+
+
+def probe_media(file_path):
+    """Analisi dall'header se il file è un Matroska leggibile così, altrimenti None (usare MediaInfo)"""
+    if not MKV_PROBE_CONFIG["enabled"] or not file_path.lower().endswith(tuple(MKV_PROBE_CONFIG["extensions"])):
+        return None
+    try:
+        return probe_file(file_path)
+    except (ProbeUnsupported, OSError):
+        return None
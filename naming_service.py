@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+MKV Rename Assistant - Servizio HTTP locale
+Un processo sempre attivo espone analisi, naming e rinomina come API JSON: gli script di
+post-elaborazione (Sonarr/Radarr) e il client di download non avviano l'applicazione a ogni
+file, e libmediainfo, cache e client TMDb restano caricati fra una richiesta e l'altra
+
+    POST /analyze  {"path": ...}                                    metadati del file
+    POST /name     {"path": ..., "tmdb": true}                      nuovo nome e titolo tracker
+    POST /rename   {"path": ..., "new_name": ..., "link_to": ...}   rinomina (o hardlink) con journal
+    GET  /health                                                    stato del servizio
+    GET  /metrics                                                   misure in formato Prometheus
+
+Uso:
+    python -m mkv_rename_assistant serve [--host H] [--port P] [--workers N] [--tmdb] [--no-cache]
+"""
+
+import argparse
+import hmac
+import ipaddress
+import json
+import os
+import socket
+import sys
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import ERROR_MESSAGES, MEDIAINFO_CACHE_CONFIG, SERVICE_CONFIG
+from batch_rename import (MediaFileFilter, TMDbSelection, analyze_path, close_tmdb_client, open_tmdb_client,
+                          resolve_tmdb, _init_worker)
+from metrics import metrics
+
+
+class ServiceError(Exception):
+    """Errore restituito al client come {"error": ...} con il codice HTTP indicato"""
+
+    def __init__(self, status, message, retry_after=None, **fields):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.fields = fields
+
+
+def _is_within(path, root):
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def _host_name(header):
+    # Nome dell'header Host senza porta ("[::1]:8765" -> "::1")
+    header = (header or "").strip().lower()
+    if header.startswith("["):
+        return header[1:].partition("]")[0]
+    return header.partition(":")[0] if header.count(":") == 1 else header
+
+
+def _is_ip_literal(name):
+    try:
+        ipaddress.ip_address(name)
+    except ValueError:
+        return False
+    return True
+
+
+def _review_candidates(ranked, limit=5):
+    from tmdb_matcher import result_title, result_year
+
+    return [{"id": scored.result.get("id"), "title": result_title(scored.result),
+             "year": result_year(scored.result), "score": round(scored.score, 3)}
+            for scored in ranked[:limit]]
+
+
+def _naming_response(result, selection):
+    response = {
+        "path": result["path"],
+        "new_name": result["new_name"],
+        "scene_title": result["scene_title"],
+        "tmdb": result["tmdb"],
+        "content_type": selection.content_type,
+        "cache_hit": result["cache_hit"],
+        "incomplete": result["incomplete"],
+        "tier": result["tier"],
+        "timings_ms": {name: round(wall * 1000, 3) for name, (wall, _cpu) in result["timings"].items()},
+    }
+    if selection.episode and selection.episode.get("name"):
+        response["episode"] = selection.episode["name"]
+    if selection.review:
+        response["review"] = _review_candidates(selection.review)
+    return response
+
+
+class NamingService:
+    """Stato condiviso dalle richieste: cache MediaInfo, client TMDb, worker e limite di frequenza
+
+    Al massimo `workers` richieste vengono elaborate insieme; le altre attendono un worker
+    libero fino a "queue_timeout" secondi. Le rinomine sono serializzate.
+    """
+
+    def __init__(self, workers=None, tmdb=False, use_cache=True, host=None, out=sys.stderr):
+        # Caricati subito: la prima richiesta non paga l'import di pymediainfo
+        from pymediainfo import MediaInfo  # noqa: F401
+
+        _init_worker(use_cache and MEDIAINFO_CACHE_CONFIG["enabled"])
+        self.out = out
+        self.workers = workers or SERVICE_CONFIG["workers"] or os.cpu_count() or 1
+        self.tmdb_client = open_tmdb_client(out) if tmdb else None
+        self.token = SERVICE_CONFIG["token"] or os.environ.get("MKV_RENAME_TOKEN")
+        self.roots = [os.path.realpath(root) for root in SERVICE_CONFIG["allowed_roots"]]
+        self.file_filter = MediaFileFilter()
+        # Nomi accettati nell'header Host (gli indirizzi IP sono sempre accettati)
+        self.hosts = {name.lower() for name in (host or SERVICE_CONFIG["host"], "localhost", socket.gethostname(),
+                                                *SERVICE_CONFIG["allowed_hosts"]) if name}
+        self.limiter = None
+        if SERVICE_CONFIG["requests_per_second"]:
+            from tmdb_client import TokenBucket
+            self.limiter = TokenBucket(SERVICE_CONFIG["requests_per_second"], SERVICE_CONFIG["burst"])
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._rename_lock = threading.Lock()
+        self.routes = {"/analyze": self.analyze, "/name": self.name, "/rename": self.rename}
+
+    @contextmanager
+    def slot(self):
+        """Occupa un worker per la durata della richiesta (429/503 se non disponibile)"""
+        if self.limiter is not None and not self.limiter.try_acquire():
+            raise ServiceError(429, "Troppe richieste", retry_after=1)
+        if not self._slots.acquire(timeout=SERVICE_CONFIG["queue_timeout"]):
+            raise ServiceError(503, "Tutti i worker sono occupati", retry_after=SERVICE_CONFIG["queue_timeout"])
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def check_origin(self, headers, post=False):
+        """Rifiuta le richieste che possono arrivare da una pagina web (CSRF, DNS rebinding)
+
+        L'header Host deve essere un indirizzo IP o un nome della macchina (un dominio che
+        punta a 127.0.0.1 non basta); le POST devono essere JSON e senza Origin: un browser lo
+        invia nelle richieste fra origini diverse e non può inviare application/json a
+        un'altra origine senza preflight CORS (mai accettato qui).
+        """
+        name = _host_name(headers.get("Host"))
+        if name not in self.hosts and not _is_ip_literal(name):
+            raise ServiceError(421, "Host non ammesso")
+        if not post:
+            return
+        if headers.get("Origin") is not None:
+            raise ServiceError(403, "Richieste dal browser non ammesse")
+        content_type = (headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            raise ServiceError(415, "Content-Type deve essere application/json")
+
+    def authorized(self, header):
+        if not self.token:
+            return True
+        return hmac.compare_digest(header or "", f"Bearer {self.token}")
+
+    def _checked_path(self, body, key="path"):
+        path = body.get(key)
+        if not isinstance(path, str) or not path:
+            raise ServiceError(400, f"Campo \"{key}\" mancante")
+        path = os.path.abspath(path)
+        if self.roots and not any(_is_within(os.path.realpath(path), root) for root in self.roots):
+            raise ServiceError(403, f"{path} è fuori dalle cartelle consentite")
+        return path
+
+    def _checked_media(self, body):
+        # File esistente e candidato alla rinomina (stessi criteri della scansione batch)
+        path = self._checked_path(body)
+        if not os.path.isfile(path):
+            raise ServiceError(404, ERROR_MESSAGES["file_not_exists"])
+        reason = self.file_filter.skip_reason(os.path.basename(path), os.path.getsize(path))
+        if reason:
+            raise ServiceError(422, f"File non accettato: {self.file_filter.describe(reason)}")
+        return path
+
+    def _analyze(self, body, include_meta=False):
+        path = self._checked_media(body)
+        selection = TMDbSelection()
+        if body.get("tmdb", True) and self.tmdb_client is not None:
+            selection = resolve_tmdb([path], self.out, client=self.tmdb_client)[0]
+        result = analyze_path(path, selection.result, selection.content_type, include_meta=include_meta)
+        metrics.record_all(result["timings"], file=path, cache_hit=result["cache_hit"])
+        if result["error"]:
+            raise ServiceError(422, result["error"])
+        return result, selection
+
+    def analyze(self, body):
+        """Metadati del file (senza TMDb)"""
+        result, _ = self._analyze(dict(body, tmdb=False), include_meta=True)
+        return {"path": result["path"], "metadata": result["meta"], "field_tiers": result["field_tiers"],
+                "cache_hit": result["cache_hit"]}
+
+    def name(self, body):
+        """Nuovo nome e titolo tracker; con TMDb ambiguo elenca i candidati in "review" """
+        return _naming_response(*self._analyze(body))
+
+    def rename(self, body):
+        """Rinomina il file sul posto (registrata nel journal, annullabile) o crea un hardlink in link_to
+
+        Con "new_name" si usa il nome indicato, altrimenti quello generato; un risultato
+        TMDb ambiguo non viene applicato (409 con i candidati).
+        """
+        from rename_plan import apply_plan, build_plan
+        from watch_folder import link_into
+
+        new_name = body.get("new_name")
+        if new_name is not None:
+            if not isinstance(new_name, str) or os.path.basename(new_name) != new_name or new_name in ("", ".", ".."):
+                raise ServiceError(400, "\"new_name\" deve essere un nome di file, senza cartelle")
+            reason = self.file_filter.skip_reason(new_name)
+            if reason:
+                raise ServiceError(400, f"\"new_name\" non accettato: {self.file_filter.describe(reason)}")
+            path = self._checked_media(body)
+            result = {"path": path, "new_name": new_name}
+            response = {"path": path, "new_name": new_name}
+        else:
+            result, selection = self._analyze(body)
+            if selection.review:
+                raise ServiceError(409, "Risultato TMDb ambiguo, da rivedere", review=_review_candidates(selection.review))
+            response = _naming_response(result, selection)
+
+        link_to = self._checked_path(body, "link_to") if body.get("link_to") is not None else None
+        journal_path = None
+        with self._rename_lock:
+            if link_to:
+                if not os.path.isdir(link_to):
+                    raise ServiceError(404, f"Cartella non trovata: {link_to}")
+                with metrics.stage("rename", file=result["path"]):
+                    error = link_into(result, link_to)
+                new_path = os.path.join(link_to, result["new_name"])
+            else:
+                plan = build_plan([(result["path"], result["new_name"])])
+                journal_path = apply_plan(plan)
+                failed = plan.conflicts + [op for op in plan.ops if op.error]
+                error = failed[0].error if failed else None
+                new_path = os.path.join(os.path.dirname(result["path"]), result["new_name"])
+        if error:
+            raise ServiceError(409, error)
+        response.update(new_path=new_path, journal=journal_path)
+        return response
+
+    def health(self):
+        return {"status": "ok", "workers": self.workers, "tmdb": self.tmdb_client is not None,
+                "tmdb_available": self.tmdb_client.available if self.tmdb_client is not None else None}
+
+    def close(self):
+        if self.tmdb_client is not None:
+            close_tmdb_client(self.tmdb_client)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1: gli script possono riusare la connessione fra una richiesta e l'altra
+    protocol_version = "HTTP/1.1"
+    server_version = "mkv-rename-assistant"
+
+    def _send(self, status, payload, content_type="application/json; charset=utf-8", retry_after=None):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if retry_after:
+            self.send_header("Retry-After", str(int(retry_after)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            raise ServiceError(411, "Content-Length mancante")
+        if length < 0:
+            # rfile.read(-1) aspetterebbe la chiusura della connessione: il corpo non è delimitato
+            self.close_connection = True
+            raise ServiceError(400, "Content-Length non valido")
+        if length > SERVICE_CONFIG["max_body_bytes"]:
+            raise ServiceError(413, "Richiesta troppo grande")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            raise ServiceError(400, f"JSON non valido: {e}")
+        if not isinstance(body, dict):
+            raise ServiceError(400, "Il corpo della richiesta deve essere un oggetto JSON")
+        return body
+
+    def do_GET(self):
+        service = self.server.service
+        try:
+            service.check_origin(self.headers)
+        except ServiceError as e:
+            self._send(e.status, {"error": str(e)})
+            return
+        if self.path == "/health":
+            self._send(200, service.health())
+        elif not service.authorized(self.headers.get("Authorization")):
+            self._send(401, {"error": "Token mancante o non valido"})
+        elif self.path == "/metrics":
+            self._send(200, metrics.to_prometheus().encode("utf-8"), content_type="text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": "Endpoint sconosciuto"})
+
+    def do_POST(self):
+        service = self.server.service
+        handler = service.routes.get(self.path)
+        endpoint = self.path if handler else "other"
+        retry_after = None
+        try:
+            # Il corpo va letto comunque: la connessione resta utilizzabile anche dopo un errore
+            body = self._read_json()
+            service.check_origin(self.headers, post=True)
+            if not service.authorized(self.headers.get("Authorization")):
+                raise ServiceError(401, "Token mancante o non valido")
+            if handler is None:
+                raise ServiceError(404, "Endpoint sconosciuto")
+            with service.slot():
+                status, payload = 200, handler(body)
+        except ServiceError as e:
+            status, payload, retry_after = e.status, dict(e.fields, error=str(e)), e.retry_after
+            if status in (411, 413):
+                self.close_connection = True
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        metrics.count("http_requests_total", endpoint=endpoint, status=status)
+        self._send(status, payload, retry_after=retry_after)
+        metrics.flush()
+
+    def log_message(self, format, *args):
+        print("[%s] %s" % (self.log_date_time_string(), format % args), file=self.server.service.out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="mkv_rename_assistant serve",
+        description="Servizio HTTP locale per analisi, naming e rinomina dei file video")
+    parser.add_argument("--host", default=SERVICE_CONFIG["host"], help="Indirizzo di ascolto")
+    parser.add_argument("--port", type=int, default=SERVICE_CONFIG["port"], help="Porta di ascolto")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Richieste elaborate contemporaneamente (default: numero di core)")
+    parser.add_argument("--tmdb", action="store_true", help="Corregge titolo e anno con TMDb")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false", help="Ignora la cache MediaInfo")
+    args = parser.parse_args(argv)
+
+    service = NamingService(workers=args.workers, tmdb=args.tmdb, use_cache=args.use_cache, host=args.host)
+    try:
+        server = ThreadingHTTPServer((args.host, args.port), _Handler)
+    except OSError as e:
+        service.close()
+        parser.error(f"Impossibile ascoltare su {args.host}:{args.port}: {e}")
+    server.daemon_threads = True
+    server.service = service
+    print(f"In ascolto su http://{args.host}:{args.port} ({service.workers} worker"
+          f"{', TMDb' if service.tmdb_client else ''})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Interrotto", file=sys.stderr)
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Tokenizer dei nomi di release
+Scompone il nome di un file in token tipizzati con un solo passaggio:
+tutte le euristiche sul nome (titolo, anno, episodio, sorgente, servizio, HDR, gruppo)
+leggono da qui invece di riesaminare la stringa ciascuna con le proprie regex.
+"""
+
+import re
+from functools import lru_cache
+
+from config import RENAME_CONFIG
+
+# Tipi di token
+TITLE = "title"
+YEAR = "year"
+EPISODE = "episode"
+RESOLUTION = "resolution"
+SOURCE = "source"
+SERVICE = "service"
+VIDEO_CODEC = "video_codec"
+AUDIO = "audio"
+HDR = "hdr"
+MARKER = "marker"
+LANGUAGE = "language"
+EDITION = "edition"
+GROUP = "group"
+WORD = "word"
+
+# Servizi streaming riconosciuti nel nome
+STREAMING_SERVICES = ("AMZN", "AMAZON", "NETFLIX", "NF", "DSNP", "DISNEY", "HULU", "ATVP", "APPLE", "HMAX", "PMTP")
+
+# Marker REMUX/VU/UNTOUCHED della configurazione
+_REMUX_MARKERS = frozenset(marker.upper() for marker in RENAME_CONFIG["remux_markers"])
+
+# Forme alternative ricondotte a un unico valore
+_CANONICAL_VALUES = {
+    SOURCE: {"DLMUX": "WEBDL", "WEBMUX": "WEBDL", "BDREMUX": "REMUX"},
+    HDR: {"DOVI": "DV", "DOLBYVISION": "DV", "HDR10+": "HDR10", "HDR10PLUS": "HDR10"},
+}
+
+# Token tipizzati in ordine di priorità: le forme composte (WEB-DL, DTS-HD.MA, H.264) prima delle parti
+_TOKEN_PATTERNS = (
+    (EPISODE, r"S(?P<season_no>\d{1,3})(?:E(?P<episode_no>\d{1,4}))?"),
+    (YEAR, r"(?:19|20)\d{2}"),
+    (RESOLUTION, r"\d{3,4}[PI]|[48]K|UHD"),
+    (MARKER, "|".join(sorted((re.escape(m) for m in RENAME_CONFIG["remux_markers"]), key=len, reverse=True))),
+    (SOURCE, r"WEB[-. ]?DL|WEB[-. ]?RIP|DLMUX|WEBMUX|BDREMUX|BLU[-. ]?RAY|BDRIP|BRRIP|HDTV|DVDRIP|DVD|WEB"),
+    (SERVICE, "|".join(STREAMING_SERVICES)),
+    (VIDEO_CODEC, r"[XH][-. ]?26[45]|HEVC|AVC|AV1|XVID|DIVX|VC[-]?1|MPEG[-]?2"),
+    (AUDIO, r"E[-]?AC[-]?3|AC[-]?3|DDP(?:\d[. ]\d)?|DD\+?(?:\d[. ]\d)?|TRUEHD|ATMOS"
+            r"|DTS[-. ]?HD[-. ]?(?:MA|HRA)|DTS[-. ]?HD|DTS[-. ]?X|DTS|AAC(?:\d[. ]\d)?|FLAC|L?PCM|OPUS|MP3|\d\.\d"),
+    (HDR, r"DV|DOVI|DOLBY[-. ]?VISION|HDR10(?:\+|PLUS)?|HDR|HLG"),
+    (LANGUAGE, r"ITALIANO|ITALIAN|ITA|ENGLISH|ENG|SPANISH|SPA|FRENCH|FRA|GERMAN|GER|JAPANESE|JPN"
+               r"|MULTI|DUAL|SUBS?|DUBBED|DUB"),
+    (EDITION, r"PROPER|REPACK|READNFO|INTERNAL|LIMITED|UNRATED|UNCUT|EXTENDED|THEATRICAL|REMASTERED"
+              r"|CRITERION|IMAX|HYBRID|DIRECTOR'?S?[-. ]?CUT"),
+)
+
+# Un'unica regex: ogni token tipizzato deve occupare una parola intera, il resto sono parole generiche
+_TOKEN_REGEX = re.compile(
+    r"(?<!\w)(?:" + "|".join("(?P<%s>%s)" % (kind, pattern) for kind, pattern in _TOKEN_PATTERNS) + r")(?!\w)"
+    r"|(?P<" + WORD + r">\w+)",
+    re.IGNORECASE)
+
+# Caratteri da togliere ai bordi del titolo (separatori e parentesi aperte prima dell'anno)
+_TITLE_STRIP = " ._-([{"
+
+
+class Token:
+    """Un token del nome: tipo, testo originale, valore normalizzato e posizione"""
+
+    __slots__ = ("kind", "text", "value", "start", "end")
+
+    def __init__(self, kind, text, value, start, end):
+        self.kind = kind
+        self.text = text
+        self.value = value
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return "Token(%s, %r)" % (self.kind, self.text)
+
+
+class ReleaseName:
+    """Nome di release scomposto in token
+
+    I token prima dell'anno/episodio (o del primo tag tecnico) sono parole del titolo, salvo
+    l'episodio in testa al nome (S01E02.Titolo...); l'ultimo token preceduto da '-' è il
+    release group. Solo i token fra i due sono tag.
+    """
+
+    __slots__ = ("name", "tokens", "title_start", "title_end", "group_index", "year_index", "episode_index")
+
+    def __init__(self, name, tokens, title_start, title_end, group_index, year_index, episode_index):
+        self.name = name
+        self.tokens = tokens
+        self.title_start = title_start
+        self.title_end = title_end
+        self.group_index = group_index
+        self.year_index = year_index
+        self.episode_index = episode_index
+
+    def title_before(self, index):
+        # Testo originale del nome dall'inizio del titolo al token indicato (o fino alla fine)
+        start = self.tokens[self.title_start].start if self.title_start else 0
+        if index is None or index >= len(self.tokens):
+            return self.name[start:].strip()
+        return self.name[start:self.tokens[index].start].strip(_TITLE_STRIP)
+
+    @property
+    def title(self):
+        return self.title_before(self.title_end)
+
+    @property
+    def year(self):
+        return self.tokens[self.year_index].text if self.year_index is not None else None
+
+    @property
+    def episode_token(self):
+        # Primo token SxxEyy (o Sxx per i season pack)
+        return self.tokens[self.episode_index] if self.episode_index is not None else None
+
+    @property
+    def season(self):
+        token = self.episode_token
+        return token.value[0] if token else None
+
+    @property
+    def episode(self):
+        token = self.episode_token
+        return token.value[1] if token else None
+
+    @property
+    def is_episode(self):
+        return self.episode is not None
+
+    @property
+    def group(self):
+        return self.tokens[self.group_index].text if self.group_index is not None else None
+
+    @property
+    def tags(self):
+        # Token tecnici fra titolo e gruppo
+        end = self.group_index if self.group_index is not None else len(self.tokens)
+        return self.tokens[self.title_end:end]
+
+    def tag_values(self, kind):
+        """Valori normalizzati dei tag di un tipo, nell'ordine in cui compaiono"""
+        return [token.value for token in self.tags if token.kind == kind]
+
+    def has_tag(self, kind, *values):
+        """True se c'è un tag del tipo indicato (e con uno dei valori, se specificati)"""
+        for token in self.tags:
+            if token.kind == kind and (not values or token.value in values):
+                return True
+        return False
+
+    def first_tag(self, kind):
+        for token in self.tags:
+            if token.kind == kind:
+                return token
+        return None
+
+    @property
+    def remux_marker(self):
+        # Primo marker REMUX/VU/UNTOUCHED fra i tag, o il gruppo stesso se è un marker (es. "-VU")
+        token = self.first_tag(MARKER)
+        if token:
+            return token.text
+        group = self.group
+        if group and group.upper() in _REMUX_MARKERS:
+            return group
+        return None
+
+
+def _canonical_value(kind, text):
+    value = re.sub(r"[-. ]", "", text.upper()) if kind in (SOURCE, HDR) else text.upper()
+    return _CANONICAL_VALUES.get(kind, {}).get(value, value)
+
+
+@lru_cache(maxsize=1024)
+def tokenize_release_name(name):
+    """Scompone un nome di release (senza estensione) in token tipizzati
+
+    Parameters
+    ----------
+    name : str
+        Nome del file senza estensione, es. "Movie.2024.2160p.WEB-DL.DDP5.1.H.265-GRP".
+
+    Returns
+    -------
+    ReleaseName
+        Token, confini del titolo e release group. L'oggetto è condiviso: non modificarlo.
+    """
+    tokens = []
+    year_index = episode_index = first_tag_index = None
+    for match in _TOKEN_REGEX.finditer(name):
+        kind = match.lastgroup
+        text = match.group()
+        index = len(tokens)
+        if kind == EPISODE:
+            episode = match.group("episode_no")
+            value = (match.group("season_no").zfill(2), episode.zfill(2) if episode else None)
+            if episode_index is None:
+                episode_index = index
+        else:
+            value = _canonical_value(kind, text)
+            if kind == YEAR and year_index is None and index > 0:
+                year_index = index
+        if kind != WORD and first_tag_index is None and index > 0:
+            first_tag_index = index
+        tokens.append(Token(kind, text, value, match.start(), match.end()))
+
+    # L'ultimo token attaccato con '-' (non parte di una forma composta come WEB-DL) è il gruppo
+    group_index = None
+    if len(tokens) > 1:
+        last = tokens[-1]
+        if name[last.start - 1] == "-":
+            group_index = len(tokens) - 1
+
+    # Con l'episodio in testa (S01E02.Titolo.1080p...) il titolo sono le parole che lo seguono
+    title_start = 1 if episode_index == 0 and len(tokens) > 1 else 0
+
+    # Il titolo finisce al primo episodio, altrimenti all'anno, altrimenti al primo tag tecnico
+    if episode_index is not None and episode_index >= title_start:
+        title_end = episode_index
+    elif year_index is not None:
+        title_end = year_index
+    elif first_tag_index is not None and first_tag_index != group_index:
+        title_end = first_tag_index
+    else:
+        title_end = len(tokens)
+
+    # Le parole del titolo restano titolo anche se somigliano a un tag (es. "Amazon", "DV")
+    for index in range(title_start, title_end):
+        token = tokens[index]
+        if index not in (group_index, episode_index):
+            tokens[index] = Token(TITLE, token.text, token.text, token.start, token.end)
+    if group_index is not None:
+        last = tokens[group_index]
+        tokens[group_index] = Token(GROUP, last.text, last.text, last.start, last.end)
+
+    return ReleaseName(name, tuple(tokens), title_start, title_end, group_index, year_index, episode_index)
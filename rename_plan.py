@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Rinomina in blocco con piano, journal e annullamento
+Tutti i nomi di destinazione vengono calcolati e verificati prima di toccare il disco
+(conflitti e nomi che differiscono solo per maiuscole, senza uno stat per file); le rinomine
+vengono poi applicate registrandole in un journal write-ahead che permette di annullarle,
+anche dopo un'interruzione a metà
+
+Uso:
+    python -m mkv_rename_assistant undo [journal]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+from config import ERROR_MESSAGES, RENAME_JOURNAL_CONFIG
+from mediainfo_cache import user_config_dir
+from metrics import metrics
+
+
+def _key(path):
+    # Confronto indipendente da maiuscole: la destinazione potrebbe essere un filesystem case-insensitive
+    return os.path.normcase(path).casefold()
+
+
+class RenameOp:
+    """Una rinomina pianificata: percorso attuale, percorso nuovo ed eventuale errore"""
+
+    __slots__ = ("source", "target", "source_key", "target_key", "error", "done")
+
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+        self.source_key = _key(source)
+        self.target_key = _key(target)
+        self.error = None
+        self.done = False
+
+    def __repr__(self):
+        return "RenameOp(%r -> %r%s)" % (self.source, self.target, ", %s" % self.error if self.error else "")
+
+
+class RenamePlan:
+    """Rinomine verificate e ordinate: `ops` si applicano, `conflicts` no"""
+
+    __slots__ = ("ops", "conflicts")
+
+    def __init__(self, ops, conflicts):
+        self.ops = ops
+        self.conflicts = conflicts
+
+    def __len__(self):
+        return len(self.ops)
+
+
+class _DirectoryIndex:
+    # Nomi presenti in ogni cartella coinvolta, letti una volta sola con scandir
+    def __init__(self):
+        self._entries = {}
+
+    def contains(self, path, key):
+        directory = os.path.dirname(path)
+        entries = self._entries.get(directory)
+        if entries is None:
+            try:
+                with os.scandir(directory) as it:
+                    entries = {_key(entry.path) for entry in it}
+            except OSError:
+                entries = set()
+            self._entries[directory] = entries
+        return key in entries
+
+
+def build_plan(renames):
+    """Calcola il piano di rinomina senza modificare nulla
+
+    Parameters
+    ----------
+    renames : iterable
+        Coppie (percorso attuale, nuovo nome del file nella stessa cartella).
+
+    Returns
+    -------
+    RenamePlan
+        Le rinomine applicabili, ordinate in modo che un file liberi il proprio nome
+        prima che un altro lo occupi, e quelle scartate con il motivo.
+    """
+    index = _DirectoryIndex()
+    ops = []
+    for source, new_name in renames:
+        source = os.path.abspath(source)
+        target = os.path.join(os.path.dirname(source), new_name)
+        if target != source:
+            ops.append(RenameOp(source, target))
+
+    # Due file con la stessa destinazione: nessuno dei due viene rinominato
+    targets = Counter(op.target_key for op in ops)
+    by_source = {op.source_key: op for op in ops}
+    for op in ops:
+        if targets[op.target_key] > 1:
+            op.error = ERROR_MESSAGES["duplicate_target"]
+        elif not index.contains(op.source, op.source_key):
+            op.error = ERROR_MESSAGES["file_not_exists"]
+        elif (op.target_key != op.source_key and op.target_key not in by_source
+              and index.contains(op.target, op.target_key)):
+            op.error = ERROR_MESSAGES["file_exists"]
+
+    # Ordine di applicazione: se la destinazione è il nome attuale di un altro file, quel file va prima
+    ordered = []
+    visited = set()
+    for op in ops:
+        chain, on_chain, current = [], set(), op
+        while current is not None and id(current) not in visited:
+            if id(current) in on_chain:
+                # Rinomine circolari (A -> B, B -> A): non si applicano
+                for member in chain[chain.index(current):]:
+                    member.error = member.error or ERROR_MESSAGES["circular_rename"]
+                break
+            on_chain.add(id(current))
+            chain.append(current)
+            current = by_source.get(current.target_key) if current.target_key != current.source_key else None
+        blocker = current
+        for member in reversed(chain):
+            if member.error is None and blocker is not None and blocker.error is not None:
+                member.error = ERROR_MESSAGES["file_exists"]  # il file che occupa il nome resta dov'è
+            visited.add(id(member))
+            if member.error is None:
+                ordered.append(member)
+            blocker = member
+
+    return RenamePlan(ordered, [op for op in ops if op.error])
+
+
+def journal_dir():
+    path = os.path.join(user_config_dir(), RENAME_JOURNAL_CONFIG["directory"])
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _new_journal_path():
+    stamp = time.strftime("%Y%m%d-%H%M%S") + "-%06d" % (time.time_ns() // 1000 % 1000000)
+    return os.path.join(journal_dir(), f"rename-{stamp}.jsonl")
+
+
+def _prune_journals():
+    journals = sorted(name for name in os.listdir(journal_dir()) if name.startswith("rename-"))
+    for name in journals[:max(0, len(journals) - RENAME_JOURNAL_CONFIG["keep"])]:
+        try:
+            os.remove(os.path.join(journal_dir(), name))
+        except OSError:
+            pass
+
+
+def apply_plan(plan, journal_path=None):
+    """Applica le rinomine del piano registrandole nel journal
+
+    Ogni blocco di `fsync_batch` rinomine viene scritto e sincronizzato su disco prima di
+    essere eseguito: dopo un'interruzione il journal elenca tutto ciò che può essere stato
+    rinominato e `undo_journal` lo riporta indietro.
+
+    Returns
+    -------
+    str
+        Percorso del journal (None se il piano è vuoto).
+    """
+    if not plan.ops:
+        return None
+    journal_path = journal_path or _new_journal_path()
+    batch_size = max(1, RENAME_JOURNAL_CONFIG["fsync_batch"])
+    failed_sources = set()
+
+    with open(journal_path, "w", encoding="utf-8") as journal:
+        for start in range(0, len(plan.ops), batch_size):
+            batch = plan.ops[start:start + batch_size]
+            for op in batch:
+                journal.write(json.dumps({"src": op.source, "dst": op.target}, ensure_ascii=False) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+
+            for op in batch:
+                if op.target_key in failed_sources:
+                    # Il file che doveva liberare il nome non è stato spostato: os.rename lo sovrascriverebbe
+                    op.error = ERROR_MESSAGES["file_exists"]
+                    failed_sources.add(op.source_key)
+                    continue
+                try:
+                    with metrics.stage("rename", file=op.source):
+                        os.rename(op.source, op.target)
+                    op.done = True
+                except OSError as e:
+                    op.error = f"{ERROR_MESSAGES['rename_error']} {e}"
+                    failed_sources.add(op.source_key)
+
+    _prune_journals()
+    return journal_path
+
+
+def latest_journal():
+    """Journal più recente non ancora annullato (None se non ce ne sono)"""
+    journals = sorted(name for name in os.listdir(journal_dir())
+                      if name.startswith("rename-") and name.endswith(".jsonl"))
+    return os.path.join(journal_dir(), journals[-1]) if journals else None
+
+
+def undo_journal(journal_path):
+    """Annulla le rinomine registrate nel journal, dall'ultima alla prima
+
+    Vengono riportati indietro solo i file che risultano effettivamente rinominati
+    (destinazione presente, nome originale libero): funziona anche con un journal
+    lasciato a metà da un'interruzione.
+
+    Returns
+    -------
+    tuple
+        (rinomine annullate, lista di errori)
+    """
+    with open(journal_path, encoding="utf-8") as journal:
+        entries = [json.loads(line) for line in journal if line.strip()]
+
+    restored = 0
+    errors = []
+    for entry in reversed(entries):
+        source, target = entry["src"], entry["dst"]
+        case_only = _key(source) == _key(target)
+        if not os.path.exists(target) or (os.path.exists(source) and not case_only):
+            continue
+        try:
+            os.rename(target, source)
+            restored += 1
+        except OSError as e:
+            errors.append(f"{target}: {e}")
+
+    # Un journal annullato non viene più proposto da latest_journal
+    os.replace(journal_path, journal_path + ".undone")
+    return restored, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="mkv_rename_assistant undo",
+        description="Annulla l'ultima rinomina in blocco (o quella del journal indicato)")
+    parser.add_argument("journal", nargs="?", default=None, help="Journal da annullare (default: il più recente)")
+    args = parser.parse_args(argv)
+
+    journal_path = args.journal or latest_journal()
+    if not journal_path or not os.path.isfile(journal_path):
+        print("Nessuna rinomina da annullare", file=sys.stderr)
+        return 1
+
+    restored, errors = undo_journal(journal_path)
+    for error in errors:
+        print(f"❌ {error}")
+    print(f"{restored} rinomine annullate ({os.path.basename(journal_path)})")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
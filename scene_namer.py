@@ -0,0 +1,1146 @@
+# -*- coding: utf-8 -*-
+"""
+Logica di naming indipendente dalla GUI
+Estrae i metadati MediaInfo e costruisce i nomi secondo le regole della scena
+
+Le euristiche sono funzioni pure (profilo e nome file in ingresso, `NamingResult` in uscita)
+utilizzabili da più thread e nei processi worker; SceneNamer tiene solo il file corrente e
+i risultati già calcolati per la GUI.
+"""
+
+import os
+import re
+from functools import lru_cache
+from config import RENAME_CONFIG
+from media_profile import MediaProfile
+from release_tokenizer import HDR, SERVICE, SOURCE, WORD, tokenize_release_name
+
+# Indicatori nella writing library di un file ricompresso (ENCODE/WEBRip)
+ENCODING_INDICATORS = (
+    'x264', 'x265', 'handbrake', 'ffmpeg', 'mencoder', 
+    'staxrip', 'megui', 'xvid', 'divx', 'encoder'
+)
+
+# Parametri negli Encoded_Library_Settings tipici di un encoding
+ENCODING_SETTINGS_INDICATORS = ('crf=', 'bitrate=', 'preset=', 'tune=')
+
+# Tag da eliminare dal titolo prima della ricerca TMDb, nell'ordine in cui venivano applicati
+SEARCH_TAG_PATTERNS = (
+    # Audio codec
+    r'\bE[-]?AC[-]?3\b', r'\bAC[-]?3\b', r'\bDDP\b', r'\bDD[\+]?\b',
+    r'\bDTS[-]?HD\.?MA\b', r'\bDTS[-]?HD\b', r'\bDTS\b', r'\bTrueHD\b',
+    r'\bATMOS\b', r'\bAAC\b', r'\bFLAC\b',
+
+    # Marker REMUX, VU, etc.
+    r'\b(?:UNTOUCHED|VU|DOWNCONVERT)\b',
+    r'\b(?:REMUX|BDREMUX|DLMUX|WEBMUX)\b',
+
+    # Formati video e risoluzioni
+    r'\b(?:2160p|1080p|720p|480p|540p|8k|4k)\b',
+    r'\b(?:FullHD|FULLHD|Full[-]?HD)\b',
+    r'\b(?:h[-]?264|x[-]?264)\b', r'\b(?:h[-]?265|x[-]?265|hevc)\b',
+    r'\b(?:avc|av1|hvec)\b',
+    r'\bSD\b', r'\bHDReady\b', r'\bHD\b',
+
+    # HDR e video tech
+    r'\b(?:HDR10|HDR)\b', r'\b(?:DV|DOLBY[-_.]?VISION)\b',
+    r'\b(?:HLG|SDR|REC[-.]?709|REC[-.]?2020|BT[-.]?709|BT[-.]?2020)\b',
+
+    # Tipi di release
+    r'\b(?:BluRay|BLURAY|BDRIP|BRRip|BD)\b',
+    r'\b(?:WEB[-_.]?DL|WEBDL|WEB[-_.]?RIP|WEBRIP|WEB)\b',
+    r'\b(?:DVDRIP|DVD)\b',
+    r'\b(?:PROPER|REPACK|READNFO|INTERNAL|LIMITED|UNRATED|UNCUT)\b',
+    r'\b(?:DIRECTOR\'?S?\.?CUT|EXTENDED|THEATRICAL|REMASTERED|CRITERION|RESYNC|Resync)\b',
+
+    # UHD/4K
+    r'\b(?:UHD|4K)\b',
+
+    # Lingue e sottotitoli
+    r'\b(?:ITA|ENG|ITALIAN|ENGLISH|MULTI|SUB|SUBS|DUBBED|DUB)\b',
+
+    # Servizi streaming
+    r'\b(?:AMZN|AMAZON|NETFLIX|NF|DSNP|DISNEY|HULU|ATVP|APPLE|MAX|HBO|PARAMOUNT|PEACOCK|CRUNCHYROLL|FUNIMATION)\b',
+
+    # Frammenti isolati rimasti
+    r'\bBD\b', r'\bFULL\b', r'\bE\b', r'\bDL\b',
+
+    # Caratteri speciali
+    r'[\+/]',
+)
+
+# Un'unica alternanza compilata all'import: una sola scansione al posto di un re.sub per pattern.
+# I tag sono delimitati da \b e il titolo è già separato da spazi, quindi rimuoverne uno
+# non crea nuove corrispondenze per i pattern successivi e il risultato non cambia.
+SEARCH_TAG_REGEX = re.compile('|'.join('(?:%s)' % p for p in SEARCH_TAG_PATTERNS), re.IGNORECASE)
+
+AUDIO_DECIMAL_REGEX = re.compile(r'\b\d+\.\d+\b')
+SEARCH_SEPARATOR_REGEX = re.compile(r'[._\-\(\)\[\]]+')
+SEARCH_YEAR_REGEX = re.compile(r'\b(19|20)\d{2}\b')
+SPACES_REGEX = re.compile(r'\s+')
+FALLBACK_SEPARATOR_REGEX = re.compile(r'[._-]')
+
+# Pattern regex dal codice SHRI
+INVALID_TAG_PATTERN = re.compile(r"^(nogrp|nogroup|unknown|unk)$", re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r"\s{2,}")
+MULTIPLE_DOTS_PATTERN = re.compile(r"\.{2,}")
+
+# Estensioni tolte dal nome file prima dell'analisi (solo quelle note: "x264-GROUP" non è un'estensione)
+MEDIA_EXTENSIONS = ('.mkv', '.avi', '.mp4', '.mov', '.flv', '.wmv', '.webm', '.m4v', '.ts', '.m2ts')
+
+# Nomi normalizzati tenuti in memoria (episodi della stessa stagione si ripetono spesso)
+NORMALIZE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_title_for_search(filename):
+    """Riduce il nome di un file al titolo da cercare su TMDb
+
+    Parameters
+    ----------
+    filename : str
+        Nome del file (con o senza estensione).
+
+    Returns
+    -------
+    str
+        Titolo senza anno, tag tecnici e (in assenza di anno) release group.
+    """
+    # Rimuovi estensione
+    name = os.path.splitext(filename)[0]
+
+    # Rimuovi numeri decimali audio (5.1, 2.0, etc.)
+    name = AUDIO_DECIMAL_REGEX.sub('', name)
+
+    # Pulisci separatori e caratteri speciali
+    name = SEARCH_SEPARATOR_REGEX.sub(' ', name)
+
+    # CERCA L'ANNO nel nome pulito (chiave di separazione titolo/metadata)
+    year_match = SEARCH_YEAR_REGEX.search(name)
+
+    if year_match:
+        # Titolo GREZZO = tutto prima dell'anno
+        title_raw = name[:year_match.start()].strip()
+        has_year = True
+    else:
+        # Niente anno, usa tutto il nome
+        title_raw = name.strip()
+        has_year = False
+
+    # Pulisci il titolo dai pattern comuni e dagli spazi multipli
+    title_cleaned = SEARCH_TAG_REGEX.sub('', title_raw)
+    title_cleaned = SPACES_REGEX.sub(' ', title_cleaned).strip()
+
+    # Rileva e rimuovi release group SOLO se non abbiamo anno (logica fallback)
+    # Se c'è anno, il titolo è definito chiaramente: tutto quello prima
+    if not has_year:
+        words = title_cleaned.split()
+        if words:
+            last_word = words[-1]
+            has_uppercase = any(c.isupper() for c in last_word)
+            has_digits = any(c.isdigit() for c in last_word)
+            has_lowercase = any(c.islower() for c in last_word)
+            is_digit_only = last_word.isdigit()
+
+            # Release group: (maiuscola + altro) OR (numeri + minuscole)
+            looks_like_group = (
+                len(last_word) >= 2
+                and not is_digit_only
+                and (
+                    (has_uppercase and (has_digits or has_lowercase))
+                    or (has_digits and has_lowercase and not has_uppercase)
+                )
+            )
+
+            if looks_like_group:
+                words.pop()
+
+        title_cleaned = ' '.join(words).strip()
+
+    # Pulisci spazi finali
+    result = SPACES_REGEX.sub(' ', title_cleaned).strip()
+
+    # Fallback se risultato vuoto
+    if not result or len(result) < 2:
+        result = os.path.splitext(filename)[0]
+        result = FALLBACK_SEPARATOR_REGEX.sub(' ', result)
+        result = SPACES_REGEX.sub(' ', result).strip()
+
+    return result
+
+
+def search_query(filename):
+    """Titolo, anno e tipo di contenuto da cercare su TMDb per un nome file
+
+    Per gli episodi si cerca solo il nome della serie (prima di anno ed SxxEyy):
+    tutti gli episodi di una serie producono la stessa query.
+
+    Returns
+    -------
+    tuple
+        (titolo, anno o None, "movie" o "tv")
+    """
+    release = tokenize_release_name(os.path.splitext(filename)[0])
+    if not release.is_episode:
+        return normalize_title_for_search(filename), release.year, "movie"
+    end = release.title_end
+    year = None
+    if release.year_index is not None and release.year_index <= end:
+        end = release.year_index
+        year = release.year
+    title = SPACES_REGEX.sub(' ', SEARCH_SEPARATOR_REGEX.sub(' ', release.title_before(end))).strip()
+    return title or normalize_title_for_search(filename), year, "tv"
+
+
+def strip_media_extension(name):
+    """Nome senza estensione video (lasciato intatto se l'estensione non è nota)"""
+    lower = name.lower()
+    for ext in MEDIA_EXTENSIONS:
+        if lower.endswith(ext):
+            return name[:-len(ext)]
+    return name
+
+
+def _file_release(file_path):
+    # Nome del file scomposto in token (scansionato una volta, poi dalla cache)
+    return tokenize_release_name(os.path.splitext(os.path.basename(file_path))[0])
+
+
+class NamingResult:
+    """Nomi generati per un file: nome file, titolo tracker e metadati da cui derivano
+
+    Il dizionario `meta` è condiviso: i chiamanti non devono modificarlo.
+    """
+
+    __slots__ = ("new_name", "scene_title", "meta")
+
+    def __init__(self, new_name, scene_title, meta):
+        self.new_name = new_name
+        self.scene_title = scene_title
+        self.meta = meta
+
+    def __iter__(self):
+        # Permette `new_name, scene_title = result`
+        return iter((self.new_name, self.scene_title))
+
+    def __repr__(self):
+        return "NamingResult(%r, %r)" % (self.new_name, self.scene_title)
+
+
+def name_file(profile, file_path, corrected_name=None, tmdb_title=None, tmdb_year=None, meta=None):
+    """Genera nome file e titolo tracker di un file analizzato
+
+    Funzione pura: nessuno stato condiviso fra una chiamata e l'altra, si può usare da più
+    thread insieme e nei processi worker (profilo e risultato sono serializzabili con pickle).
+
+    Parameters
+    ----------
+    profile : MediaProfile
+        Profilo MediaInfo del file.
+    file_path : str
+        Percorso attuale del file.
+    corrected_name : str, optional
+        Nome corretto da TMDb ("Titolo Anno [SxxEyy]"), vedi `tmdb_corrected_name`.
+    tmdb_title, tmdb_year : str, optional
+        Titolo e anno scelti su TMDb per il titolo tracker.
+    meta : dict, optional
+        Metadati già calcolati con `compute_metadata` per lo stesso file.
+
+    Returns
+    -------
+    NamingResult
+    """
+    if meta is None:
+        meta = compute_metadata(profile, file_path)
+    new_name = build_scene_name(meta, corrected_name)
+
+    # Se disponibile, usa i dati corretti da TMDb, altrimenti titolo e anno del nome originale
+    if not tmdb_title:
+        tmdb_title, tmdb_year, _ = extract_title_year(meta.get('basename', ''))
+
+    scene_title = scene_compliant_title(meta, tmdb_title=tmdb_title, tmdb_year=tmdb_year)
+    return NamingResult(new_name, scene_title, meta)
+
+
+def tmdb_corrected_name(tmdb_result, content_type, file_path):
+    """Nome corretto da un risultato TMDb
+
+    Parameters
+    ----------
+    tmdb_result (dict):
+        Risultato di una ricerca TMDb (film o serie).
+    content_type (str):
+        "movie" o "tv"; per le serie viene mantenuto l'episodio del nome originale.
+    file_path (str):
+        Percorso del file a cui si applica il risultato.
+
+    Returns
+    -------
+    str
+        "Titolo Anno" oppure "Titolo Anno SxxEyy".
+    """
+    title = tmdb_result.get("title") or tmdb_result.get("name", "")
+    date = tmdb_result.get("release_date") or tmdb_result.get("first_air_date", "")
+    year = date.split("-")[0] if date else ""
+
+    parts = [title]
+    if year:
+        parts.append(year)
+    release = _file_release(file_path)
+    if content_type == "tv" and release.is_episode:
+        parts.append(f"S{release.season}E{release.episode}")
+    return " ".join(parts)
+
+
+def compute_metadata(profile, file_path):
+    """Metadati necessari per la rinomina
+
+    Parameters
+    ----------
+    profile : MediaProfile
+        Profilo MediaInfo del file (None: nessun metadato).
+    file_path : str
+        Percorso attuale del file: i marker REMUX e il release group si leggono dal suo nome.
+
+    Returns
+    -------
+    dict
+        Risoluzione, sorgente, tipo di release, audio, lingue, servizio, HDR e tag.
+    """
+    if not profile:
+        return {}
+        
+    meta = {}
+    video = profile.main_video
+    path_release = _file_release(file_path)
+    
+    # Nome file originale
+    if profile.file_name:
+        meta['name'] = profile.file_name
+        # Estrai solo il nome file, scarta il percorso (MediaInfo recenti lo riportano già senza estensione)
+        meta['basename'] = strip_media_extension(os.path.basename(profile.file_name))
+    
+    # Risoluzione - logica migliorata per gestire aspect ratio diversi
+    if video and video.width and video.height:
+        width = video.width
+        height = video.height
+        
+        # Classifica basandosi sulla dimensione maggiore per evitare problemi con aspect ratio diversi
+        if width >= 3840 or height >= 2160:
+            meta['resolution'] = '2160p'
+        elif width >= 1920 or height >= 1080:
+            # Se larghezza è 1920+ o altezza è 1080+ classifico come 1080p 
+            # Esempi: 1920x1080 = 1080p, 1920x804 = 1080p (widescreen), 1440x1080 = 1080p
+            meta['resolution'] = '1080p'
+        elif width >= 1280 or height >= 720:
+            meta['resolution'] = '720p'
+        elif height >= 576:
+            meta['resolution'] = '576p'
+        elif height >= 480:
+            meta['resolution'] = '480p'
+        else:
+            meta['resolution'] = f'{height}p'
+    
+    # Formato e codec video
+    if video and video.format:
+        codec = video.format.upper()
+        if 'HEVC' in codec or 'H.265' in codec:
+            meta['video_format'] = 'HEVC'
+            meta['video_codec'] = 'x265'
+            meta['compressor'] = 'x265'
+        elif 'AVC' in codec or 'H.264' in codec:
+            meta['video_format'] = 'AVC'
+            meta['video_codec'] = 'x264'
+            meta['compressor'] = 'x264'
+        else:
+            meta['video_format'] = codec
+            meta['video_codec'] = codec
+            meta['compressor'] = codec
+    
+    # Token del nome originale (o del percorso corrente come fallback)
+    release = tokenize_release_name(meta['basename']) if meta.get('basename') else path_release
+    
+    # Source - cerca di dedurre dalla risoluzione e altre info
+    if 'resolution' in meta:
+        # PRIORITÀ 1: Controlla se è una serie TV (S01E01) - quasi sempre WEB
+        if release.is_episode:
+            meta['source'] = 'WEB'
+            # Prima controlla marker espliciti WEBRip
+            if release.has_tag(SOURCE, 'WEBRIP'):
+                meta['type'] = 'WEBRIP'
+            # Poi controlla se ha writing library encoded (indica WEBRip)
+            elif _has_encoded_writing_library(video):
+                meta['type'] = 'WEBRIP'
+            # Se ha marker WEB-DL ma NO writing library, è WEB-DL puro
+            elif release.has_tag(SOURCE, 'WEBDL'):
+                meta['type'] = 'WEBDL'
+            else:
+                # Default per serie TV senza marker è WEB-DL
+                meta['type'] = 'WEBDL'
+        # PRIORITÀ 2: Marker espliciti WEB-DL/WEBRip (per film)
+        elif release.has_tag(SOURCE, 'WEBDL'):
+            meta['source'] = 'WEB'
+            # Se troviamo x264/x265 nella writing library, è un WEBRip
+            if _has_encoded_writing_library(video):
+                meta['type'] = 'WEBRIP'
+            else:
+                meta['type'] = 'WEBDL'
+        elif release.has_tag(SOURCE, 'WEBRIP'):
+            meta['source'] = 'WEB' 
+            meta['type'] = 'WEBRIP'
+        elif release.has_tag(SERVICE, 'AMZN', 'NETFLIX', 'DSNP', 'HULU', 'ATVP'):
+            meta['source'] = 'WEB'
+            meta['type'] = 'WEBDL'  # Default per servizi streaming
+        # PRIORITÀ 3: Risoluzione alta - solo per film senza marker serie
+        elif meta['resolution'] in ['2160p', '1080p']:
+            # Determina se è REMUX o ENCODE basandosi su analisi MediaInfo
+            if is_remux(profile, path_release):
+                meta['source'] = 'BluRay'
+                meta['type'] = 'REMUX'
+            else:
+                # È un ENCODE se non è REMUX
+                meta['source'] = 'BluRay'
+                meta['type'] = 'ENCODE'
+        elif meta['resolution'] == '720p':
+            meta['source'] = 'BluRay'
+            meta['type'] = 'ENCODE'
+        else:
+            meta['source'] = 'DVD'
+            meta['type'] = 'DVDRIP'
+    
+    # Rimuovi compressore per file non compressi (REMUX e WEB-DL puro)
+    if meta.get('type') in ['REMUX', 'WEBDL'] and 'compressor' in meta:
+        del meta['compressor']
+    
+    # Audio - prendi il primo track audio
+    if profile.audio:
+        meta['audio'] = _audio_format(profile.audio[0])
+        
+        # Lingue audio
+        languages = []
+        for track in profile.audio:
+            if track.language:
+                lang = _normalize_language(track.language)
+                if lang and lang not in languages:
+                    languages.append(lang)
+        meta['audio_languages'] = languages
+    
+    # Servizio streaming - cerca fra i tag del nome del file
+    services = release.tag_values(SERVICE)
+    for service_key in ['AMZN', 'NETFLIX', 'NF', 'DSNP', 'DISNEY', 'HULU', 'ATVP', 'APPLE']:
+        if service_key in services:
+            meta['service'] = service_key
+            break
+    
+    # HDR info - estrai dai metadati MediaInfo
+    meta['hdr_info'] = hdr_info(video, meta.get('basename', ''))
+    
+    # Tag del release group
+    meta['tag'] = release_group(path_release)
+    
+    return meta
+
+
+def is_remux(profile, path_release):
+    """True se il file è un REMUX: marker nel nome o nessuna traccia di ricompressione
+
+    `path_release` è il nome del file scomposto con `tokenize_release_name`.
+    """
+    if not profile:
+        return False
+        
+    # Controlla il nome del file per marker REMUX/VU/UNTOUCHED espliciti
+    if path_release.remux_marker or path_release.has_tag(SOURCE, 'REMUX'):
+        return True
+    
+    # Analisi MediaInfo per determinare se è encoded
+    video = profile.main_video
+    
+    if video:
+        # Se la writing library o le impostazioni di encoding indicano x264/x265/encoder
+        # è sicuramente un ENCODE, non un REMUX
+        if _has_encoded_writing_library(video):
+            return False
+        
+        # Controlla Format_Settings per segni di encoding
+        format_settings = video.format_settings_lc
+        
+        if 'cabac' in format_settings or 'bframes' in format_settings:
+            # Queste impostazioni indicano encoding, non remux
+            return False
+            
+        # Se non trova marker REMUX nel nome E non trova evidenza di encoding
+        # considera il bitrate per una decisione finale; senza bitrate video (analisi
+        # veloce o limitata) si usa quello medio del file, audio compreso
+        bit_rate = video.bit_rate or profile.file_bit_rate
+        if bit_rate:
+            bitrate_mbps = bit_rate / 1000000
+            # REMUX di solito hanno bitrate molto alti (>15 Mbps per 1080p)
+            if bitrate_mbps > 15:
+                return True
+            
+    return False
+
+
+def _has_encoded_writing_library(video):
+    # Controlla se la writing library indica che il file è stato encodato (x264/x265)
+    if video:
+        # Indicatori di encoding che suggeriscono WEBRip invece di WEB-DL
+        writing_library = video.writing_library_lc
+        for indicator in ENCODING_INDICATORS:
+            if indicator in writing_library:
+                return True  # È stato encodato - WEBRip
+                
+        # Controlla anche Encoded_Library_Settings
+        encoded_settings = video.encoded_library_settings_lc
+        for indicator in ENCODING_SETTINGS_INDICATORS:
+            if indicator in encoded_settings:
+                return True  # È stato encodato - WEBRip
+                    
+    return False  # Non trova indicatori di encoding - WEB-DL
+
+
+def _audio_format(audio_track):
+    # Ottiene il formato audio dettagliato secondo gli esempi
+    if not audio_track.format:
+        return 'Unknown'
+        
+    fmt = audio_track.format.upper()
+    
+    # Determina il numero di canali
+    channel_count = str(audio_track.channels)
+    if channel_count == '6':
+        channel_suffix = '5.1'
+    elif channel_count == '8':
+        channel_suffix = '7.1'
+    elif channel_count == '2':
+        channel_suffix = '2.0'
+    else:
+        channel_suffix = channel_count
+    
+    # Controlla per Atmos
+    has_atmos = audio_track.has_atmos
+    
+    # Mappa secondo gli esempi (con spazi corretti)
+    if fmt == 'AC-3':
+        return f'DD {channel_suffix}'
+    elif fmt == 'E-AC-3':
+        if has_atmos:
+            return f'DD+ {channel_suffix} Atmos'
+        return f'DD+ {channel_suffix}'
+    elif fmt == 'TRUEHD' or fmt == 'MLP FBA':
+        if has_atmos:
+            return f'TrueHD {channel_suffix} Atmos'
+        return f'TrueHD {channel_suffix}'
+    elif fmt == 'DTS-HD MA':
+        return f'DTS-HD MA {channel_suffix}'
+    elif fmt == 'DTS':
+        return f'DTS {channel_suffix}'
+    else:
+        return RENAME_CONFIG["audio_format_mapping"].get(fmt, fmt)
+
+
+def _normalize_language(language):
+    # Normalizza i codici lingua
+    if not language:
+        return None
+        
+    lang = language.lower()
+    
+    # Usa il mapping dalla configurazione
+    return RENAME_CONFIG["language_mapping"].get(lang, language.upper())
+
+
+def _is_valid_group(tag):
+    # Un release group è alfanumerico (underscore ammessi), corto e non un segnaposto (nogroup, unk)
+    return (bool(tag)
+            and len(tag) <= 30
+            and tag.replace('_', '').isalnum()
+            and not INVALID_TAG_PATTERN.search(tag))
+
+
+def release_group(path_release):
+    """Release group dal nome del file (default di RENAME_CONFIG se non riconosciuto)"""
+    # Cerca pattern comune: Nome-Group
+    if _is_valid_group(path_release.group):
+        return path_release.group
+    
+    # Marker REMUX (VU, UNTOUCHED, ...) usati come tag
+    marker = path_release.remux_marker
+    if _is_valid_group(marker):
+        return marker
+    
+    # Ultima parola non riconosciuta come tag tecnico (Nome.Group)
+    last = path_release.tokens[-1] if path_release.tokens else None
+    if last and last.kind == WORD and _is_valid_group(last.text):
+        return last.text
+            
+    return RENAME_CONFIG["default_release_group"]
+
+
+def build_scene_name(meta, corrected_name=None):
+    """Nome del file secondo le regole della scena (con estensione .mkv)
+
+    `corrected_name` è il nome corretto da TMDb: se presente ne vengono presi titolo,
+    anno ed episodio al posto di quelli del nome originale.
+    """
+    # Estrai informazioni dal nome originale
+    original_name = meta.get('basename', '')
+    
+    # Cerca di estrarre titolo, anno ed episodio (dal nome corretto TMDb se selezionato)
+    title, year, series = extract_title_year(original_name, corrected_name=corrected_name)
+    
+    # Inizializza componenti
+    components = []
+    
+    # Titolo e anno
+    if title:
+        components.append(title.replace(' ', '.'))
+    
+    # Anno - solo se presente (non più anno di default)
+    if year:
+        components.append(year)
+        
+    # Aggiungi info serie se presente
+    if series:
+        components.append(series)
+    
+    # Determina il tipo di release
+    release_type = meta.get('type', 'ENCODE')
+    
+    # Costruzione specifica per tipo
+    if release_type == 'REMUX':
+        # Pattern REMUX: Title.Year.UHD.BluRay.Resolution.Audio.Codec.REMUX-Group
+        # Es: Black.Dog.2024.UHD.BluRay.2160p.TrueHD.Atmos.7.1.HVEC.REMUX-iSlaNd
+        
+        # UHD per 2160p
+        if meta.get('resolution') == '2160p':
+            components.append('UHD')
+        
+        # Source
+        if meta.get('source'):
+            components.append(meta['source'])
+        
+        # Resolution
+        if meta.get('resolution'):
+            components.append(meta['resolution'])
+        
+        # Audio dettagliato
+        if meta.get('audio'):
+            components.append(meta['audio'])
+        
+        # Codec video (HVEC per HEVC, AVC per AVC)
+        video_codec = _remux_codec(meta)
+        if video_codec:
+            components.append(video_codec)
+        
+        # REMUX marker
+        components.append('REMUX')
+        
+    elif release_type in ['WEBDL', 'WEBRIP']:
+        # Pattern WEB-DL: Title.Year.Resolution.Service.WEB-DL.Audio.HDR.Codec-Group
+        # Es: Hedda.2025.2160p.AMZN.WEB-DL.DDP5.1.Atmos.DV.HDR.H.265-FHC
+        
+        # Resolution
+        if meta.get('resolution'):
+            components.append(meta['resolution'])
+        
+        # Service
+        service = _service_name(meta)
+        if service:
+            components.append(service)
+        
+        # Type
+        type_str = 'WEB-DL' if release_type == 'WEBDL' else 'WEBRip'
+        components.append(type_str)
+        
+        # Audio
+        if meta.get('audio'):
+            components.append(meta['audio'])
+        
+        # HDR info
+        hdr_components = meta.get('hdr_info', [])
+        if hdr_components:
+            components.extend(hdr_components)
+        
+        # Codec video - formato diverso per WEB-DL vs WEBRip
+        if release_type == 'WEBDL':
+            # WEB-DL usa H.264/H.265
+            video_codec = _webdl_codec(meta)
+        else:
+            # WEBRip usa x264/x265 
+            video_codec = _encode_codec(meta)
+        
+        if video_codec:
+            components.append(video_codec)
+            
+    else:
+        # Pattern ENCODE: Title.Year.Resolution.Source.Audio.HDR.Codec-Group  
+        # Es: Black.Dog.2024.1080p.BluRay.DD5.1.x264-iSlaNd
+        # Es: Godzilla.1.2014.2160p.BluRay.DDP5.1.DV.HDR10.x265-Tib7
+        
+        # Resolution
+        if meta.get('resolution'):
+            components.append(meta['resolution'])
+        
+        # Source
+        if meta.get('source'):
+            components.append(meta['source'])
+        
+        # Audio
+        if meta.get('audio'):
+            components.append(meta['audio'])
+        
+        # HDR info per ENCODE
+        hdr_components = meta.get('hdr_info', [])
+        if hdr_components:
+            components.extend(hdr_components)
+        
+        # Codec video (x264/x265)
+        video_codec = _encode_codec(meta)
+        if video_codec:
+            components.append(video_codec)
+    
+    # Unisci componenti
+    name = '.'.join(filter(None, components))
+    
+    # Aggiungi release group
+    if meta.get('tag') and meta['tag'] != 'NoGroup':
+        name += f"-{meta['tag']}"
+    
+    # Pulisci spazi multipli e caratteri non validi
+    name = WHITESPACE_PATTERN.sub('.', name)
+    name = MULTIPLE_DOTS_PATTERN.sub('.', name)  # Rimuovi punti multipli
+    
+    return name + '.mkv'
+
+
+def _remux_codec(meta):
+    # Ottiene il codec per REMUX (HVEC/AVC format)
+    codec = meta.get('video_codec', '')
+    mapping = {
+        'x265': 'HVEC',
+        'HEVC': 'HVEC', 
+        'H.265': 'HVEC',
+        'x264': 'AVC',
+        'AVC': 'AVC',
+        'H.264': 'AVC'
+    }
+    return mapping.get(codec, codec)
+
+
+def _webdl_codec(meta):
+    # Ottiene il codec per WEB-DL (H.264/H.265 format)
+    codec = meta.get('video_codec', '')
+    mapping = {
+        'x265': 'H.265',
+        'HEVC': 'H.265',
+        'H.265': 'H.265', 
+        'x264': 'H.264',
+        'AVC': 'H.264',
+        'H.264': 'H.264'
+    }
+    return mapping.get(codec, codec)
+
+
+def _encode_codec(meta):
+    # Ottiene il codec per ENCODE (x264/x265 format)
+    codec = meta.get('video_codec', '')
+    mapping = {
+        'HEVC': 'x265',
+        'H.265': 'x265',
+        'AVC': 'x264', 
+        'H.264': 'x264'
+    }
+    return mapping.get(codec, codec)
+
+
+def _service_name(meta):
+    # Ottiene il nome del servizio streaming
+    service = meta.get('service', '')
+    if not service:
+        # Prova a dedurre dai tag del nome del file
+        services = tokenize_release_name(meta.get('basename', '')).tag_values(SERVICE)
+        if 'AMZN' in services or 'AMAZON' in services:
+            return 'AMZN'
+        elif 'NETFLIX' in services or 'NF' in services:
+            return 'NF'
+        elif 'DISNEY' in services or 'DSNP' in services:
+            return 'DSNP'
+    
+    return RENAME_CONFIG["service_mapping"].get(service, service)
+
+
+def hdr_info(video, basename):
+    """Tag HDR/DV (es. ["DV", "HDR10"]) dalla traccia video, o dal nome del file come fallback"""
+    hdr_components = []
+    
+    # Prima controlla i metadati MediaInfo per informazioni HDR reali
+    if video:
+        # Controlla HDR Format per Dolby Vision
+        hdr_format = video.hdr_format_lc
+        
+        if 'dolby vision' in hdr_format or 'dv' in hdr_format:
+            hdr_components.append('DV')
+        
+        # Controlla se HDR10 è nel hdr_format
+        if 'hdr10' in hdr_format and 'HDR10' not in hdr_components:
+            hdr_components.append('HDR10')
+        elif 'hdr' in hdr_format and 'hdr10' not in hdr_format and 'HDR' not in hdr_components and 'HDR10' not in hdr_components:
+            hdr_components.append('HDR')
+        
+        # Cerca profile Dolby Vision (dvhe.xx.xx) nell'HDR Format Profile
+        if 'dvhe.' in video.hdr_format_profile_lc:
+            if 'DV' not in hdr_components:
+                hdr_components.append('DV')
+        
+        # Controlla HDR Format Compatibility per HDR10
+        hdr_compatibility = video.hdr_format_compatibility_lc
+        
+        if 'hdr10' in hdr_compatibility:
+            hdr_components.append('HDR10')
+        elif 'hdr' in hdr_compatibility and 'hdr10' not in hdr_components:
+            hdr_components.append('HDR')
+        
+        # Controlla anche altri campi HDR
+        if 'hdr10' in video.hdr_format_settings_lc and 'HDR10' not in hdr_components:
+            hdr_components.append('HDR10')
+        
+        # Controlla Color primaries per BT.2020 (indicativo di HDR)
+        color_primaries = video.color_primaries_lc
+        transfer_characteristics = video.transfer_characteristics_lc
+        
+        if 'bt.2020' in color_primaries or 'bt2020' in color_primaries:
+            if not hdr_components:  # Solo se non abbiamo già trovato info HDR
+                if 'smpte st 2084' in transfer_characteristics or 'pq' in transfer_characteristics:
+                    hdr_components.append('HDR10')
+                elif 'arib std-b67' in transfer_characteristics or 'hlg' in transfer_characteristics:
+                    hdr_components.append('HLG')
+                else:
+                    hdr_components.append('HDR')
+    
+    # Se non trova nulla nei metadati, cerca nel nome del file come fallback
+    if not hdr_components:
+        hdr_tags = tokenize_release_name(basename).tag_values(HDR)
+        
+        if 'DV' in hdr_tags:
+            hdr_components.append('DV')
+        
+        if 'HDR10' in hdr_tags:
+            hdr_components.append('HDR10') 
+        elif 'HDR' in hdr_tags:
+            hdr_components.append('HDR')
+    
+    # Rimuovi duplicati mantenendo ordine
+    seen = set()
+    result = []
+    for item in hdr_components:
+        if item not in seen:
+            seen.add(item)
+            result.append(item)
+    
+    return result
+
+
+def extract_title_year(filename, corrected_name=None):
+    """Titolo, anno ed episodio dal nome del file, con supporto serie TV e correzione TMDb
+
+    Returns
+    -------
+    tuple
+        (titolo, anno o None, "SxxEyy" o None)
+    """
+    # PRIORITÀ 1: Usa il nome corretto da TMDb se disponibile
+    if corrected_name:
+        clean_title = corrected_name.replace('.mkv', '').strip()
+        release = tokenize_release_name(clean_title)
+        
+        # Serie TV nel nome corretto TMDb: Titolo [Anno] S01E01
+        if release.is_episode:
+            series = f"S{release.season}E{release.episode}"
+            if release.year_index is not None and release.year_index == release.episode_index - 1:
+                return release.title_before(release.year_index), release.year, series
+            return release.title, None, series
+        
+        # Film: Titolo Anno
+        if release.year_index:
+            return release.title_before(release.year_index), release.year, None
+        
+        # Solo titolo
+        return clean_title, None, None
+    
+    # PRIORITÀ 2: Analisi del nome file originale (fallback)
+    release = tokenize_release_name(filename)
+    
+    # Controlla prima se è una serie TV (Titolo S01E01, senza anno automatico)
+    if release.is_episode:
+        series = f"S{release.season}E{release.episode}"
+        return release.title.replace('.', ' ').strip(), None, series
+    
+    # Film: Titolo Anno resto, oppure Titolo (Anno) resto
+    if release.year_index:
+        return release.title_before(release.year_index).replace('.', ' ').strip(), release.year, None
+    
+    # Se non trova l'anno, il titolo arriva fino al primo tag tecnico
+    title = release.title.replace('.', ' ').strip()
+    if title:
+        return title, None, None
+        
+    return filename, None, None
+
+
+def scene_compliant_title(meta, tmdb_title=None, tmdb_year=None):
+    """Titolo scene-compliant per il tracker (titolo, lingue, risoluzione, fonte, codec, group)"""
+    # 1. TITOLO (da TMDb se disponibile, altrimenti dal file)
+    if tmdb_title:
+        scene_title = tmdb_title
+    else:
+        scene_title, _, _ = extract_title_year(meta.get('basename', ''))
+        scene_title = scene_title or "Unknown"
+
+    # 2. ANNO (da TMDb se disponibile, altrimenti dal file)
+    year = tmdb_year or meta.get('year', '')
+
+    # 3. SERIE TV - aggiunge S01 o S01E01 invece di anno
+    release = tokenize_release_name(meta.get('basename', ''))
+    if release.season:
+        season_episode = f"S{release.season}"
+        if release.episode:
+            season_episode = f"S{release.season}E{release.episode}"
+        if year:
+            scene_title = f"{scene_title} {year} {season_episode}"
+        else:
+            scene_title = f"{scene_title} {season_episode}"
+    elif year:
+        scene_title = f"{scene_title} {year}"
+
+    # 4. LINGUE
+    languages = meta.get('audio_languages', [])
+    lang_mapping = {
+        'it': 'ITALIAN', 'en': 'ENGLISH', 'fr': 'FRENCH', 'de': 'GERMAN', 'es': 'SPANISH',
+        'ja': 'JAPANESE', 'zh': 'CHINESE', 'ko': 'KOREAN', 'ru': 'RUSSIAN',
+    }
+    lang_names = []
+    for lang_code in sorted(languages):
+        lang_name = lang_mapping.get(lang_code.lower(), lang_code.upper())
+        if lang_name not in lang_names:
+            lang_names.append(lang_name)
+    languages_str = " - ".join(lang_names) if lang_names else ""
+
+    # 5. RISOLUZIONE
+    resolution = meta.get('resolution', '1080p')
+
+    # 6. UHD marker per 2160p
+    uhd_marker = ""
+    if meta.get('type') == 'REMUX' and resolution == '2160p':
+        uhd_marker = "UHD"
+
+    # 7. FONTE (BluRay, WEB-DL, NF, etc.)
+    source_parts = []
+    service = meta.get('service', '')
+    if service:
+        service_name = RENAME_CONFIG["service_mapping"].get(service, service)
+        source_parts.append(service_name)
+    release_type = meta.get('type', 'UNKNOWN')
+    # Per REMUX, BluRay + REMUX (con UHD se 2160p)
+    if release_type == 'REMUX':
+        if uhd_marker:
+            source_parts.append(f"{uhd_marker} BluRay REMUX")
+        else:
+            source_parts.append("BluRay REMUX")
+    elif release_type == 'WEBDL':
+        source_parts.append('WEB-DL')
+    elif release_type == 'WEBRIP':
+        source_parts.append('WEBRip')
+    elif release_type == 'ENCODE':
+        source_parts.append('BluRay')
+    elif release_type == 'DVDRIP':
+        source_parts.append('DVDRip')
+    else:
+        source_parts.append('BluRay')
+    source_str = " ".join(source_parts) if source_parts else "Unknown"
+
+    # 8. AUDIO CODEC + CANALI
+    audio_info = meta.get('audio', '')
+
+    # 9. HDR INFO (solo se presente)
+    hdr_components = meta.get('hdr_info', [])
+    hdr_str = " ".join(hdr_components) if hdr_components else ""
+
+    # 10. CODEC VIDEO
+    if meta.get('type') == 'WEBDL':
+        video_codec = _webdl_codec(meta)
+    elif meta.get('type') == 'REMUX':
+        video_codec = _remux_codec(meta)
+    else:
+        video_codec = _encode_codec(meta)
+
+    # 11. RELEASE GROUP
+    group = meta.get('tag', '')
+    if not group:
+        group = clean_release_group(meta.get('basename', ''))
+    else:
+        group = group.lstrip('-').strip()
+        if INVALID_TAG_PATTERN.search(group):
+            group = 'NoGroup'
+
+    # ASSEMBLA IL TITOLO FINALE
+    scene_parts = [scene_title]
+    if languages_str:
+        scene_parts.append(languages_str)
+    scene_parts.append(resolution)
+    scene_parts.append(source_str)
+    if hdr_str:
+        scene_parts.append(hdr_str)
+    scene_parts.append(f"{video_codec} {audio_info}-{group}" if audio_info else f"{video_codec}-{group}")
+    final_title = " ".join(scene_parts)
+    final_title = WHITESPACE_PATTERN.sub(" ", final_title).strip()
+    return final_title
+
+
+def clean_release_group(basename):
+    """Release group valido secondo le regole SHRI, altrimenti 'NoGroup'"""
+    # Logica:
+    # 1. Estrai l'ultima parte dopo - (hyphen) se presente
+    # 2. Se contiene REMUX markers (VU, UNTOUCHED, etc.), usa il marker come tag
+    # 3. Altrimenti prova l'ultima parte separata da .
+    # 4. Valida che non sia un tag non valido (nogroup, nogrp, unknown, unk)
+    # 5. Valida lunghezza e caratteri alfanumerici
+    if not basename:
+        return 'NoGroup'
+    # Rimuovi estensione file (solo estensioni note)
+    # splitext è problematico per file come "x264-GROUP.mkv" perché vede ".x264-GROUP" come estensione
+    release = tokenize_release_name(strip_media_extension(basename))
+    # PRIORITY 1: Cerca formato "something-RELEASEGRP" (hyphen + release group alla fine)
+    # Questo è il formato più comune per release group
+    if _is_valid_group(release.group):
+        return release.group
+    # PRIORITY 2: Se contiene REMUX markers, usali come tag
+    # (VU1080, VU720, VU, UNTOUCHED, REMUX, etc.)
+    marker_tag = release.remux_marker
+    if _is_valid_group(marker_tag):
+        return marker_tag
+    # PRIORITY 3: Se nessun hyphen o estrazione fallita, usa l'ultima parola
+    # MA solo se sembra un release group valido: non un tag tecnico (x264, 1080p, ...)
+    # e con almeno un numero o underscore (altrimenti è probabilmente il titolo)
+    last = release.tokens[-1] if release.tokens else None
+    if (last and last.kind == WORD
+            and any(c.isdigit() or c == '_' for c in last.text)
+            and _is_valid_group(last.text)):
+        return last.text
+    return 'NoGroup'
+
+
+class FileAnalysis:
+    """Risultato dell'analisi di un file
+
+    Metadati e nomi vengono calcolati una sola volta per (file, selezione TMDb):
+    nome file, titolo tracker e pannello informazioni leggono tutti da qui.
+    """
+
+    __slots__ = ("file_path", "profile", "meta", "tmdb_corrected_name", "tmdb_title", "tmdb_year", "names")
+
+    def __init__(self, file_path, profile):
+        self.file_path = file_path
+        self.profile = profile
+        self.meta = None
+        self.tmdb_corrected_name = None
+        self.tmdb_title = None
+        self.tmdb_year = None
+        self.names = None
+
+    def set_tmdb_selection(self, corrected_name=None, title=None, year=None):
+        """Registra la selezione TMDb; se cambia, i nomi vanno ricalcolati"""
+        selection = (corrected_name, title, year)
+        if selection != (self.tmdb_corrected_name, self.tmdb_title, self.tmdb_year):
+            self.tmdb_corrected_name, self.tmdb_title, self.tmdb_year = selection
+            self.names = None
+
+    def rebind(self, file_path):
+        # Il file è stato rinominato: i metadati che dipendono dal nome vanno ricalcolati
+        self.file_path = file_path
+        self.meta = None
+        self.names = None
+
+
+class SceneNamer:
+    """File corrente e risultati già calcolati, sopra le funzioni di naming del modulo
+
+    Usato dalla GUI (un file per volta); i worker possono chiamare direttamente `name_file`.
+    """
+
+    def __init__(self, file_path=""):
+        self.file_path = file_path
+        self.mediainfo_data = None
+    
+    @property
+    def mediainfo_data(self):
+        return self._mediainfo_data
+    
+    @mediainfo_data.setter
+    def mediainfo_data(self, value):
+        # Ogni nuova analisi ricostruisce il profilo con un solo passaggio sulle tracce
+        # e apre un nuovo risultato per file
+        self._mediainfo_data = value
+        self.profile = MediaProfile.from_mediainfo(value) if value else None
+        self.analysis = FileAnalysis(self._current_path(), self.profile) if value else None
+    
+    def _current_path(self):
+        # Percorso del file in analisi (la GUI lo legge dal proprio StringVar)
+        return self.file_path
+    
+    def _get_analysis(self):
+        # Risultato dell'analisi del file corrente, riallineato se il file è stato rinominato
+        analysis = self.analysis
+        if analysis and analysis.file_path != self._current_path():
+            analysis.rebind(self._current_path())
+        return analysis
+    
+    def set_tmdb_selection(self, corrected_name=None, title=None, year=None):
+        """Applica la selezione TMDb al file corrente (invalida i nomi già generati)"""
+        analysis = self._get_analysis()
+        if analysis:
+            analysis.set_tmdb_selection(corrected_name, title, year)
+
+    def apply_tmdb_result(self, tmdb_result, content_type):
+        """Registra un risultato TMDb come titolo corretto del file corrente
+
+        Returns
+        -------
+        str
+            Nome corretto: "Titolo Anno" oppure "Titolo Anno SxxEyy" (vedi `tmdb_corrected_name`).
+        """
+        corrected_name = tmdb_corrected_name(tmdb_result, content_type, self._current_path())
+
+        # I nomi del file verranno rigenerati con il titolo corretto
+        self.set_tmdb_selection(corrected_name=corrected_name + ".mkv")
+        return corrected_name
+
+    def build_names(self):
+        """Genera nome file e titolo tracker per il file corrente
+        
+        Returns
+        -------
+        tuple
+            (nuovo nome file, titolo scene-compliant per il tracker)
+        """
+        analysis = self._get_analysis()
+        if not analysis:
+            return tuple(name_file(None, self._current_path(), meta={}))
+        if not analysis.names:
+            analysis.names = tuple(name_file(
+                self.profile, analysis.file_path, corrected_name=analysis.tmdb_corrected_name,
+                tmdb_title=analysis.tmdb_title, tmdb_year=analysis.tmdb_year, meta=self.extract_metadata()))
+        return analysis.names
+    
+    def extract_metadata(self):
+        """Metadati necessari per la rinomina, calcolati una sola volta per file
+        
+        Il dizionario ritornato è condiviso: i chiamanti non devono modificarlo.
+        """
+        analysis = self._get_analysis()
+        if not analysis:
+            return {}
+        if analysis.meta is None:
+            analysis.meta = compute_metadata(self.profile, analysis.file_path)
+        return analysis.meta
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Risoluzione TMDb condivisa fra gli episodi di una serie
+Gli episodi vengono raggruppati per serie (nome normalizzato) e stagione: la serie si
+risolve una volta sola e il risultato vale per tutti gli episodi, i dettagli di una stagione
+(titoli degli episodi) si scaricano con una sola richiesta /tv/{id}/season/{n}
+"""
+
+import os
+import threading
+
+from release_tokenizer import tokenize_release_name
+from scene_namer import search_query
+from tmdb_cache import normalize_query
+
+
+def series_key(filename):
+    """Chiave della serie di un episodio (nome normalizzato), None se il file non è un episodio"""
+    title, _year, content_type = search_query(filename)
+    if content_type != "tv" or not title:
+        return None
+    return normalize_query(title)
+
+
+def group_episodes(paths):
+    """Raggruppa gli episodi per (serie, stagione)
+
+    Returns
+    -------
+    dict
+        (chiave serie, stagione) -> percorsi degli episodi, nell'ordine ricevuto.
+        I file che non sono episodi non compaiono.
+    """
+    groups = {}
+    for path in paths:
+        basename = os.path.basename(path)
+        key = series_key(basename)
+        if key is None:
+            continue
+        season = tokenize_release_name(os.path.splitext(basename)[0]).season
+        groups.setdefault((key, season), []).append(path)
+    return groups
+
+
+def find_episode(season_data, episode_number):
+    """Dati dell'episodio nella risposta di /tv/{id}/season/{n} (None se non presente)"""
+    if not season_data or episode_number is None:
+        return None
+    for episode in season_data.get("episodes", []):
+        if episode.get("episode_number") == int(episode_number):
+            return episode
+    return None
+
+
+class SeriesResolver:
+    """Serie già risolte durante la sessione, condivise fra i thread
+
+    Una serie scelta dall'utente (o accettata automaticamente) per un episodio viene
+    applicata a tutti gli episodi successivi senza nuove ricerche né dialog.
+    """
+
+    def __init__(self):
+        self._shows = {}
+        self._seasons = {}
+        self._lock = threading.Lock()
+
+    def get(self, filename):
+        """Risultato TMDb della serie a cui appartiene il file, se già risolta"""
+        key = series_key(filename)
+        if key is None:
+            return None
+        with self._lock:
+            return self._shows.get(key)
+
+    def remember(self, filename, tmdb_result):
+        """Registra la serie scelta per il file: vale per tutti gli episodi della serie"""
+        key = series_key(filename)
+        if key is not None and tmdb_result:
+            with self._lock:
+                self._shows[key] = tmdb_result
+
+    def episode(self, client, filename):
+        """Dati TMDb dell'episodio (titolo, data...) se la serie è già risolta
+
+        La stagione viene scaricata alla prima richiesta e poi servita dalla memoria.
+        """
+        show = self.get(filename)
+        release = tokenize_release_name(os.path.splitext(filename)[0])
+        if not show or not show.get("id") or not release.is_episode:
+            return None
+        season_key = (show["id"], release.season)
+        with self._lock:
+            season_data = self._seasons.get(season_key)
+        if season_data is None:
+            season_data = client.season(show["id"], release.season)
+            with self._lock:
+                self._seasons[season_key] = season_data
+        return find_episode(season_data, release.episode)
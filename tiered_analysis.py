@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Analisi a livelli: si legge solo quanto serve per il nome
+Molti file hanno già un nome scene completo (risoluzione, codec, audio, HDR, fonte): in quel
+caso i campi usati da build_scene_name si ricavano dal nome senza leggere il file.
+
+    livello 0  nome del file (nessuna lettura)
+    livello 1  header Matroska (mkv_probe, poche letture piccole)
+    livello 2  MediaInfo (passando dalla cache)
+
+Si scende di livello solo se nel nome manca un campo necessario o se due tag si
+contraddicono. I campi ricavati dalle tracce vengono tutti dal livello più profondo letto:
+un dato letto dal file prevale sempre su quanto dichiarato nel nome.
+"""
+
+import os
+import re
+
+from config import TIERED_ANALYSIS_CONFIG
+from release_tokenizer import (AUDIO, HDR, LANGUAGE, RESOLUTION, SERVICE, SOURCE, VIDEO_CODEC,
+                               tokenize_release_name)
+
+TIER_FILENAME = 0
+TIER_HEADER = 1
+TIER_MEDIAINFO = 2
+
+# Campi dei metadati che dipendono solo dal nome e quelli ricavati dalle tracce
+FILENAME_FIELDS = ("basename", "service", "tag")
+TRACK_FIELDS = ("resolution", "video_format", "type", "audio", "audio_languages", "hdr_info")
+
+# Codec video dichiarati (senza separatori) -> (formato MediaInfo, encoder); gli altri codec
+# hanno nomi MediaInfo non ricavabili dal tag e passano sempre ai livelli successivi
+VIDEO_CODECS = {
+    "X264": ("AVC", "x264"),
+    "X265": ("HEVC", "x265"),
+    "H264": ("AVC", None),
+    "H265": ("HEVC", None),
+    "AVC": ("AVC", None),
+    "HEVC": ("HEVC", None),
+}
+
+# Codec audio dichiarati (senza separatori e canali) -> formato MediaInfo; le varianti DTS-HD
+# e DTS:X si distinguono solo dal flusso, come in mkv_probe
+AUDIO_CODECS = {
+    "DDP": "E-AC-3",
+    "DD+": "E-AC-3",
+    "EAC3": "E-AC-3",
+    "DD": "AC-3",
+    "AC3": "AC-3",
+    "TRUEHD": "MLP FBA",
+    "DTS": "DTS",
+    "AAC": "AAC",
+    "FLAC": "FLAC",
+    "PCM": "PCM",
+    "LPCM": "PCM",
+    "OPUS": "Opus",
+    "MP3": "MPEG Audio",
+}
+
+# Formati il cui nome riporta i canali (vedi scene_namer._audio_format)
+CHANNEL_FORMATS = frozenset(("AC-3", "E-AC-3", "MLP FBA", "DTS"))
+
+# Lingue non riferite a una traccia audio precisa
+_VAGUE_LANGUAGES = frozenset(("MULTI", "DUAL", "DUBBED", "DUB"))
+_SUBTITLE_MARKERS = frozenset(("SUB", "SUBS"))
+
+# Larghezza tipica per altezza (le altre in 16:9)
+_WIDTHS = {4320: 7680, 2160: 3840, 1080: 1920, 720: 1280}
+
+_AUDIO_VALUE = re.compile(r"^(?P<codec>.*?)[-. ]?(?P<channels>\d[. ]\d)?$")
+
+
+class FilenameAnalysis:
+    """Analisi ricavata dal solo nome, con la stessa interfaccia di pymediainfo.MediaInfo
+
+    `escalation` elenca i campi mancanti o in conflitto: se non è vuota il nome non basta.
+    """
+
+    __slots__ = ("tracks", "incomplete", "escalation")
+
+    def __init__(self, tracks, escalation):
+        self.tracks = tracks
+        self.incomplete = []
+        self.escalation = escalation
+
+
+def _height(value):
+    if value in ("4K", "UHD"):
+        return 2160
+    if value == "8K":
+        return 4320
+    return int(value[:-1])
+
+
+def _distinct(values):
+    return list(dict.fromkeys(values))
+
+
+def _channels(text):
+    # "5.1" -> 6 (come Channel(s) di MediaInfo)
+    return int(text[0]) + int(text[2])
+
+
+def _declared_video(release, escalation):
+    heights = _distinct(_height(value) for value in release.tag_values(RESOLUTION))
+    codecs = [VIDEO_CODECS.get(re.sub(r"[-. ]", "", value)) for value in release.tag_values(VIDEO_CODEC)]
+    found = len(escalation)
+    if not heights:
+        escalation.append("risoluzione non dichiarata")
+    elif len(heights) > 1:
+        escalation.append("risoluzioni in conflitto")
+    if not codecs or None in codecs:
+        escalation.append("codec video non dichiarato")
+    elif len(_distinct(fmt for fmt, _encoder in codecs)) > 1:
+        escalation.append("codec video in conflitto")
+    if len(escalation) > found:
+        return None
+    height = heights[0]
+    encoders = [encoder for _fmt, encoder in codecs if encoder]
+    return {
+        "format": codecs[0][0],
+        "height": height,
+        "width": _WIDTHS.get(height, round(height * 16 / 9)),
+        # L'encoder dichiarato fa da writing library: distingue ENCODE/WEBRip da REMUX/WEB-DL
+        "writing_library": encoders[0] if encoders else None,
+    }
+
+
+def _declared_audio(release, escalation):
+    formats = []
+    channels = []
+    atmos = False
+    for value in release.tag_values(AUDIO):
+        if value == "ATMOS":
+            atmos = True
+            continue
+        match = _AUDIO_VALUE.match(value)
+        if match.group("channels"):
+            channels.append(_channels(match.group("channels")))
+        codec = re.sub(r"[-. ]", "", match.group("codec"))
+        if codec:
+            formats.append(AUDIO_CODECS.get(codec))
+    formats = _distinct(formats)
+    channels = _distinct(channels)
+    if not formats or None in formats:
+        escalation.append("formato audio non dichiarato")
+        return None
+    if len(formats) > 1 or len(channels) > 1:
+        # Più tracce dichiarate: dal nome non si sa quale sia la prima
+        escalation.append("audio in conflitto")
+        return None
+    if formats[0] in CHANNEL_FORMATS and not channels:
+        escalation.append("canali audio non dichiarati")
+        return None
+    return {
+        "format": formats[0],
+        "channel_s": channels[0] if channels else None,
+        "format_additionalfeatures": "Atmos" if atmos else None,
+    }
+
+
+def _declared_languages(release):
+    values = release.tag_values(LANGUAGE)
+    if any(value in _SUBTITLE_MARKERS for value in values):
+        # "ITA.SUBS": la lingua può riferirsi ai sottotitoli
+        return []
+    return _distinct(value.lower() for value in values if value not in _VAGUE_LANGUAGES)
+
+
+def _check_release_type(release, video, escalation):
+    # Stessi rami di scene_namer.compute_metadata: dove il tipo dipende dalla traccia video,
+    # il nome deve dichiarare l'encoder (o il marker REMUX) in modo coerente con la fonte
+    encoded = bool(video["writing_library"])
+    if release.has_tag(SOURCE, "WEBDL") and encoded:
+        escalation.append("WEB-DL con encoder dichiarato")
+    elif (not release.is_episode
+          and not release.has_tag(SOURCE, "WEBDL", "WEBRIP")
+          and not release.has_tag(SERVICE, "AMZN", "NETFLIX", "DSNP", "HULU", "ATVP")
+          and video["height"] >= 1080
+          and not (release.remux_marker or release.has_tag(SOURCE, "REMUX"))
+          and not encoded):
+        # Senza marker né encoder si decide fra REMUX ed ENCODE col bitrate
+        escalation.append("tipo di release (REMUX o ENCODE) non dichiarato")
+
+
+def analyze_filename(file_path, st=None):
+    """Tracce dichiarate nel nome del file (livello 0)
+
+    Parameters
+    ----------
+    file_path : str
+        Percorso del file.
+    st : os.stat_result, optional
+        stat del file già eseguito dal chiamante (solo per la dimensione).
+
+    Returns
+    -------
+    FilenameAnalysis
+        Con escalation vuota se il nome dichiara tutti i campi usati da build_scene_name.
+    """
+    file_name = os.path.splitext(os.path.basename(file_path))[0]
+    release = tokenize_release_name(file_name)
+    escalation = []
+
+    video = _declared_video(release, escalation)
+    audio = _declared_audio(release, escalation)
+    hdr = release.tag_values(HDR)
+    if video:
+        _check_release_type(release, video, escalation)
+        if video["height"] >= 2160 and not hdr:
+            # Un 2160p senza tag HDR è raro: meglio verificare che sia davvero SDR
+            escalation.append("HDR non dichiarato")
+    if "HDR" in hdr:
+        # Il tag generico non distingue HDR10/HDR10+ da altri formati: nel nome finale va il formato letto
+        escalation.append("formato HDR non specificato")
+    elif "DV" in hdr and not ("HDR10" in hdr or "HLG" in hdr):
+        # Dolby Vision da solo: la compatibilità HDR10/HLG del flusso si legge solo dal file
+        escalation.append("compatibilità Dolby Vision non dichiarata")
+    languages = _declared_languages(release)
+    if TIERED_ANALYSIS_CONFIG["require_languages"] and not languages:
+        escalation.append("lingue audio non dichiarate")
+
+    from mkv_probe import ProbeTrack
+
+    tracks = [ProbeTrack("General", file_name=file_name, complete_name=file_path,
+                         file_size=(st or os.stat(file_path)).st_size)]
+    if video:
+        # L'HDR resta fuori dalla traccia: scene_namer.hdr_info lo legge dal nome come fallback
+        tracks.append(ProbeTrack("Video", **video))
+    if audio:
+        for language in languages or [None]:
+            tracks.append(ProbeTrack("Audio", language=language, **audio))
+    return FilenameAnalysis(tracks, escalation)
+
+
+def analyze_media(file_path, cache=None, fast=False, st=None):
+    """Profilo del file letto al livello minimo che basta per il nome
+
+    Parameters
+    ----------
+    file_path : str
+        Percorso del file.
+    cache : MediaInfoCache, optional
+        Cache MediaInfo per il livello 2.
+    fast : bool
+        Modalità veloce di MediaInfo (vedi mediainfo_cache.read_mediainfo).
+    st : os.stat_result, optional
+        stat del file già eseguito dal chiamante.
+
+    Returns
+    -------
+    MediaProfile
+        Con tier (livello più profondo letto), field_tiers (livello di ogni campo dei
+        metadati) ed escalation (perché il nome non bastava).
+    """
+    from media_profile import MediaProfile
+    from mediainfo_cache import parse_media
+    from mkv_probe import ProbeResult
+
+    media_info = None
+    escalation = []
+    if TIERED_ANALYSIS_CONFIG["enabled"]:
+        declared = analyze_filename(file_path, st)
+        escalation = declared.escalation
+        if not escalation:
+            media_info = declared
+            tier = TIER_FILENAME
+    if media_info is None:
+        # parse_media prova l'header Matroska e passa a MediaInfo solo se non basta
+        media_info = parse_media(file_path, cache, fast)
+        tier = TIER_HEADER if isinstance(media_info, ProbeResult) else TIER_MEDIAINFO
+
+    profile = MediaProfile.from_mediainfo(media_info)
+    profile.tier = tier
+    profile.field_tiers = dict.fromkeys(FILENAME_FIELDS, TIER_FILENAME)
+    profile.field_tiers.update(dict.fromkeys(TRACK_FIELDS, tier))
+    profile.escalation = escalation
+    return profile
@@ -0,0 +1,433 @@
+# -*- coding: utf-8 -*-
+"""
+Indice locale dei titoli costruito dai dump di IMDb o TMDb
+Risolve i titoli senza rete: un file binario in sola lettura (mappato in memoria) con
+i titoli normalizzati ordinati, anno, tipo, popolarità e un indice a trigrammi
+
+Uso:
+    python -m mkv_rename_assistant index build --imdb title.basics.tsv.gz
+    python -m mkv_rename_assistant index build --tmdb-movies movie_ids_MM_DD_YYYY.json.gz
+                                               --tmdb-tv tv_series_ids_MM_DD_YYYY.json.gz
+    python -m mkv_rename_assistant index query "Blade Runner" [--year 1982] [--tv]
+"""
+
+import argparse
+import gzip
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import unicodedata
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from config import TITLE_INDEX_CONFIG
+from mediainfo_cache import user_config_dir
+
+# Formato del file: intestazione e sezioni (colonne) nell'ordine di _sections()
+_MAGIC = b"MRTIDX01"
+_HEADER = struct.Struct("<8sBxxxIIIII")
+
+SOURCE_IMDB = 0
+SOURCE_TMDB = 1
+
+KIND_MOVIE = 0
+KIND_TV = 1
+_KIND_ENDPOINTS = {KIND_MOVIE: "movie", KIND_TV: "tv"}
+
+# Tipi IMDb indicizzati (cortometraggi, episodi e videogiochi non servono)
+_IMDB_KINDS = {"movie": KIND_MOVIE, "tvMovie": KIND_MOVIE, "tvSeries": KIND_TV, "tvMiniSeries": KIND_TV}
+
+# I trigrammi più comuni ("the", " la") hanno liste enormi: si leggono prima le liste più rare
+# finché non si raggiunge questo numero di voci (ma sempre almeno _MIN_LISTS liste)
+_POSTINGS_BUDGET = 50000
+_MIN_LISTS = 3
+# Candidati rivalutati con la similarità esatta
+_RESCORE_LIMIT = 200
+
+_NON_ALNUM_REGEX = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_title(title):
+    """Forma canonica di un titolo: minuscole, senza accenti né punteggiatura"""
+    text = unicodedata.normalize("NFKD", str(title or "").replace("&", " and "))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return " ".join(_NON_ALNUM_REGEX.sub(" ", text).split())
+
+
+def trigrams(key):
+    """Insieme dei trigrammi di un titolo normalizzato (con un bordo di spazi)"""
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _gram_hash(gram):
+    return zlib.crc32(gram.encode("utf-8"))
+
+
+def _sections(count, gram_count, postings_count, keys_size, titles_size):
+    # (nome, typecode, numero di elementi): le colonne numeriche sono allineate a 8 byte
+    return (
+        ("key_offsets", "I", count + 1),
+        ("title_offsets", "I", count + 1),
+        ("ids", "I", count),
+        ("popularity", "f", count),
+        ("years", "H", count),
+        ("kinds", "B", count),
+        ("gram_hashes", "I", gram_count),
+        ("gram_starts", "I", gram_count + 1),
+        ("postings", "I", postings_count),
+        ("keys", "B", keys_size),
+        ("titles", "B", titles_size),
+    )
+
+
+def _layout(*counts):
+    offset = _HEADER.size
+    layout = {}
+    for name, typecode, length in _sections(*counts):
+        offset = (offset + 7) & ~7
+        size = length * array(typecode).itemsize
+        layout[name] = (typecode, offset, size)
+        offset += size
+    return layout
+
+
+class TitleIndex:
+    """Indice dei titoli in sola lettura, mappato in memoria
+
+    Le colonne vengono lette direttamente dal file mappato: l'apertura è immediata e
+    le pagine vengono caricate dal sistema operativo solo quando servono.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = default_index_path()
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.source, *counts = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path}: non è un indice dei titoli (o è di una versione precedente)")
+        self.count = counts[0]
+        self._view = memoryview(self._mmap)
+        self._views = []
+        for name, (typecode, offset, size) in _layout(*counts).items():
+            setattr(self, "_" + name, self._column(typecode, offset, size))
+
+    def _column(self, typecode, offset, size):
+        view = self._view[offset:offset + size]
+        if typecode == "B" or sys.byteorder == "little":
+            view = view.cast(typecode)
+            self._views.append(view)
+            return view
+        # Il file è little-endian: sulle macchine big-endian la colonna viene copiata
+        column = array(typecode, view.tobytes())
+        column.byteswap()
+        return column
+
+    def __len__(self):
+        return self.count
+
+    def _key(self, index):
+        return bytes(self._keys[self._key_offsets[index]:self._key_offsets[index + 1]])
+
+    def _title(self, index):
+        return bytes(self._titles[self._title_offsets[index]:self._title_offsets[index + 1]]).decode("utf-8")
+
+    def _lower_bound(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _gram_postings(self, gram):
+        # Record che contengono il trigramma (None se nessuno)
+        gram_hash = _gram_hash(gram)
+        position = bisect_left(self._gram_hashes, gram_hash)
+        if position < len(self._gram_hashes) and self._gram_hashes[position] == gram_hash:
+            return self._postings[self._gram_starts[position]:self._gram_starts[position + 1]]
+        return None
+
+    def _accepts(self, index, kind, year):
+        if kind is not None and self._kinds[index] != kind:
+            return False
+        record_year = self._years[index]
+        return not year or not record_year or abs(record_year - int(year)) <= 1
+
+    def _result(self, index, score):
+        # Stessa forma dei risultati di TMDb: i chiamanti non distinguono la provenienza
+        kind = self._kinds[index]
+        title = self._title(index)
+        year = str(self._years[index] or "")
+        result = {"popularity": round(self._popularity[index], 3), "media_type": _KIND_ENDPOINTS[kind],
+                  "score": round(score, 3), "source": "local"}
+        if self.source == SOURCE_TMDB:
+            result["id"] = self._ids[index]
+        else:
+            result["id"] = None
+            result["imdb_id"] = "tt%07d" % self._ids[index]
+        if kind == KIND_TV:
+            result.update(name=title, original_name=title, first_air_date=year)
+        else:
+            result.update(title=title, original_title=title, release_date=year)
+        return result
+
+    def _unique(self, scored, limit):
+        # Titolo originale e internazionale dello stesso titolo sono record distinti
+        results, seen = [], set()
+        for index, score in scored:
+            if self._ids[index] in seen:
+                continue
+            seen.add(self._ids[index])
+            results.append(self._result(index, score))
+            if len(results) >= limit:
+                break
+        return results
+
+    def exact(self, endpoint, query, year=None):
+        """Titoli il cui nome normalizzato coincide con la query (anno entro ±1 se indicato)"""
+        key = normalize_title(query).encode("utf-8")
+        if not key:
+            return []
+        kind = KIND_TV if endpoint == "tv" else KIND_MOVIE
+        matches = []
+        index = self._lower_bound(key)
+        while index < self.count and self._key(index) == key:
+            if self._accepts(index, kind, year):
+                matches.append((index, 1.0))
+            index += 1
+        matches.sort(key=lambda item: -self._popularity[item[0]])
+        return self._unique(matches, TITLE_INDEX_CONFIG["max_results"])
+
+    def search(self, endpoint, query, year=None, limit=None):
+        """Titoli simili alla query, ordinati per similarità (trigrammi), anno e popolarità
+
+        Parameters
+        ----------
+        endpoint : str
+            "movie" o "tv".
+        query : str
+            Titolo da cercare (es. l'output di normalize_title_for_search).
+        year : int or str, optional
+            Anno atteso: i titoli con un anno diverso di più di uno vengono scartati.
+        limit : int, optional
+            Numero massimo di risultati (default: TITLE_INDEX_CONFIG["max_results"]).
+
+        Returns
+        -------
+        list
+            Risultati nella forma di TMDb (title/name, release_date/first_air_date, id),
+            con in più score, media_type e source="local".
+        """
+        limit = limit or TITLE_INDEX_CONFIG["max_results"]
+        key = normalize_title(query)
+        if not key:
+            return []
+        kind = KIND_TV if endpoint == "tv" else KIND_MOVIE
+        query_grams = trigrams(key)
+
+        # Candidati dalle liste dei trigrammi più rari, poi rivalutati con la similarità esatta
+        lists = sorted((p for p in map(self._gram_postings, query_grams) if p is not None), key=len)
+        counts = Counter()
+        budget = _POSTINGS_BUDGET
+        for position, postings in enumerate(lists):
+            if position >= _MIN_LISTS and len(postings) > budget:
+                break
+            counts.update(postings)
+            budget -= len(postings)
+
+        scored = []
+        for index, _shared in counts.most_common(_RESCORE_LIMIT * 4):
+            if not self._accepts(index, kind, year):
+                continue
+            grams = trigrams(self._key(index).decode("utf-8"))
+            score = 2 * len(query_grams & grams) / (len(query_grams) + len(grams))
+            if year and self._years[index] == int(year):
+                score += 0.05
+            scored.append((index, score))
+            if len(scored) >= _RESCORE_LIMIT:
+                break
+        scored.sort(key=lambda item: (-item[1], -self._popularity[item[0]]))
+        return self._unique(scored, limit)
+
+    def close(self):
+        # Le viste sul file mappato vanno rilasciate prima di chiuderlo
+        for view in self._views:
+            view.release()
+        self._view.release()
+        self._mmap.close()
+
+
+def default_index_path():
+    return os.path.join(user_config_dir(), TITLE_INDEX_CONFIG["filename"])
+
+
+def open_title_index(path=None):
+    """Apre l'indice locale se è abilitato ed è già stato costruito, altrimenti None"""
+    if not TITLE_INDEX_CONFIG["enabled"]:
+        return None
+    path = path or default_index_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        return TitleIndex(path)
+    except (OSError, ValueError) as e:
+        print(f"Indice titoli non disponibile: {e}", file=sys.stderr)
+        return None
+
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def read_imdb_basics(path):
+    """Record (titolo, anno, tipo, id, popolarità) da title.basics.tsv(.gz) di IMDb"""
+    with _open_text(path) as f:
+        next(f, None)
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 6 or fields[1] not in _IMDB_KINDS or fields[4] == "1":
+                continue
+            kind = _IMDB_KINDS[fields[1]]
+            year = int(fields[5]) if fields[5].isdigit() else 0
+            imdb_id = int(fields[0][2:])
+            for title in {fields[2], fields[3]}:
+                if title and title != "\\N":
+                    yield title, year, kind, imdb_id, 0.0
+
+
+def read_tmdb_export(path, kind):
+    """Record da un export giornaliero degli ID di TMDb (una riga JSON per titolo)"""
+    title_field = "original_name" if kind == KIND_TV else "original_title"
+    with _open_text(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if item.get("adult") or item.get("video"):
+                continue
+            title = item.get(title_field)
+            if title:
+                yield title, 0, kind, int(item["id"]), float(item.get("popularity") or 0.0)
+
+
+def build_index(records, path, source):
+    """Scrive l'indice dai record (titolo, anno, tipo, id, popolarità)
+
+    Returns
+    -------
+    int
+        Numero di titoli indicizzati.
+    """
+    entries = []
+    for title, year, kind, record_id, popularity in records:
+        key = normalize_title(title)
+        if key:
+            entries.append((key.encode("utf-8"), title, year, kind, record_id, popularity))
+    entries.sort(key=lambda entry: (entry[0], -entry[5]))
+
+    columns = {name: array(typecode) for name, typecode, _length in _sections(0, 0, 0, 0, 0)}
+    keys, titles = bytearray(), bytearray()
+    postings = {}
+    columns["key_offsets"].append(0)
+    columns["title_offsets"].append(0)
+    for index, (key, title, year, kind, record_id, popularity) in enumerate(entries):
+        keys += key
+        titles += title.encode("utf-8")
+        columns["key_offsets"].append(len(keys))
+        columns["title_offsets"].append(len(titles))
+        columns["ids"].append(record_id)
+        columns["popularity"].append(popularity)
+        columns["years"].append(year if 0 < year < 65536 else 0)
+        columns["kinds"].append(kind)
+        for gram_hash in {_gram_hash(gram) for gram in trigrams(key.decode("utf-8"))}:
+            postings.setdefault(gram_hash, array("I")).append(index)
+
+    columns["gram_starts"].append(0)
+    for gram_hash in sorted(postings):
+        columns["gram_hashes"].append(gram_hash)
+        columns["postings"].extend(postings[gram_hash])
+        columns["gram_starts"].append(len(columns["postings"]))
+    columns["keys"] = array("B", keys)
+    columns["titles"] = array("B", titles)
+
+    counts = (len(entries), len(postings), len(columns["postings"]), len(keys), len(titles))
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, source, *counts))
+        for name, (_typecode, offset, _size) in _layout(*counts).items():
+            column = columns[name]
+            if sys.byteorder != "little":
+                column.byteswap()
+            f.write(b"\0" * (offset - f.tell()))
+            column.tofile(f)
+    # Sostituzione atomica: un indice aperto da un altro processo resta valido
+    os.replace(temp_path, path)
+    return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="mkv_rename_assistant index",
+        description="Costruisce o interroga l'indice locale dei titoli (ricerche senza rete)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Costruisce l'indice dai dump di IMDb o TMDb")
+    build.add_argument("--imdb", metavar="TSV", help="title.basics.tsv(.gz) di IMDb")
+    build.add_argument("--tmdb-movies", metavar="JSON", help="export movie_ids_*.json(.gz) di TMDb")
+    build.add_argument("--tmdb-tv", metavar="JSON", help="export tv_series_ids_*.json(.gz) di TMDb")
+    build.add_argument("-o", "--output", default=None, help="File dell'indice (default: cartella utente)")
+
+    query = commands.add_parser("query", help="Cerca un titolo nell'indice")
+    query.add_argument("title")
+    query.add_argument("--year", type=int, default=None)
+    query.add_argument("--tv", action="store_true", help="Cerca fra le serie TV")
+    query.add_argument("-i", "--index", default=None, help="File dell'indice (default: cartella utente)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if args.imdb and (args.tmdb_movies or args.tmdb_tv):
+            parser.error("Un indice usa una sola fonte: IMDb oppure TMDb")
+        if args.imdb:
+            source, records = SOURCE_IMDB, read_imdb_basics(args.imdb)
+        elif args.tmdb_movies or args.tmdb_tv:
+            source = SOURCE_TMDB
+            records = [record for path, kind in ((args.tmdb_movies, KIND_MOVIE), (args.tmdb_tv, KIND_TV)) if path
+                       for record in read_tmdb_export(path, kind)]
+        else:
+            parser.error("Indica almeno un dump: --imdb oppure --tmdb-movies/--tmdb-tv")
+        output = args.output or default_index_path()
+        start = time.perf_counter()
+        count = build_index(records, output, source)
+        print(f"{count} titoli indicizzati in {time.perf_counter() - start:.1f}s -> {output}")
+        return 0
+
+    index = TitleIndex(args.index)
+    endpoint = "tv" if args.tv else "movie"
+    start = time.perf_counter()
+    results = index.exact(endpoint, args.title, args.year) or index.search(endpoint, args.title, args.year)
+    elapsed = (time.perf_counter() - start) * 1e6
+    for result in results:
+        title = result.get("title") or result.get("name")
+        year = result.get("release_date") or result.get("first_air_date") or "?"
+        print(f"{result['score']:.2f}  {title} ({year})  {result.get('imdb_id') or result['id']}")
+    print(f"{len(results)} risultati in {elapsed:.0f} µs")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
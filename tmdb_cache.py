@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Cache persistente delle risposte TMDb
+Le stesse ricerche si ripetono per ogni episodio e a ogni esecuzione: le risposte restano
+valide per un TTL configurabile e poi vengono rivalidate con ETag/If-None-Match
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from config import TMDB_CACHE_CONFIG
+from mediainfo_cache import user_config_dir
+
+# Parametri che identificano l'anno di una ricerca TMDb
+YEAR_PARAMS = ("year", "primary_release_year", "first_air_date_year")
+
+
+def normalize_query(query):
+    """Forma canonica di una query: minuscole e spazi singoli"""
+    return " ".join(str(query or "").casefold().split())
+
+
+def cache_key(path, params):
+    """Chiave (endpoint, query normalizzata, lingua, anno, altri parametri) di una richiesta"""
+    params = {k: v for k, v in params.items() if k != "api_key"}
+    query = normalize_query(params.pop("query", ""))
+    language = str(params.pop("language", ""))
+    year = ""
+    for name in YEAR_PARAMS:
+        if params.get(name):
+            year = str(params.pop(name))
+            break
+    extra = json.dumps(params, sort_keys=True, default=str) if params else ""
+    return (path.strip("/"), query, language, year, extra)
+
+
+class CacheEntry:
+    """Risposta TMDb in cache"""
+
+    __slots__ = ("data", "etag", "fetched_at")
+
+    def __init__(self, data, etag, fetched_at):
+        self.data = data
+        self.etag = etag
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, ttl):
+        return time.time() - self.fetched_at < ttl
+
+
+class TMDbCache:
+    """Cache SQLite delle risposte JSON di TMDb
+
+    Le voci più vecchie del TTL non vengono scartate: il client le rivalida con l'ETag
+    (una risposta 304 costa molto meno di una ricerca) o le usa in modalità offline.
+    Se il database non risponde (bloccato da un altro processo, disco pieno) o una voce è
+    illeggibile, la richiesta prosegue come se la voce non fosse in cache.
+    """
+
+    def __init__(self, db_path=None, ttl_hours=None, max_age_days=None):
+        if db_path is None:
+            db_path = os.path.join(user_config_dir(), TMDB_CACHE_CONFIG["filename"])
+        if ttl_hours is None:
+            ttl_hours = TMDB_CACHE_CONFIG["ttl_hours"]
+        if max_age_days is None:
+            max_age_days = TMDB_CACHE_CONFIG["max_age_days"]
+        self.db_path = db_path
+        self.ttl = ttl_hours * 3600
+        self.hits = 0
+        self.revalidated = 0
+        self.stale = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tmdb_response ("
+            " endpoint TEXT NOT NULL,"
+            " query TEXT NOT NULL,"
+            " language TEXT NOT NULL,"
+            " year TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " etag TEXT,"
+            " data BLOB NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (endpoint, query, language, year, params))")
+        # Le voci non più usate da molto tempo non servono nemmeno offline
+        with self._conn:
+            self._conn.execute("DELETE FROM tmdb_response WHERE fetched_at < ?",
+                               (time.time() - max_age_days * 86400,))
+
+    def get(self, key):
+        """Ritorna la CacheEntry per la chiave (anche se scaduta) oppure None"""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT data, etag, fetched_at FROM tmdb_response"
+                    " WHERE endpoint = ? AND query = ? AND language = ? AND year = ? AND params = ?",
+                    key).fetchone()
+            if row is None:
+                return None
+            return CacheEntry(json.loads(zlib.decompress(row[0]).decode("utf-8")), row[1], row[2])
+        except (sqlite3.Error, zlib.error, ValueError):
+            return None
+
+    def put(self, key, data, etag=None):
+        """Salva la risposta JSON (e l'eventuale ETag) per la chiave"""
+        blob = zlib.compress(json.dumps(data).encode("utf-8"))
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tmdb_response"
+                    " (endpoint, query, language, year, params, etag, data, fetched_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*key, etag, blob, time.time()))
+        except sqlite3.Error:
+            pass  # la risposta si usa comunque, verrà salvata la prossima volta
+
+    def touch(self, key):
+        """Rinnova una voce dopo una rivalidazione (304 Not Modified)"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "UPDATE tmdb_response SET fetched_at = ?"
+                    " WHERE endpoint = ? AND query = ? AND language = ? AND year = ? AND params = ?",
+                    (time.time(), *key))
+        except sqlite3.Error:
+            pass
+
+    def record(self, outcome):
+        """Conta l'esito di una richiesta: "hits", "revalidated", "stale" o "misses" """
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self):
+        """Contatori della sessione corrente; hit_rate conta anche le risposte rivalidate"""
+        lookups = self.hits + self.revalidated + self.stale + self.misses
+        served = self.hits + self.revalidated + self.stale
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "stale": self.stale,
+            "misses": self.misses,
+            "hit_rate": served / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Client HTTP per TMDb
+Sessione condivisa con connessioni keep-alive, limite di frequenza a token bucket,
+retry con backoff esponenziale, circuit breaker quando TMDb non risponde
+e cache persistente delle risposte
+"""
+
+import configparser
+import email.utils
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import TMDB_CONFIG, TMDB_CACHE_CONFIG, TITLE_INDEX_CONFIG
+from metrics import metrics
+from tmdb_cache import YEAR_PARAMS, cache_key
+
+# Risposte che vale la pena ritentare
+RETRY_STATUS = frozenset((429, 500, 502, 503, 504))
+
+# Parametro che filtra per anno le ricerche di ciascun endpoint
+SEARCH_YEAR_PARAMS = {"movie": "year", "tv": "first_air_date_year"}
+
+
+class TMDbUnavailable(requests.exceptions.RequestException):
+    """TMDb è considerato non disponibile: il nome va generato dalle sole informazioni del file"""
+
+
+class TokenBucket:
+    """Limite di frequenza condiviso fra i thread: `rate` richieste/s con raffiche fino a `capacity`"""
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Attende finché non è disponibile un gettone e lo consuma"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
+    def try_acquire(self):
+        """Consuma un gettone se disponibile, senza attendere; ritorna False se esauriti"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def defer(self, seconds):
+        """Sospende tutte le richieste per `seconds` secondi (es. Retry-After di un 429)"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class CircuitBreaker:
+    """Dopo `failure_threshold` errori consecutivi blocca le richieste per `reset_timeout` secondi"""
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        # Trascorso reset_timeout il circuito è "semi-aperto": si riprova, un nuovo errore lo riapre
+        with self._lock:
+            return self.opened_at is not None and self._clock() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = self._clock()
+
+
+def read_tmdb_api_key(config_filename="config.ini"):
+    """Chiave TMDb da variabile d'ambiente o da config.ini, senza chiederla all'utente
+
+    Returns
+    -------
+    str
+        La chiave trovata oppure None.
+    """
+    api_key = os.getenv("TMDB_API_KEY", "").strip()
+    if api_key:
+        return api_key
+    config = configparser.ConfigParser()
+    config.optionxform = str
+    config.read(config_filename)
+    return config["DEFAULT"].get("TmdbApiKey", "").strip() or None
+
+
+def _parse_retry_after(value):
+    # Retry-After può essere un numero di secondi o una data HTTP
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class TMDbClient:
+    """Client TMDb condiviso fra i thread
+
+    Tutte le richieste passano da un'unica requests.Session (connessioni riutilizzate),
+    rispettano il limite di frequenza e vengono ritentate su 429/5xx ed errori di rete.
+    Se TMDb continua a fallire il circuit breaker si apre e le chiamate sollevano
+    subito TMDbUnavailable, senza attendere i timeout.
+
+    Con una TMDbCache le risposte entro il TTL non generano traffico, quelle scadute
+    vengono rivalidate con If-None-Match e, se TMDb non risponde o in modalità offline,
+    si usa la copia in cache anche se scaduta.
+
+    Con un TitleIndex le ricerche che coincidono con un solo titolo dell'indice locale
+    non usano la rete, e se TMDb non è raggiungibile si usano i titoli simili dell'indice.
+    """
+
+    def __init__(self, api_key, language=None, session=None, cache=None, offline=None, index=None):
+        self.api_key = api_key
+        self.language = language or TMDB_CONFIG["language"]
+        self.base_url = TMDB_CONFIG["base_url"].rstrip("/")
+        self.timeout = TMDB_CONFIG["timeout"]
+        self.max_retries = TMDB_CONFIG["max_retries"]
+        self.backoff_base = TMDB_CONFIG["backoff_base"]
+        self.backoff_max = TMDB_CONFIG["backoff_max"]
+        self.session = session or self._build_session()
+        self.limiter = TokenBucket(TMDB_CONFIG["requests_per_second"], TMDB_CONFIG["burst"])
+        self.breaker = CircuitBreaker(TMDB_CONFIG["failure_threshold"], TMDB_CONFIG["reset_timeout"])
+        self.cache = cache
+        self.offline = TMDB_CACHE_CONFIG["offline"] if offline is None else offline
+        self.index = index
+
+    @staticmethod
+    def _build_session():
+        session = requests.Session()
+        # I retry sono gestiti qui (con backoff e Retry-After), non dall'adapter
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=TMDB_CONFIG["pool_size"], max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Accept"] = "application/json"
+        return session
+
+    @property
+    def available(self):
+        """False mentre il circuit breaker è aperto"""
+        return not self.breaker.is_open
+
+    def _backoff(self, attempt):
+        # Backoff esponenziale con "full jitter": evita che i thread ritentino tutti insieme
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, path, **params):
+        """Esegue una GET su TMDb (o la serve dalla cache) e ritorna il JSON della risposta
+
+        Parameters
+        ----------
+        path : str
+            Percorso relativo all'API, es. "search/movie" o "tv/1399/season/1".
+        **params
+            Parametri della query (api_key e language sono aggiunti automaticamente).
+
+        Returns
+        -------
+        dict
+            Il corpo JSON della risposta.
+
+        Raises
+        ------
+        TMDbUnavailable
+            Se il circuit breaker è aperto (o in modalità offline) e la risposta non è in cache.
+        requests.exceptions.RequestException
+            Se la richiesta fallisce anche dopo i retry (o con un errore non ritentabile, es. 401).
+        """
+        # Esito della richiesta (cache, rete, errore) nelle misure della fase "tmdb"
+        with metrics.stage("tmdb", path=path) as fields:
+            fields["outcome"] = "error"
+            data, fields["outcome"] = self._get(path, params)
+        metrics.count("tmdb_requests_total", outcome=fields["outcome"])
+        return data
+
+    def _get(self, path, params):
+        # Implementazione di get(): ritorna (JSON della risposta, esito)
+        query = {"api_key": self.api_key, "language": self.language}
+        query.update(params)
+
+        key = entry = None
+        if self.cache is not None:
+            key = cache_key(path, query)
+            entry = self.cache.get(key)
+            if entry and entry.is_fresh(self.cache.ttl):
+                self.cache.record("hits")
+                return entry.data, "cache_hit"
+
+        if self.offline or self.breaker.is_open:
+            if entry:
+                self.cache.record("stale")
+                return entry.data, "stale"
+            if self.offline:
+                raise TMDbUnavailable("Modalità offline: risposta TMDb non presente in cache")
+            raise TMDbUnavailable("TMDb non raggiungibile, nuovo tentativo fra qualche secondo")
+
+        headers = {"If-None-Match": entry.etag} if entry and entry.etag else None
+        try:
+            response = self._request(path, query, headers)
+        except requests.exceptions.RequestException as e:
+            status = e.response.status_code if getattr(e, "response", None) is not None else None
+            if entry is None or (status is not None and status not in RETRY_STATUS):
+                raise
+            # TMDb non risponde: meglio la risposta scaduta che nessuna risposta
+            self.cache.record("stale")
+            return entry.data, "stale"
+
+        if response.status_code == 304 and entry:
+            self.cache.touch(key)
+            self.cache.record("revalidated")
+            return entry.data, "revalidated"
+
+        data = response.json()
+        if self.cache is not None:
+            self.cache.put(key, data, response.headers.get("ETag"))
+            self.cache.record("misses")
+        return data, "network"
+
+    def _request(self, path, query, headers=None):
+        # GET con limite di frequenza, retry su 429/5xx/errori di rete e circuit breaker
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            delay = None
+            try:
+                response = self.session.get(url, params=query, headers=headers, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            else:
+                if response.status_code not in RETRY_STATUS:
+                    # TMDb ha risposto: anche un 401/404 significa che il servizio è attivo
+                    self.breaker.record_success()
+                    response.raise_for_status()
+                    return response
+                error = requests.exceptions.HTTPError(
+                    f"{response.status_code} {response.reason} per {url}", response=response)
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    delay = min(retry_after, self.backoff_max)
+                    if response.status_code == 429:
+                        # Il limite è per chiave: sospende tutti i thread tramite il limiter
+                        self.limiter.defer(delay)
+                        delay = 0
+
+            if attempt >= self.max_retries:
+                self.breaker.record_failure()
+                raise error
+            metrics.count("tmdb_retries_total")
+            time.sleep(delay if delay is not None else self._backoff(attempt))
+            attempt += 1
+
+    def search(self, endpoint, query, **params):
+        """Ricerca per titolo ("movie" o "tv") e ritorna la lista dei risultati"""
+        year = next((params[name] for name in YEAR_PARAMS if params.get(name)), None)
+        if self.index is not None and TITLE_INDEX_CONFIG["prefer_local"]:
+            local = self.index.exact(endpoint, query, year)
+            if len(local) == 1:
+                metrics.count("title_index_results_total", reason="exact")
+                return local
+        try:
+            return self.get(f"search/{endpoint}", query=query, **params).get("results", [])
+        except (TMDbUnavailable, requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            # Senza rete l'indice locale è meglio di nessun risultato
+            local = self.index.search(endpoint, query, year) if self.index is not None else None
+            if not local:
+                raise
+            metrics.count("title_index_results_total", reason="fallback")
+            return local
+
+    def season(self, show_id, season_number):
+        """Dettagli di una stagione (episodi con titolo e data) di una serie"""
+        return self.get(f"tv/{show_id}/season/{int(season_number)}")
+
+    def search_with_year(self, endpoint, query, year=None):
+        """Ricerca filtrata per anno (meno risultati da valutare); senza risultati ripete senza anno"""
+        if year:
+            results = self.search(endpoint, query, **{SEARCH_YEAR_PARAMS[endpoint]: year})
+            if results:
+                return results
+        return self.search(endpoint, query)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Selezione automatica del risultato TMDb
+Ogni risultato riceve un punteggio di confidenza (somiglianza del titolo, anno, popolarità, tipo):
+sopra la soglia configurata viene accettato senza chiedere nulla all'utente
+"""
+
+import math
+from difflib import SequenceMatcher
+
+from config import TMDB_MATCH_CONFIG
+from title_index import normalize_title
+
+
+def result_title(result):
+    return result.get("title") or result.get("name", "")
+
+
+def result_year(result):
+    date = result.get("release_date") or result.get("first_air_date", "")
+    return date.split("-")[0] if date else ""
+
+
+def _title_similarity(query, result):
+    # Il titolo del file può essere quello localizzato oppure quello originale
+    candidates = {result.get(field) for field in ("title", "name", "original_title", "original_name")}
+    return max((SequenceMatcher(None, query, normalize_title(title)).ratio() for title in candidates if title),
+               default=0.0)
+
+
+def _year_agreement(year, result):
+    found = result_year(result)
+    if not found.isdigit():
+        return 0.0
+    difference = abs(int(found) - int(year))
+    # Un anno di scarto è frequente (uscita a fine anno, date diverse per paese)
+    return 1.0 if difference == 0 else 0.5 if difference == 1 else 0.0
+
+
+class ScoredResult:
+    """Risultato TMDb con il suo punteggio di confidenza (0-1)"""
+
+    __slots__ = ("result", "score")
+
+    def __init__(self, result, score):
+        self.result = result
+        self.score = score
+
+    def __repr__(self):
+        return "ScoredResult(%r, %.2f)" % (result_title(self.result), self.score)
+
+
+def rank_results(results, title, year=None, content_type="movie"):
+    """Ordina i risultati per punteggio di confidenza decrescente
+
+    Parameters
+    ----------
+    results : list
+        Risultati di una ricerca TMDb (o dell'indice locale).
+    title : str
+        Titolo cercato (estratto dal nome del file).
+    year : str, optional
+        Anno del nome del file; se manca il punteggio non ne tiene conto.
+    content_type : str
+        "movie" o "tv".
+
+    Returns
+    -------
+    list
+        ScoredResult dal più probabile al meno probabile.
+    """
+    weights = TMDB_MATCH_CONFIG["weights"]
+    query = normalize_title(title)
+    max_popularity = max((float(r.get("popularity") or 0.0) for r in results), default=0.0)
+
+    ranked = []
+    for result in results:
+        signals = {
+            "title": _title_similarity(query, result),
+            # Relativa agli altri risultati e in scala logaritmica: i titoli famosi non schiacciano il resto
+            "popularity": (math.log1p(float(result.get("popularity") or 0.0)) / math.log1p(max_popularity)
+                           if max_popularity > 0 else 1.0),
+            "type": 1.0 if result.get("media_type", content_type) == content_type else 0.0,
+        }
+        if year and str(year).isdigit():
+            signals["year"] = _year_agreement(year, result)
+        total_weight = sum(weights[name] for name in signals)
+        score = sum(weights[name] * value for name, value in signals.items()) / total_weight
+        ranked.append(ScoredResult(result, score))
+
+    ranked.sort(key=lambda scored: scored.score, reverse=True)
+    return ranked
+
+
+def select_match(results, title, year=None, content_type="movie"):
+    """Sceglie il risultato da applicare senza intervento dell'utente
+
+    Il migliore è accettato se supera la soglia e stacca il secondo di almeno il margine
+    configurato; altrimenti il file va rivisto a mano.
+
+    Returns
+    -------
+    tuple
+        (risultato accettato o None, lista dei ScoredResult ordinati)
+    """
+    ranked = rank_results(results, title, year, content_type)
+    if not ranked or not TMDB_MATCH_CONFIG["auto_accept"]:
+        return None, ranked
+    best = ranked[0]
+    runner_up = ranked[1].score if len(ranked) > 1 else 0.0
+    if best.score >= TMDB_MATCH_CONFIG["threshold"] and best.score - runner_up >= TMDB_MATCH_CONFIG["margin"]:
+        return best.result, ranked
+    return None, ranked
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Risoluzione TMDb in blocco
+Le ricerche di molti file vengono deduplicate ed eseguite in parallelo con asyncio:
+il tempo totale è dettato dal limite di frequenza del client, non dalla somma delle latenze
+"""
+
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+
+from config import TMDB_CONFIG
+from tmdb_cache import normalize_query
+
+
+class SearchQuery:
+    """Una ricerca TMDb: endpoint ("movie" o "tv"), titolo e anno opzionale"""
+
+    __slots__ = ("endpoint", "title", "year")
+
+    def __init__(self, endpoint, title, year=None):
+        self.endpoint = endpoint
+        self.title = title
+        self.year = year
+
+    @property
+    def key(self):
+        # Ricerche con lo stesso titolo normalizzato producono la stessa risposta
+        return (self.endpoint, normalize_query(self.title), str(self.year or ""))
+
+
+def _call(call):
+    # Gli errori di rete, della cache su disco (es. database bloccato o disco pieno) e le
+    # risposte non JSON diventano il risultato della chiamata: falliscono solo i file della
+    # ricerca, le altre proseguono
+    try:
+        return call()
+    except (requests.exceptions.RequestException, sqlite3.Error, ValueError) as e:
+        return e
+
+
+async def _run_unique(calls, concurrency=None):
+    # Esegue le chiamate bloccanti del client (una per chiave) con al più `concurrency` in corso:
+    # il client usa requests (bloccante) e ogni richiesta occupa un thread del pool
+    if not calls:
+        return {}
+    loop = asyncio.get_running_loop()
+    workers = min(concurrency or TMDB_CONFIG["concurrency"], len(calls))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tmdb") as executor:
+        results = await asyncio.gather(*(loop.run_in_executor(executor, _call, call) for call in calls.values()))
+    return dict(zip(calls, results))
+
+
+def _run_unique_sync(calls, concurrency=None):
+    # Una sola chiamata (servizio /name, watch): nessun event loop né pool di thread da avviare
+    if len(calls) <= 1:
+        return {key: _call(call) for key, call in calls.items()}
+    return asyncio.run(_run_unique(calls, concurrency))
+
+
+def _search_calls(client, queries):
+    # Una ricerca per chiave: i file con lo stesso titolo la condividono
+    calls = {}
+    for query in queries:
+        if query is not None and query.title and query.key not in calls:
+            calls[query.key] = partial(client.search_with_year, query.endpoint, query.title, query.year)
+    return calls
+
+
+def _in_order(by_key, queries):
+    return [by_key.get(query.key) if query is not None else None for query in queries]
+
+
+async def resolve_queries_async(client, queries, concurrency=None):
+    """Esegue le ricerche in parallelo e ritorna i risultati nell'ordine delle query
+
+    Parameters
+    ----------
+    client : TMDbClient
+        Client condiviso: limite di frequenza, retry, circuit breaker e cache valgono per tutte le ricerche.
+    queries : list
+        SearchQuery (o None per i file senza titolo da cercare).
+    concurrency : int, optional
+        Ricerche contemporanee (default: TMDB_CONFIG["concurrency"]).
+
+    Returns
+    -------
+    list
+        Per ogni query la lista dei risultati TMDb, l'eccezione sollevata dalla ricerca
+        oppure None se la query era None.
+    """
+    return _in_order(await _run_unique(_search_calls(client, queries), concurrency), queries)
+
+
+def resolve_queries(client, queries, concurrency=None):
+    """Versione sincrona di resolve_queries_async
+
+    Una sola ricerca distinta si esegue direttamente nel thread chiamante; altrimenti si
+    avvia e chiude un event loop.
+    """
+    return _in_order(_run_unique_sync(_search_calls(client, queries), concurrency), queries)
+
+
+def fetch_seasons(client, seasons, concurrency=None):
+    """Scarica in parallelo i dettagli di ogni stagione, una sola volta per stagione
+
+    Parameters
+    ----------
+    seasons : iterable
+        Coppie (id TMDb della serie, numero della stagione), anche ripetute.
+
+    Returns
+    -------
+    dict
+        (id serie, stagione) -> risposta di /tv/{id}/season/{n} oppure l'eccezione sollevata.
+    """
+    calls = {key: partial(client.season, *key) for key in dict.fromkeys(seasons)}
+    return _run_unique_sync(calls, concurrency)
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+MKV Rename Assistant - Modalità watch
+Resta in ascolto sulle cartelle di download e rinomina (o collega con un hardlink) ogni
+file video appena è completo: MediaInfo → TMDb → nome scene, senza aprire la GUI
+
+Uso:
+    python -m mkv_rename_assistant watch <cartella> [<cartella> ...] [--apply | --link-to DEST]
+                                         [--tmdb] [--existing] [--poll]
+
+Su Linux usa inotify (nessun consumo di CPU quando non arriva nulla), altrove controlla
+le cartelle a intervalli regolari.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+from config import ERROR_MESSAGES, MEDIAINFO_CACHE_CONFIG, WATCH_CONFIG
+from batch_rename import (MediaFileFilter, TMDbSelection, analyze_path, apply_rename, close_tmdb_client,
+                          find_media_files, open_tmdb_client, resolve_tmdb, _init_worker)
+from metrics import metrics
+
+# Costanti inotify (linux/inotify.h)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE_SELF
+_EVENT = struct.Struct("iIII")
+
+# Flag di apertura in scrittura in /proc/<pid>/fdinfo (O_WRONLY, O_RDWR)
+_WRITE_FLAGS = 0o1 | 0o2
+
+
+def _log(message, out):
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", file=out, flush=True)
+
+
+def has_partial_marker(path):
+    """True se accanto al file c'è un gemello parziale del client (es. film.mkv.part)"""
+    return any(os.path.exists(path + ext) for ext in WATCH_CONFIG["partial_extensions"])
+
+
+def is_open_for_writing(path):
+    """True se un processo ha il file aperto in scrittura (solo Linux, tramite /proc)
+
+    Sugli altri sistemi ritorna False: resta il controllo sulla dimensione stabile.
+    """
+    if not os.path.isdir("/proc/self/fd"):
+        return False
+    try:
+        target = os.stat(path)
+    except OSError:
+        return False
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue  # processo terminato o di un altro utente
+        for fd in fds:
+            try:
+                st = os.stat(f"{fd_dir}/{fd}")
+                if (st.st_dev, st.st_ino) != (target.st_dev, target.st_ino):
+                    continue
+                with open(f"/proc/{pid}/fdinfo/{fd}") as info:
+                    for line in info:
+                        if line.startswith("flags:"):
+                            if int(line.split()[1], 8) & _WRITE_FLAGS:
+                                return True
+                            break
+            except (OSError, ValueError):
+                continue
+    return False
+
+
+class CompletionTracker:
+    """File in attesa di essere completi
+
+    Un file è pronto quando dimensione e mtime non cambiano per `settle_seconds`,
+    non ha un gemello parziale e nessun processo lo tiene aperto in scrittura.
+    """
+
+    def __init__(self, settle_seconds, clock=time.monotonic):
+        self.settle_seconds = settle_seconds
+        self._clock = clock
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def touch(self, path):
+        # Nuovo evento sul file: il periodo di stabilità ricomincia
+        self._pending[path] = (None, self._clock())
+
+    def next_delay(self):
+        """Secondi fino al prossimo controllo utile (None se non c'è nulla in attesa)"""
+        if not self._pending:
+            return None
+        oldest = min(since for _signature, since in self._pending.values())
+        return max(0.0, oldest + self.settle_seconds - self._clock())
+
+    def ready(self):
+        """Rimuove e ritorna i file completi"""
+        now = self._clock()
+        ready = []
+        for path, (signature, since) in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._pending[path]  # spostato o cancellato prima di essere completo
+                continue
+            current = (st.st_size, st.st_mtime_ns)
+            if current != signature:
+                self._pending[path] = (current, now)
+                continue
+            if now - since < self.settle_seconds:
+                continue
+            if has_partial_marker(path) or is_open_for_writing(path):
+                self._pending[path] = (current, now)
+                continue
+            del self._pending[path]
+            ready.append(path)
+        return ready
+
+
+class InotifyWatcher:
+    """Eventi del kernel sulle cartelle (e sottocartelle) osservate"""
+
+    def __init__(self, roots, out=sys.stdout):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self.out = out
+        self._dirs = {}
+        for root in roots:
+            self.add_tree(root)
+
+    def add_tree(self, root):
+        # Una watch per cartella: inotify non è ricorsivo
+        for dirpath, _dirnames, _filenames in os.walk(root):
+            try:
+                self._add_watch(dirpath)
+            except OSError as e:
+                # Cartella sparita, senza permessi o limite max_user_watches raggiunto:
+                # si continua con le altre invece di fermare il demone
+                _log(f"⚠️ Cartella non osservata: {e}", self.out)
+
+    def _add_watch(self, dirpath):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch {dirpath}: {os.strerror(errno)}")
+        self._dirs[wd] = dirpath
+
+    def wait(self, timeout):
+        """Attende eventi (timeout None = senza limite) e ritorna i file toccati"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        changed = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0"))
+                offset += _EVENT.size + length
+                if mask & _IN_Q_OVERFLOW:
+                    # Eventi persi: si ricontrollano tutti i file
+                    changed.extend(path for root in set(self._dirs.values()) for path in find_media_files(root))
+                    continue
+                directory = self._dirs.get(wd)
+                if directory is None:
+                    continue
+                if mask & _IN_DELETE_SELF:
+                    del self._dirs[wd]
+                    continue
+                path = os.path.join(directory, name)
+                if mask & _IN_ISDIR:
+                    # Cartella nuova (es. torrent completato spostato qui): osservarla e leggerne i file
+                    if mask & (_IN_CREATE | _IN_MOVED_TO):
+                        self.add_tree(path)
+                        changed.extend(find_media_files(path))
+                else:
+                    changed.append(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Alternativa senza inotify: confronta le cartelle a intervalli regolari"""
+
+    def __init__(self, roots, interval):
+        self.roots = roots
+        self.interval = interval
+        self._seen = self._snapshot()
+
+    def _snapshot(self):
+        snapshot = {}
+        for root in self.roots:
+            for path in find_media_files(root):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = self._snapshot()
+        changed = [path for path, signature in current.items() if self._seen.get(path) != signature]
+        self._seen = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def relative_to_root(path, roots):
+    """Percorso del file rispetto alla cartella osservata che lo contiene (la più interna)"""
+    for root in sorted(roots, key=len, reverse=True):
+        relative = os.path.relpath(path, root)
+        if relative != os.pardir and not relative.startswith(os.pardir + os.sep):
+            return relative
+    return os.path.basename(path)
+
+
+def link_into(result, directory):
+    """Crea un hardlink col nuovo nome nella cartella di destinazione; ritorna un errore o None"""
+    target = Path(directory) / result["new_name"]
+    if target.exists():
+        return ERROR_MESSAGES["file_exists"]
+    try:
+        os.link(result["path"], target)
+    except OSError as e:
+        return f"{ERROR_MESSAGES['rename_error']} {e}"
+    return None
+
+
+def process_file(path, apply=False, link_to=None, tmdb_client=None, out=sys.stdout):
+    """Analizza un file completo e lo rinomina/collega; ritorna il nuovo percorso o None
+
+    `tmdb_client` (aperto con `open_tmdb_client`) corregge titolo e anno con TMDb.
+    """
+    selection = TMDbSelection()
+    if tmdb_client is not None:
+        selection = resolve_tmdb([path], out, client=tmdb_client)[0]
+    result = analyze_path(path, selection.result, selection.content_type)
+    metrics.record_all(result["timings"], file=path, cache_hit=result["cache_hit"])
+    if result["error"]:
+        _log(f"❌ {path}: {result['error']}", out)
+        return None
+    if selection.review:
+        _log(f"⏸ {path}: risultato TMDb ambiguo, da rivedere", out)
+        return None
+
+    if link_to:
+        with metrics.stage("rename", file=path):
+            error, new_path = link_into(result, link_to), os.path.join(link_to, result["new_name"])
+    elif apply:
+        with metrics.stage("rename", file=path):
+            error, new_path = apply_rename(result), os.path.join(os.path.dirname(path), result["new_name"])
+    else:
+        _log(f"{path}\n  -> {result['new_name']}", out)
+        return None
+    if error:
+        _log(f"❌ {path}: {error}", out)
+        return None
+    _log(f"✅ {os.path.basename(path)} -> {new_path}", out)
+    return new_path
+
+
+def watch(roots, apply=False, link_to=None, tmdb=False, existing=False, use_cache=True,
+          use_inotify=None, out=sys.stdout):
+    """Ciclo principale: attende i file nuovi e li elabora appena sono completi"""
+    _init_worker(use_cache and MEDIAINFO_CACHE_CONFIG["enabled"])
+    tracker = CompletionTracker(WATCH_CONFIG["settle_seconds"])
+    file_filter = MediaFileFilter()
+    use_inotify = WATCH_CONFIG["use_inotify"] if use_inotify is None else use_inotify
+
+    watcher = None
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            watcher = InotifyWatcher(roots, out)
+        except (OSError, AttributeError) as e:
+            _log(f"inotify non disponibile ({e}): controllo periodico", out)
+    if watcher is None:
+        watcher = PollingWatcher(roots, WATCH_CONFIG["poll_interval"])
+    _log(f"In ascolto su {', '.join(roots)} ({type(watcher).__name__})", out)
+
+    if existing:
+        for root in roots:
+            for path in find_media_files(root):
+                tracker.touch(path)
+
+    # Percorsi creati da noi (rinomine/hardlink): i loro eventi non vanno rielaborati
+    produced = set()
+    # Un solo client TMDb (sessione HTTP, cache e indice dei titoli) per tutti i file
+    tmdb_client = open_tmdb_client(out) if tmdb else None
+    try:
+        while True:
+            for path in watcher.wait(tracker.next_delay()):
+                if path in produced:
+                    produced.discard(path)
+                elif file_filter.relative_skip_reason(relative_to_root(path, roots)) is None:
+                    # La dimensione minima si controlla a file completo
+                    tracker.touch(path)
+            for path in tracker.ready():
+                try:
+                    reason = file_filter.relative_skip_reason(relative_to_root(path, roots), os.path.getsize(path))
+                except OSError:
+                    continue
+                if reason:
+                    _log(f"⏭ {path}: scartato ({file_filter.describe(reason)})", out)
+                    continue
+                new_path = process_file(path, apply=apply, link_to=link_to, tmdb_client=tmdb_client, out=out)
+                if new_path:
+                    produced.add(new_path)
+                metrics.flush()
+    except KeyboardInterrupt:
+        _log("Interrotto", out)
+    finally:
+        watcher.close()
+        if tmdb_client is not None:
+            close_tmdb_client(tmdb_client)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="mkv_rename_assistant watch",
+        description="Rinomina automaticamente i file video appena completati nelle cartelle di download")
+    parser.add_argument("directories", nargs="+", help="Cartelle da osservare (ricorsivamente)")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--apply", action="store_true",
+                        help="Rinomina i file sul posto (default: mostra solo i nuovi nomi)")
+    action.add_argument("--link-to", metavar="DEST", default=None,
+                        help="Crea un hardlink col nuovo nome in DEST lasciando intatto il download")
+    parser.add_argument("--tmdb", action="store_true", help="Corregge titolo e anno con TMDb")
+    parser.add_argument("--existing", action="store_true", help="Elabora anche i file già presenti")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false", help="Ignora la cache MediaInfo")
+    parser.add_argument("--poll", action="store_true", help="Controllo periodico invece di inotify")
+    args = parser.parse_args(argv)
+
+    for directory in args.directories + ([args.link_to] if args.link_to else []):
+        if not os.path.isdir(directory):
+            parser.error(f"Cartella non trovata: {directory}")
+
+    return watch(args.directories, apply=args.apply, link_to=args.link_to, tmdb=args.tmdb,
+                 existing=args.existing, use_cache=args.use_cache,
+                 use_inotify=False if args.poll else None)
+
+
+if __name__ == "__main__":
+    sys.exit(main())